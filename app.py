@@ -5,6 +5,7 @@ Multi-agent system for understanding research papers
 
 import streamlit as st
 import os
+import hashlib
 from dotenv import load_dotenv
 import yaml
 from pathlib import Path
@@ -145,6 +146,13 @@ with open("config.yaml", "r") as f:
 if "mode_handler" not in st.session_state:
     st.session_state.mode_handler = ModeHandler()
 
+# Any rerun (a button click, a chat message) abandons the previous run's
+# output, so cancel its live request instead of letting it finish and spend quota
+st.session_state.mode_handler.cancel()
+
+if "api_key" not in st.session_state:
+    st.session_state.api_key = None
+
 if "current_paper" not in st.session_state:
     st.session_state.current_paper = None
 
@@ -220,7 +228,7 @@ with st.sidebar:
         
         if uploaded_file:
             # Check if API key is available
-            api_key = os.getenv("GOOGLE_API_KEY")
+            api_key = st.session_state.api_key or os.getenv("GOOGLE_API_KEY")
             if not api_key or api_key == "your-api-key-here":
                 st.error("⚠️ Please add your API key above first")
             else:
@@ -231,8 +239,11 @@ with st.sidebar:
                         with open(temp_path, "wb") as f:
                             f.write(uploaded_file.getbuffer())
                         
+                        # Identify the paper by content so identical PDFs share cached answers
+                        pdf_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()[:16]
+                        
                         st.session_state.current_paper = {
-                            "id": "uploaded",
+                            "id": f"pdf-{pdf_hash}",
                             "title": uploaded_file.name,
                             "file": temp_path
                         }
@@ -254,8 +265,17 @@ with st.sidebar:
             placeholder="AIzaSy..."
         )
         
+        # Keep the key in this session only - other sessions on the same
+        # server keep using their own keys
+        st.session_state.api_key = user_api_key or None
+        st.session_state.mode_handler.set_api_key(st.session_state.api_key)
+        
+        st.session_state.mode_handler.force_refresh = st.checkbox(
+            "Always generate fresh answers",
+            help="Skip answers cached from earlier questions about the same PDF"
+        )
+        
         if user_api_key:
-            os.environ["GOOGLE_API_KEY"] = user_api_key
             st.success("✅ API Key Connected!")
             st.caption("You can now upload custom PDFs")
         else:
@@ -547,6 +567,12 @@ This paper didn't just improve translation - it fundamentally changed how we thi
         else:
             # Live mode or other papers - show regular interface
             st.markdown("Select an agent to analyze your paper:")
+
+            whole_paper = st.checkbox(
+                "Analyze the whole paper (slower, reads every page instead of the opening pages)",
+                key="whole_paper",
+                disabled=st.session_state.mode_handler.mode != "live"
+            )
             
             st.markdown("<br>", unsafe_allow_html=True)
             
@@ -562,13 +588,14 @@ This paper didn't just improve translation - it fundamentally changed how we thi
                 
                 if st.button("Analyze Math", use_container_width=True, key="math_btn"):
                     with st.spinner("Analyzing mathematical content..."):
-                        content = parser.full_text[:8000]
+                        content = parser.full_text if whole_paper else parser.full_text[:8000]
                         result = st.session_state.mode_handler.process_query(
                             paper['id'],
                             "Explain the mathematical concepts, equations, and proofs in this paper",
                             content,
                             query_type="math",
-                            section=None
+                            section=None,
+                            whole_paper=whole_paper
                         )
                         
                         st.markdown("---")
@@ -586,13 +613,14 @@ This paper didn't just improve translation - it fundamentally changed how we thi
                 
                 if st.button("Analyze Code", use_container_width=True, key="code_btn"):
                     with st.spinner("Analyzing algorithms..."):
-                        content = parser.full_text[:8000]
+                        content = parser.full_text if whole_paper else parser.full_text[:8000]
                         result = st.session_state.mode_handler.process_query(
                             paper['id'],
                             "Explain the algorithms, pseudocode, and implementation details in this paper",
                             content,
                             query_type="code",
-                            section=None
+                            section=None,
+                            whole_paper=whole_paper
                         )
                         
                         st.markdown("---")
@@ -610,20 +638,40 @@ This paper didn't just improve translation - it fundamentally changed how we thi
                 
                 if st.button("Analyze Concepts", use_container_width=True, key="concept_btn"):
                     with st.spinner("Analyzing concepts..."):
-                        content = parser.full_text[:8000]
+                        content = parser.full_text if whole_paper else parser.full_text[:8000]
                         result = st.session_state.mode_handler.process_query(
                             paper['id'],
                             "Explain the key concepts, architecture, and main ideas in this paper",
                             content,
                             query_type="concept",
-                            section=None
+                            section=None,
+                            whole_paper=whole_paper
                         )
                         
                         st.markdown("---")
                         st.markdown("#### Conceptual Analysis")
                         st.markdown(result['response'])
                         st.caption(f"Generated by {result.get('agent', 'Concept')} Agent")
-    
+
+            st.markdown("<br>", unsafe_allow_html=True)
+
+            if st.button("Analyze All (run agents in parallel)", use_container_width=True, key="all_btn"):
+                with st.spinner("Running math, code and concept agents..."):
+                    content = parser.full_text[:8000]
+                    result = st.session_state.mode_handler.process_query(
+                        paper['id'],
+                        "Explain the key concepts, mathematics, and algorithms in this paper",
+                        content,
+                        query_type="all",
+                        section=None
+                    )
+
+                    st.markdown("---")
+                    st.markdown("#### Combined Analysis")
+                    st.markdown(result['response'])
+                    if result.get('agents'):
+                        st.caption(f"Generated by {', '.join(a.title() for a in result['agents'])} Agents")
+
     with tab2:
         st.markdown("### Interactive Chat")
         
@@ -2,16 +2,17 @@
 Chat Agent - Interactive Q&A about specific paper sections or topics.
 """
 
-from utils.vertex_client import get_client
-from typing import List, Dict
+from utils.request_control import DeadlineExceeded, RequestCancelled
+from utils.vertex_client import FallbackText, GeminiClient, get_client
+from typing import List, Dict, Optional
+from backend.agents.registry import register_agent
 
 
+@register_agent("chat")
 class ChatAgent:
     """Agent for interactive chat about paper content."""
     
-    def __init__(self):
-        self.client = get_client()
-        self.system_instruction = """You are a helpful research assistant specialized in answering questions about research papers.
+    system_instruction = """You are a helpful research assistant specialized in answering questions about research papers.
 
 Your goal is to provide clear, accurate answers that help the user understand the paper better.
 
@@ -55,12 +56,25 @@ You: "Cross-entropy is better suited for classification tasks like next-token pr
 - Adding speculation
 - Ignoring the actual question"""
     
+    # Passed to the client with every call; part of the cache version
+    generation_params = {"temperature": 0.7}
+    
+    def __init__(self, client: Optional[GeminiClient] = None):
+        """
+        Initialize agent.
+        
+        Args:
+            client: Default client (otherwise chosen per call, see chat)
+        """
+        self.client = client
+    
     def chat(
         self,
         query: str,
         paper_content: str,
         history: List[Dict] = None,
-        section: str = None
+        section: str = None,
+        client: Optional[GeminiClient] = None
     ) -> str:
         """
         Interactive chat about paper.
@@ -70,6 +84,7 @@ You: "Cross-entropy is better suited for classification tasks like next-token pr
             paper_content: Relevant paper content
             history: Previous conversation (list of {'role': 'user'/'assistant', 'content': str})
             section: Current section being discussed
+            client: Client to call (e.g. bound to the user's API key)
             
         Returns:
             Chat response
@@ -96,16 +111,21 @@ You: "Cross-entropy is better suited for classification tasks like next-token pr
             messages.append({"role": "user", "content": query})
             
             # Get response with enhanced system instruction
-            response = self.client.chat(
+            client = client or self.client or get_client()
+            response = client.chat(
                 messages,
                 system_instruction=enhanced_instruction,
-                temperature=0.7
+                **self.generation_params,
+                tags={"agent": "chat", "section": section}
             )
             
             return response
             
+        except (RequestCancelled, DeadlineExceeded):
+            # Let the mode handler report cancellations and timeouts
+            raise
         except Exception as e:
             # Return user-friendly error message
             import logging
             logging.error(f"Chat error: {e}")
-            return "I apologize, but I encountered an error processing your question. This might be due to API rate limits or a temporary service issue. Please try again in a moment, or rephrase your question."
\ No newline at end of file
+            return FallbackText("I apologize, but I encountered an error processing your question. This might be due to API rate limits or a temporary service issue. Please try again in a moment, or rephrase your question.")
\ No newline at end of file
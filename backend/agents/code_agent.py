@@ -2,16 +2,16 @@
 Code Agent - Specialized in explaining algorithms, pseudocode, and implementations.
 """
 
-from utils.vertex_client import get_client
+from utils.vertex_client import GeminiClient, get_client
 from typing import Optional
+from backend.agents.registry import register_agent
 
 
+@register_agent("code")
 class CodeAgent:
     """Agent specialized in algorithm and implementation explanations."""
     
-    def __init__(self):
-        self.client = get_client()
-        self.system_instruction = """You are an algorithms expert specialized in explaining code, pseudocode, and implementation details from research papers.
+    system_instruction = """You are an algorithms expert specialized in explaining code, pseudocode, and implementation details from research papers.
 
 Your goal is to make algorithms clear, implementable, and understandable.
 
@@ -77,7 +77,36 @@ Implementation tip: Use a deque for the buffer (efficient append/pop from both e
 Make it clear enough that the reader could implement it!
 """
     
-    def process(self, query: str, paper_content: str, section: Optional[str] = None) -> str:
+    # Filled in with .format() for each query
+    prompt_template = """The user is studying a research paper and has a question about the algorithms or implementation details.
+
+Paper Content:
+{paper_content}
+
+User Question: {query}
+
+Provide a clear explanation of the algorithm, pseudocode, or implementation. Include step-by-step breakdown, data structures used, and practical implementation considerations.
+"""
+    
+    # Passed to the client with every call; part of the cache version
+    generation_params = {"temperature": 0.7, "max_tokens": 2048}
+    
+    def __init__(self, client: Optional[GeminiClient] = None):
+        """
+        Initialize agent.
+        
+        Args:
+            client: Default client (otherwise chosen per call, see process)
+        """
+        self.client = client
+    
+    def process(
+        self,
+        query: str,
+        paper_content: str,
+        section: Optional[str] = None,
+        client: Optional[GeminiClient] = None
+    ) -> str:
         """
         Process a code/algorithm-focused query.
         
@@ -85,25 +114,22 @@ Make it clear enough that the reader could implement it!
             query: User's question
             paper_content: Relevant paper content
             section: Paper section
+            client: Client to call (e.g. bound to the user's API key)
             
         Returns:
             Algorithm explanation
         """
-        prompt = f"""The user is studying a research paper and has a question about the algorithms or implementation details.
-
-Paper Content:
-{paper_content[:4000]}
-
-User Question: {query}
-
-Provide a clear explanation of the algorithm, pseudocode, or implementation. Include step-by-step breakdown, data structures used, and practical implementation considerations.
-"""
+        prompt = self.prompt_template.format(
+            paper_content=paper_content[:4000],
+            query=query
+        )
         
-        response = self.client.generate(
+        client = client or self.client or get_client()
+        response = client.generate(
             prompt,
             system_instruction=self.system_instruction,
-            temperature=0.7,
-            max_tokens=2048
+            **self.generation_params,
+            tags={"agent": "code", "section": section}
         )
         
         return response
\ No newline at end of file
@@ -2,16 +2,16 @@
 Concept Agent - Specialized in explaining high-level ideas, architectures, and motivation.
 """
 
-from utils.vertex_client import get_client
+from utils.vertex_client import GeminiClient, get_client
 from typing import Optional
+from backend.agents.registry import register_agent
 
 
+@register_agent("concept")
 class ConceptAgent:
     """Agent specialized in conceptual explanations."""
     
-    def __init__(self):
-        self.client = get_client()
-        self.system_instruction = """You are an expert at explaining high-level concepts, architectures, and motivation from research papers.
+    system_instruction = """You are an expert at explaining high-level concepts, architectures, and motivation from research papers.
 
 Your goal is to make complex ideas accessible through clear conceptual explanations.
 
@@ -78,7 +78,36 @@ This architecture enabled models like GPT and BERT, scaling to billions of param
 Make the reader understand the key insight and why it matters!
 """
     
-    def process(self, query: str, paper_content: str, section: Optional[str] = None) -> str:
+    # Filled in with .format() for each query
+    prompt_template = """The user is studying a research paper and wants to understand the high-level concepts and architecture.
+
+Paper Content:
+{paper_content}
+
+User Question: {query}
+
+Provide a clear, conceptual explanation. Focus on the big picture, key innovations, and intuition. Use analogies where helpful. Explain why this approach matters.
+"""
+    
+    # Passed to the client with every call; part of the cache version
+    generation_params = {"temperature": 0.7, "max_tokens": 2048}
+    
+    def __init__(self, client: Optional[GeminiClient] = None):
+        """
+        Initialize agent.
+        
+        Args:
+            client: Default client (otherwise chosen per call, see process)
+        """
+        self.client = client
+    
+    def process(
+        self,
+        query: str,
+        paper_content: str,
+        section: Optional[str] = None,
+        client: Optional[GeminiClient] = None
+    ) -> str:
         """
         Process a concept-focused query.
         
@@ -86,25 +115,22 @@ Make the reader understand the key insight and why it matters!
             query: User's question
             paper_content: Relevant paper content
             section: Paper section
+            client: Client to call (e.g. bound to the user's API key)
             
         Returns:
             Conceptual explanation
         """
-        prompt = f"""The user is studying a research paper and wants to understand the high-level concepts and architecture.
-
-Paper Content:
-{paper_content[:4000]}
-
-User Question: {query}
-
-Provide a clear, conceptual explanation. Focus on the big picture, key innovations, and intuition. Use analogies where helpful. Explain why this approach matters.
-"""
+        prompt = self.prompt_template.format(
+            paper_content=paper_content[:4000],
+            query=query
+        )
         
-        response = self.client.generate(
+        client = client or self.client or get_client()
+        response = client.generate(
             prompt,
             system_instruction=self.system_instruction,
-            temperature=0.7,
-            max_tokens=2048
+            **self.generation_params,
+            tags={"agent": "concept", "section": section}
         )
         
         return response
\ No newline at end of file
@@ -2,16 +2,16 @@
 Math Agent - Specialized in explaining equations, proofs, and mathematical concepts.
 """
 
-from utils.vertex_client import get_client
+from utils.vertex_client import GeminiClient, get_client
 from typing import Optional
+from backend.agents.registry import register_agent
 
 
+@register_agent("math")
 class MathAgent:
     """Agent specialized in mathematical explanations."""
     
-    def __init__(self):
-        self.client = get_client()
-        self.system_instruction = """You are a mathematics expert specialized in explaining complex equations, proofs, and mathematical concepts from research papers.
+    system_instruction = """You are a mathematics expert specialized in explaining complex equations, proofs, and mathematical concepts from research papers.
 
 Your goal is to make mathematical content accessible and intuitive.
 
@@ -67,7 +67,36 @@ The division by √d_k is crucial: without it, the dot products grow with dimens
 Make the reader say "Ah, now I understand why it's built this way!"
 """
     
-    def process(self, query: str, paper_content: str, section: Optional[str] = None) -> str:
+    # Filled in with .format() for each query
+    prompt_template = """The user is studying a research paper and has a question about the mathematical content.
+
+Paper Content:
+{paper_content}
+
+User Question: {query}
+
+Provide a clear, intuitive explanation of the mathematical concepts involved. Break down any equations, explain the notation, and provide the reasoning behind the math.
+"""
+    
+    # Passed to the client with every call; part of the cache version
+    generation_params = {"temperature": 0.7, "max_tokens": 2048}
+    
+    def __init__(self, client: Optional[GeminiClient] = None):
+        """
+        Initialize agent.
+        
+        Args:
+            client: Default client (otherwise chosen per call, see process)
+        """
+        self.client = client
+    
+    def process(
+        self,
+        query: str,
+        paper_content: str,
+        section: Optional[str] = None,
+        client: Optional[GeminiClient] = None
+    ) -> str:
         """
         Process a math-focused query.
         
@@ -75,25 +104,22 @@ Make the reader say "Ah, now I understand why it's built this way!"
             query: User's question
             paper_content: Relevant paper content
             section: Paper section
+            client: Client to call (e.g. bound to the user's API key)
             
         Returns:
             Mathematical explanation
         """
-        prompt = f"""The user is studying a research paper and has a question about the mathematical content.
-
-Paper Content:
-{paper_content[:4000]}
-
-User Question: {query}
-
-Provide a clear, intuitive explanation of the mathematical concepts involved. Break down any equations, explain the notation, and provide the reasoning behind the math.
-"""
+        prompt = self.prompt_template.format(
+            paper_content=paper_content[:4000],
+            query=query
+        )
         
-        response = self.client.generate(
+        client = client or self.client or get_client()
+        response = client.generate(
             prompt,
             system_instruction=self.system_instruction,
-            temperature=0.7,
-            max_tokens=2048
+            **self.generation_params,
+            tags={"agent": "math", "section": section}
         )
         
         return response
\ No newline at end of file
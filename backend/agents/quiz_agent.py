@@ -2,16 +2,16 @@
 Quiz Agent - Generates study questions to test understanding.
 """
 
-from utils.vertex_client import get_client
+from utils.vertex_client import GeminiClient, get_client
 from typing import Optional
+from backend.agents.registry import register_agent
 
 
+@register_agent("quiz")
 class QuizAgent:
     """Agent specialized in generating study questions."""
     
-    def __init__(self):
-        self.client = get_client()
-        self.system_instruction = """You are an expert at creating effective study questions for research papers.
+    system_instruction = """You are an expert at creating effective study questions for research papers.
 
 Your goal is to help researchers test and deepen their understanding through well-designed questions.
 
@@ -71,7 +71,34 @@ Understanding multi-head attention is key to grasping why Transformers work so w
 
 Generate 5 questions by default."""
     
-    def process(self, query: str, paper_content: str, section: Optional[str] = None) -> str:
+    # Filled in with .format() for each query
+    prompt_template = """Generate 5 study questions for this research paper content. {section_note}
+
+Paper Content:
+{paper_content}
+
+Create questions that test understanding at multiple levels (conceptual, technical, critical thinking, application). Provide complete answers and explain why each question matters.
+"""
+    
+    # Passed to the client with every call; part of the cache version
+    generation_params = {"temperature": 0.8, "max_tokens": 3000}  # Slightly higher temperature for variety
+    
+    def __init__(self, client: Optional[GeminiClient] = None):
+        """
+        Initialize agent.
+        
+        Args:
+            client: Default client (otherwise chosen per call, see process)
+        """
+        self.client = client
+    
+    def process(
+        self,
+        query: str,
+        paper_content: str,
+        section: Optional[str] = None,
+        client: Optional[GeminiClient] = None
+    ) -> str:
         """
         Generate quiz questions.
         
@@ -79,25 +106,25 @@ Generate 5 questions by default."""
             query: User's request (often just "generate quiz")
             paper_content: Relevant paper content
             section: Paper section to focus on
+            client: Client to call (e.g. bound to the user's API key)
             
         Returns:
             Quiz questions with answers
         """
         section_note = f"Focus on the {section} section." if section else ""
         
-        prompt = f"""Generate 5 study questions for this research paper content. {section_note}
-
-Paper Content:
-{paper_content[:4000]}
-
-Create questions that test understanding at multiple levels (conceptual, technical, critical thinking, application). Provide complete answers and explain why each question matters.
-"""
+        prompt = self.prompt_template.format(
+            section_note=section_note,
+            paper_content=paper_content[:4000]
+        )
         
-        response = self.client.generate(
+        client = client or self.client or get_client()
+        response = client.generate(
             prompt,
             system_instruction=self.system_instruction,
-            temperature=0.8,  # Slightly higher for variety
-            max_tokens=3000
+            **self.generation_params,
+            tags={"agent": "quiz", "section": section},
+            use_cache=False  # Fresh questions on every request
         )
         
         return response
\ No newline at end of file
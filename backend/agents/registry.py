@@ -0,0 +1,96 @@
+"""
+Agent Registry - Agents are constructed once and shared across queries.
+"""
+
+import importlib
+import threading
+from typing import Callable, Dict, List
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Modules whose agents register themselves on import
+BUILTIN_AGENT_MODULES = [
+    "backend.agents.math_agent",
+    "backend.agents.code_agent",
+    "backend.agents.concept_agent",
+    "backend.agents.quiz_agent",
+    "backend.agents.chat_agent",
+]
+
+
+class AgentRegistry:
+    """Name -> shared agent instance lookup."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable] = {}
+        self._instances: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable):
+        """
+        Register an agent.
+
+        Args:
+            name: Agent name used for routing (e.g. "math")
+            factory: Zero-argument callable (usually the class) building the agent
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str):
+        """
+        Get the shared instance of an agent, building it on first use.
+
+        Raises:
+            KeyError: No agent registered under name
+        """
+        agent = self._instances.get(name)
+        if agent is not None:
+            return agent
+
+        with self._lock:
+            agent = self._instances.get(name)
+            if agent is None:
+                agent = self._factories[name]()
+                self._instances[name] = agent
+                logger.info(f"Constructed shared {name} agent")
+            return agent
+
+    def names(self) -> List[str]:
+        """Registered agent names."""
+        with self._lock:
+            return list(self._factories)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+
+# Global registry instance
+_registry = AgentRegistry()
+_builtins_loaded = False
+
+def register_agent(name: str):
+    """
+    Class decorator registering an agent under name.
+
+    Example:
+        @register_agent("math")
+        class MathAgent: ...
+    """
+    def decorator(cls):
+        _registry.register(name, cls)
+        return cls
+    return decorator
+
+
+def get_registry() -> AgentRegistry:
+    """Get the global registry with the built-in agents registered."""
+    global _builtins_loaded
+    if not _builtins_loaded:
+        for module in BUILTIN_AGENT_MODULES:
+            importlib.import_module(module)
+        _builtins_loaded = True
+    return _registry
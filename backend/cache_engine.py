@@ -0,0 +1,277 @@
+"""
+Cache generation engine - runs demo cache tasks concurrently within the
+API quota.
+
+Tasks run on a bounded worker pool. Every API call still waits for its
+key's rate limiter (utils.rate_limiter), so extra workers only hide
+round-trip latency: throughput tops out at the configured requests per
+minute per key, and wall time is set by the quota rather than by latency.
+Failed tasks are retried with exponential backoff.
+
+RunJournal checkpoints which entries a run has completed, so a run that
+dies (quota, network, Ctrl-C) resumes where it stopped.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Set
+from utils.config import get_config
+from utils.usage_tracker import usage_tags
+from utils.vertex_client import FallbackText, service_keys
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TaskFailed(Exception):
+    """A task returned fallback text instead of an answer."""
+
+
+def format_duration(seconds: float) -> str:
+    """Compact duration such as "4m05s"."""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    """Completed/failed counts, throughput and ETA of a generation run."""
+
+    def __init__(self, total: int, quota_rpm: float, stream=None):
+        """
+        Args:
+            total: Number of tasks
+            quota_rpm: Requests per minute across all keys (bounds the ETA)
+            stream: Where progress lines go (defaults to stdout)
+        """
+        self.total = total
+        self.quota_rpm = quota_rpm
+        self.stream = stream or sys.stdout
+        self.done = 0
+        self.failed = 0
+        self.retries = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def rate_per_minute(self) -> float:
+        elapsed = time.time() - self.started
+        return (self.done + self.failed) / elapsed * 60 if elapsed > 0 else 0.0
+
+    def eta(self) -> float:
+        """Seconds left: observed throughput once a few tasks are in, else the quota."""
+        remaining = self.total - self.done - self.failed
+        rate = self.rate_per_minute() if self.done + self.failed >= 3 else 0.0
+        rate = rate or self.quota_rpm
+        return remaining / rate * 60 if rate else 0.0
+
+    def report(self, status: str, label: str, note: str = ""):
+        with self._lock:
+            if status == "PASS":
+                self.done += 1
+            elif status == "FAIL":
+                self.failed += 1
+            else:
+                self.retries += 1
+            finished = self.done + self.failed
+            line = (f"  [{finished}/{self.total}] [{status}] {label}{note} "
+                    f"({self.rate_per_minute():.1f}/min, ETA {format_duration(self.eta())})")
+            print(line, file=self.stream, flush=True)
+
+    def summary(self) -> Dict:
+        elapsed = time.time() - self.started
+        return {
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "retries": self.retries,
+            "elapsed": elapsed,
+            "rate_per_minute": self.rate_per_minute(),
+        }
+
+
+class RunJournal:
+    """
+    Entries completed by a generation run, one JSONL record per task.
+
+    Responses themselves go to the response cache as they finish (see
+    ResponseCache.set_entry); the journal only records which stored keys a
+    run has done, so rerunning after a crash skips them. It is discarded
+    once a run completes without failures.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Journal file (created on the first record)
+        """
+        self.path = path
+        self.completed: Dict[str, Set[str]] = {}
+        self._torn = False
+        try:
+            with open(path, 'r') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return
+        for line in text.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line from a crash mid-append
+                continue
+            self.completed.setdefault(record["paper_id"], set()).add(record["key"])
+        self._torn = bool(text) and not text.endswith("\n")
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self.completed.values())
+
+    def is_done(self, task) -> bool:
+        return task.stored_key in self.completed.get(task.paper_id, ())
+
+    def record(self, task):
+        """Mark a task completed (flushed to disk before returning)."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        record = json.dumps({"paper_id": task.paper_id, "key": task.stored_key}) + "\n"
+        if self._torn:
+            record = "\n" + record
+            self._torn = False
+        with open(self.path, 'a') as f:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed.setdefault(task.paper_id, set()).add(task.stored_key)
+
+    def discard(self):
+        """Forget every completed entry, e.g. after a successful run."""
+        self.completed = {}
+        self._torn = False
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def journal_path(name: str) -> str:
+    """Run journal file of a generator script (under generation.journal_dir)."""
+    settings = get_config().get("generation", {}) or {}
+    return os.path.join(settings.get("journal_dir", "data/cache/generation"), f"{name}.jsonl")
+
+
+class GenerationEngine:
+    """Bounded worker pool over cache tasks with per-task retries."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        stream=None
+    ):
+        """
+        Initialize engine.
+
+        Args:
+            workers: Tasks in flight (defaults to generation.workers)
+            retries: Extra attempts per failed task (defaults to generation.retries)
+            backoff: Seconds before the first retry, doubling after each
+                (defaults to generation.backoff)
+            stream: Progress output (defaults to stdout)
+        """
+        settings = get_config().get("generation", {}) or {}
+        self.workers = workers or settings.get("workers", 4)
+        self.retries = retries if retries is not None else settings.get("retries", 2)
+        self.backoff = backoff if backoff is not None else settings.get("backoff", 5.0)
+        self.stream = stream
+        self.progress: Optional[Progress] = None
+
+    @staticmethod
+    def quota_rpm() -> float:
+        """Requests per minute allowed across all service keys."""
+        rpm = get_config().get("model", {}).get("requests_per_minute", 15)
+        return rpm * max(1, len(service_keys()))
+
+    def _attempt(self, task) -> str:
+        """Run one task, retrying failures with exponential backoff."""
+        for attempt in range(self.retries + 1):
+            try:
+                with usage_tags(paper_id=task.paper_id, mode="cache"):
+                    response = task.run()
+                if isinstance(response, FallbackText) or not response:
+                    raise TaskFailed(str(response)[:80] or "empty response")
+                return response
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.8, 1.2)
+                self.progress.report("RETRY", task.display, f" after {delay:.0f}s: {str(e)[:80]}")
+                time.sleep(delay)
+
+    def run(
+        self,
+        tasks: List,
+        on_result: Optional[Callable] = None
+    ) -> Dict[str, str]:
+        """
+        Run tasks concurrently.
+
+        Args:
+            tasks: CacheTask list
+            on_result: Called as on_result(task, response, error) after each
+                task finishes, from the calling thread (response is None on failure)
+
+        Returns:
+            Stored key -> response for every task that succeeded. On
+            KeyboardInterrupt, tasks in flight finish (and reach on_result),
+            the rest are skipped and the interrupt is re-raised.
+        """
+        self.progress = Progress(len(tasks), self.quota_rpm(), self.stream)
+        results = {}
+        if not tasks:
+            return results
+
+        def finish(future, task):
+            try:
+                response = future.result()
+            except Exception as e:
+                self.progress.report("FAIL", task.display, f": {str(e)[:100]}")
+                if on_result:
+                    on_result(task, None, e)
+                return
+            results[task.stored_key] = response
+            self.progress.report("PASS", task.display)
+            if on_result:
+                on_result(task, response, None)
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cache-gen")
+        futures = {}
+        finished = set()
+        try:
+            futures = {executor.submit(self._attempt, task): task for task in tasks}
+            for future in as_completed(futures):
+                finish(future, futures[future])
+                finished.add(future)
+        except KeyboardInterrupt:
+            print("\n[WARN] Interrupted - waiting for tasks in flight, skipping the rest", flush=True)
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Calls already paid for still reach on_result
+            for future, task in futures.items():
+                if future not in finished and future.done() and not future.cancelled():
+                    finish(future, task)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+        summary = self.progress.summary()
+        logger.info(
+            f"Generated {summary['done']}/{summary['total']} entries in "
+            f"{format_duration(summary['elapsed'])} ({summary['failed']} failed, {summary['retries']} retries)"
+        )
+        return results
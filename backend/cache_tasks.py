@@ -0,0 +1,285 @@
+"""
+Cache tasks - the demo cache entries generated for a paper, how each one
+is generated, and the version it is stored under.
+
+Each task also carries a hash of the paper content it is built from (a
+section, or the start of the paper). Caches record these hashes under
+SOURCES_KEY, so a regenerated PDF or a changed section extractor only
+costs API calls for the sections that actually changed.
+
+Shared by generate_cache.py, generate_single_cache.py and invalidate_cache.py.
+"""
+
+import json
+from functools import lru_cache
+from typing import Callable, Dict, List, Mapping, Optional
+from utils.cache_versions import fingerprint, versioned_key
+from utils.config import default_model
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXPLAIN_AGENTS = ["math", "code", "concept"]
+
+# Questions the generator asks; part of each entry's version
+EXPLAIN_QUERIES = {
+    "math": "Explain the mathematical concepts in the {section} section",
+    "code": "Explain the algorithms and implementation in the {section} section",
+    "concept": "Explain the key concepts in the {section} section",
+}
+QUIZ_QUERY = "Generate quiz questions"
+SECTION_QUIZ_QUERY = "Generate quiz questions for {section}"
+
+COMMON_QUESTIONS = [
+    "What is the main contribution of this paper?",
+    "What are the key innovations?",
+    "What are the limitations?",
+    "How does this compare to previous work?",
+    "What are the practical applications?"
+]
+
+# Paper text given to whole-paper quiz and chat tasks
+QUIZ_CONTENT_CHARS = 4000
+CHAT_CONTENT_CHARS = 3000
+
+# Reserved cache entry: JSON of stored key -> source content hash
+SOURCES_KEY = "_sources"
+
+GENERAL_CHAT = ("I'm ready to answer questions about '{title}'. Feel free to ask about any aspect - "
+                "the architecture, the math, the training process, or how it compares to other approaches!")
+
+
+@lru_cache(maxsize=None)
+def agent_version(agent: str) -> str:
+    """Fingerprint of an agent's model, instructions, prompt and parameters."""
+    from backend.agents.registry import get_registry
+    instance = get_registry().get(agent)
+    return fingerprint(
+        model=default_model(),
+        system_instruction=instance.system_instruction,
+        prompt_template=getattr(instance, "prompt_template", None),
+        params=instance.generation_params,
+        queries=EXPLAIN_QUERIES.get(agent) or (
+            [QUIZ_QUERY, SECTION_QUIZ_QUERY] if agent == "quiz" else None
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def live_version() -> str:
+    """Version of live answers, which may come from any agent or the whole-paper pipeline."""
+    from backend.agents.registry import get_registry
+    from backend import pipeline
+    return fingerprint(
+        agents={name: agent_version(name) for name in sorted(get_registry().names())},
+        pipeline=[pipeline.MAP_PROMPT, pipeline.COMBINE_PROMPT, pipeline.FINAL_PROMPT]
+    )
+
+
+def key_version(key: str) -> Optional[str]:
+    """
+    Current version for a cache key (None for entries that are not versioned).
+
+    Example:
+        key_version("explain_Abstract_math") -> version of the math agent
+    """
+    if key == "chat_general":
+        return None
+    if key.startswith("explain_"):
+        agent = key.rsplit("_", 1)[-1]
+        return agent_version(agent) if agent in EXPLAIN_AGENTS else None
+    if key.startswith("quiz_"):
+        return agent_version("quiz")
+    if key.startswith("chat_"):
+        return agent_version("chat")
+    if key.startswith("live_"):
+        return live_version()
+    return None
+
+
+def source_hash(content: str) -> str:
+    """Hash of the paper content an entry is generated from."""
+    return fingerprint(content=content)
+
+
+def read_sources(entries: Mapping) -> Dict[str, str]:
+    """Source hash per stored key, as recorded in a paper's cache entries."""
+    try:
+        return json.loads(entries.get(SOURCES_KEY) or "{}")
+    except ValueError:
+        return {}
+
+
+def sources_entry(entries: Mapping, tasks: List["CacheTask"]) -> str:
+    """
+    SOURCES_KEY value for a paper's entries after tasks were (re)generated.
+
+    Hashes of tasks whose entry exists replace the recorded ones; hashes of
+    entries no longer present are dropped.
+    """
+    sources = {key: value for key, value in read_sources(entries).items() if key in entries}
+    sources.update({task.stored_key: task.source for task in tasks if task.source and task.stored_key in entries})
+    return json.dumps(sources, sort_keys=True)
+
+
+def diff_sources(tasks: List["CacheTask"], entries: Mapping) -> Dict[str, List["CacheTask"]]:
+    """
+    Compare planned tasks with a paper's cached entries.
+
+    Returns:
+        Tasks by state: "new" (no entry), "changed" (entry built from other
+        content), "unchanged" and "untracked" (entry without a recorded hash)
+    """
+    sources = read_sources(entries)
+    states = {"new": [], "changed": [], "unchanged": [], "untracked": []}
+    for task in tasks:
+        if task.stored_key not in entries:
+            states["new"].append(task)
+        elif task.stored_key not in sources:
+            states["untracked"].append(task)
+        elif sources[task.stored_key] != task.source:
+            states["changed"].append(task)
+        else:
+            states["unchanged"].append(task)
+    return states
+
+
+def question_key(question: str) -> str:
+    """Cache key of a chat question."""
+    return f"chat_{question.lower().replace(' ', '_').replace('?', '')}"
+
+
+class CacheTask:
+    """One cache entry to generate."""
+
+    def __init__(
+        self,
+        key: str,
+        agent: str,
+        label: str,
+        run: Callable[[], str],
+        paper_id: Optional[str] = None,
+        source: Optional[str] = None,
+        priority: int = 0
+    ):
+        """
+        Args:
+            key: Cache key without version (e.g. "explain_Abstract_math")
+            agent: Agent that answers it
+            label: Short description for progress output
+            run: Makes the API call(s) and returns the response
+            paper_id: Paper whose cache the entry belongs to
+            source: source_hash of the content the entry is generated from
+            priority: Lower runs first when a run has a call budget
+        """
+        self.key = key
+        self.agent = agent
+        self.label = label
+        self.run = run
+        self.paper_id = paper_id
+        self.source = source
+        self.priority = priority
+        self.version = key_version(key)
+
+    @property
+    def display(self) -> str:
+        """Label prefixed with the paper id."""
+        return f"{self.paper_id}: {self.label}" if self.paper_id else self.label
+
+    @property
+    def stored_key(self) -> str:
+        """Key the response is stored under."""
+        return versioned_key(self.key, self.version)
+
+
+def plan_tasks(
+    paper_config: Dict,
+    parser,
+    manager=None,
+    section_quizzes: bool = True,
+    chat_questions: List[str] = COMMON_QUESTIONS,
+    question_bank: int = 0
+) -> List[CacheTask]:
+    """
+    List the API-generated cache entries for a paper.
+
+    Args:
+        paper_config: Paper entry from config.yaml
+        parser: PaperParser with sections extracted
+        manager: ManagerAgent for explanations (created if None)
+        section_quizzes: Include a quiz per section
+        chat_questions: Common questions to pre-answer
+        question_bank: Number of questions to derive from the paper's
+            headings and key terms (backend.question_bank), each answered
+            from its own section at a lower priority than the rest
+
+    Returns:
+        Tasks in generation order (explanations, quizzes, chat, question bank)
+    """
+    from backend.agents.registry import get_registry
+    if manager is None:
+        from backend.manager import ManagerAgent
+        manager = ManagerAgent()
+    quiz_agent = get_registry().get("quiz")
+    chat_agent = get_registry().get("chat")
+    paper_id = paper_config.get('id')
+
+    def explain(section, content, agent):
+        query = EXPLAIN_QUERIES[agent].format(section=section)
+        return lambda: manager.process_query(query, content, section=section, agent_type=agent)['response']
+
+    def quiz(query, content, section):
+        return lambda: quiz_agent.process(query, content, section=section)
+
+    def chat(question, content):
+        return lambda: chat_agent.chat(question, content, history=None, section=None)
+
+    quiz_content = parser.full_text[:QUIZ_CONTENT_CHARS]
+    chat_content = parser.full_text[:CHAT_CONTENT_CHARS]
+    section_sources = {name: source_hash(content) for name, content in parser.sections.items()}
+
+    tasks = []
+    for section_name, section_content in parser.sections.items():
+        for agent in EXPLAIN_AGENTS:
+            tasks.append(CacheTask(
+                f"explain_{section_name}_{agent}", agent,
+                f"{agent.capitalize()} explanation: {section_name}",
+                explain(section_name, section_content, agent), paper_id,
+                section_sources[section_name]
+            ))
+
+    tasks.append(CacheTask(
+        "quiz_general", "quiz", "General quiz",
+        quiz(QUIZ_QUERY, quiz_content, None), paper_id, source_hash(quiz_content)
+    ))
+    if section_quizzes:
+        for section_name, section_content in parser.sections.items():
+            tasks.append(CacheTask(
+                f"quiz_{section_name}", "quiz", f"Quiz for {section_name}",
+                quiz(SECTION_QUIZ_QUERY.format(section=section_name), section_content, section_name),
+                paper_id, section_sources[section_name]
+            ))
+
+    chat_source = source_hash(chat_content)
+    for question in chat_questions:
+        tasks.append(CacheTask(
+            question_key(question), "chat", question, chat(question, chat_content), paper_id, chat_source
+        ))
+
+    if question_bank:
+        from backend.question_bank import build_question_bank
+        bank = build_question_bank(parser.full_text, question_bank, exclude=chat_questions)
+        for rank, entry in enumerate(bank, 1):
+            content = entry.context or chat_content
+            tasks.append(CacheTask(
+                question_key(entry.question), "chat", entry.question, chat(entry.question, content),
+                paper_id, source_hash(content), priority=rank
+            ))
+
+    return tasks
+
+
+def static_entries(paper_config: Dict) -> Dict[str, str]:
+    """Cache entries that need no API call."""
+    return {"chat_general": GENERAL_CHAT.format(title=paper_config['title'])}
@@ -3,19 +3,91 @@ Manager Agent - Orchestrates routing to specialized agents.
 """
 
 import re
-from typing import Dict, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from utils.vertex_client import get_client
+from utils.config import get_config
+from utils.request_control import (
+    CancellationToken, DeadlineExceeded, RequestCancelled, cancellation_scope, current_token, submit
+)
+from utils.routing_cache import get_routing_cache
+from backend.router import get_router
+from backend.agents.registry import get_registry
+from backend.pipeline import MapReducePipeline
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Agents that take part in a fan-out, in the order their answers are merged
+FANOUT_SECTIONS = {
+    "concept": "🎯 Concepts & Architecture",
+    "math": "🧮 Mathematics",
+    "code": "💻 Algorithms & Implementation",
+}
+
+# Pool for fan-out agent runs. Separate from the API-call pool because each
+# agent run waits on API calls made there.
+_fanout_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="agent-fanout")
+
+
+class SpeculationStats:
+    """Outcome counters for speculative agent runs."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+    
+    def record(self, hit: bool, saved: float = 0.0):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.latency_saved += saved
+            else:
+                self.misses += 1
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "speculations": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "latency_saved": round(self.latency_saved, 3),
+                "mean_latency_saved": round(self.latency_saved / self.hits, 3) if self.hits else 0.0
+            }
+
+
+# Shared by all managers
+_speculation_stats = SpeculationStats()
+
 
 class ManagerAgent:
     """Manager agent that routes queries to specialized agents."""
     
-    def __init__(self):
-        self.client = get_client()
+    def __init__(self, api_key: Optional[str] = None):
+        """
+        Initialize manager.
+        
+        Args:
+            api_key: User's own API key (defaults to the service keys)
+        """
+        self.client = get_client(api_key=api_key)
+        
+        # Local classifier answers ambiguous cases when it is confident enough
+        self.router = get_router()
+        self.router_threshold = get_config().get("routing", {}).get("confidence_threshold", 0.999)
+        
+        # Decisions are shared across managers so a new API key keeps them
+        self.routing_cache = get_routing_cache()
+        
+        # Start the likely agent while the LLM routing call runs
+        self.speculate = get_config().get("routing", {}).get("speculate", True)
         
         # Routing patterns
         self.math_patterns = [
@@ -32,6 +104,13 @@ class ManagerAgent:
             r'quiz', r'question', r'test', r'study', r'exam'
         ]
     
+    def _detect_content(self, query: str, paper_content: str):
+        """Check whether the query or content involves math and/or code."""
+        text = query.lower() + (paper_content[:1000]).lower()  # Check first 1000 chars
+        has_math = any(re.search(pattern, text) for pattern in self.math_patterns)
+        has_code = any(re.search(pattern, text) for pattern in self.code_patterns)
+        return has_math, has_code
+    
     def route_query(
         self,
         query: str,
@@ -47,10 +126,35 @@ class ManagerAgent:
             section: Paper section if specified
             
         Returns:
-            Dict with 'agent' (which agent to use) and 'reasoning'
+            Dict with 'agent' (which agent to use), 'reasoning' and
+            'cached' (decision reused from an earlier identical query)
         """
+        routing = self._cached_or_local_route(query, paper_content)
+        if routing is None:
+            routing = self._llm_route(query, paper_content, section)
+        return routing
+    
+    def _cached_or_local_route(self, query: str, paper_content: str) -> Optional[Dict]:
+        """
+        Route without calling the LLM if possible.
+        
+        Returns:
+            Decision dict, or None if the LLM has to decide
+        """
+        cached = self.routing_cache.get(query, paper_content)
+        if cached is not None:
+            cached["cached"] = True
+            return cached
+        
+        routing = self._local_route(query, paper_content)
+        if routing is not None:
+            self.routing_cache.set(query, paper_content, routing)
+            routing["cached"] = False
+        return routing
+    
+    def _local_route(self, query: str, paper_content: str) -> Optional[Dict]:
+        """Pattern and classifier routing (None if the LLM has to decide)."""
         query_lower = query.lower()
-        content_lower = (paper_content[:1000]).lower()  # Check first 1000 chars
         
         # Check for quiz generation
         if any(re.search(pattern, query_lower) for pattern in self.quiz_patterns):
@@ -59,18 +163,37 @@ class ManagerAgent:
                 "reasoning": "User wants to generate study questions"
             }
         
-        # Check if content or query involves math
-        has_math = any(re.search(pattern, query_lower + content_lower) 
-                      for pattern in self.math_patterns)
-        
-        # Check if content or query involves code
-        has_code = any(re.search(pattern, query_lower + content_lower)
-                      for pattern in self.code_patterns)
+        has_math, has_code = self._detect_content(query, paper_content)
         
         # Routing logic
         if has_math and has_code:
-            # Use LLM to decide
-            routing_prompt = f"""Given this query and content, decide if it's primarily about:
+            # Try the local classifier first
+            if self.router is not None:
+                agent, confidence = self.router.predict(query, paper_content)
+                if confidence >= self.router_threshold:
+                    return {
+                        "agent": agent,
+                        "reasoning": f"Local router ({confidence:.0%} confident)"
+                    }
+            return None
+        
+        elif has_math:
+            return {"agent": "math", "reasoning": "Content involves mathematics"}
+        
+        elif has_code:
+            return {"agent": "code", "reasoning": "Content involves code/algorithms"}
+        
+        else:
+            return {"agent": "concept", "reasoning": "Content is conceptual"}
+    
+    def _llm_route(
+        self,
+        query: str,
+        paper_content: str,
+        section: Optional[str] = None
+    ) -> Dict:
+        """Ask the LLM to choose between math, code and concept."""
+        routing_prompt = f"""Given this query and content, decide if it's primarily about:
 1. MATH (equations, proofs, mathematical concepts)
 2. CODE (algorithms, implementation, pseudocode)
 3. CONCEPT (high-level ideas, architecture, motivation)
@@ -79,33 +202,39 @@ Query: {query}
 Content preview: {paper_content[:500]}
 
 Respond with just one word: MATH, CODE, or CONCEPT"""
+        
+        try:
+            decision = self.client.generate(
+                routing_prompt,
+                temperature=0.1,
+                max_tokens=10,
+                tags={"agent": "router", "section": section}
+            ).strip().upper()
             
-            try:
-                decision = self.client.generate(
-                    routing_prompt,
-                    temperature=0.1,
-                    max_tokens=10
-                ).strip().upper()
+            if decision == "MATH":
+                routing = {"agent": "math", "reasoning": "Content involves mathematical analysis"}
+            elif decision == "CODE":
+                routing = {"agent": "code", "reasoning": "Content involves algorithms/implementation"}
+            else:
+                routing = {"agent": "concept", "reasoning": "Content is conceptual"}
                 
-                if decision == "MATH":
-                    return {"agent": "math", "reasoning": "Content involves mathematical analysis"}
-                elif decision == "CODE":
-                    return {"agent": "code", "reasoning": "Content involves algorithms/implementation"}
-                else:
-                    return {"agent": "concept", "reasoning": "Content is conceptual"}
-                    
-            except:
-                # Fallback to concept
-                return {"agent": "concept", "reasoning": "Default to conceptual explanation"}
-        
-        elif has_math:
-            return {"agent": "math", "reasoning": "Content involves mathematics"}
+        except:
+            # Fallback to concept (not cached, the next attempt may succeed)
+            return {"agent": "concept", "reasoning": "Default to conceptual explanation", "cached": False}
         
-        elif has_code:
-            return {"agent": "code", "reasoning": "Content involves code/algorithms"}
+        self.routing_cache.set(query, paper_content, routing)
+        routing["cached"] = False
+        return routing
+    
+    def _likely_agent(self, query: str, paper_content: str) -> str:
+        """Best local guess when routing is ambiguous (for speculation)."""
+        if self.router is not None:
+            return self.router.predict(query, paper_content)[0]
         
-        else:
-            return {"agent": "concept", "reasoning": "Content is conceptual"}
+        text = query.lower() + (paper_content[:1000]).lower()
+        math_score = sum(1 for pattern in self.math_patterns if re.search(pattern, text))
+        code_score = sum(1 for pattern in self.code_patterns if re.search(pattern, text))
+        return "math" if math_score > code_score else "code"
     
     def process_query(
         self,
@@ -117,6 +246,10 @@ Respond with just one word: MATH, CODE, or CONCEPT"""
         """
         Process a query - route and get response.
         
+        When the LLM has to decide the route and speculation is enabled, the
+        most likely agent starts answering while the routing call runs. Its
+        answer is used if routing agrees and cancelled otherwise.
+        
         Args:
             query: User's question
             paper_content: Relevant paper content
@@ -124,36 +257,183 @@ Respond with just one word: MATH, CODE, or CONCEPT"""
             agent_type: Force specific agent (optional)
             
         Returns:
-            Dict with 'agent', 'response', 'reasoning'
+            Dict with 'agent', 'response', 'reasoning', 'routing_cached'
+            and 'speculated' (answer came from a speculative run)
         """
+        registry = get_registry()
+        
+        def answer(name):
+            # Shared agent instances - dispatch is a dictionary lookup
+            name = name if name in registry else "concept"
+            return registry.get(name).process(query, paper_content, section, client=self.client)
+        
         # Determine which agent to use
+        speculation = None
         if agent_type:
-            routing = {"agent": agent_type, "reasoning": "User specified"}
-        else:
-            routing = self.route_query(query, paper_content, section)
-        
-        logger.info(f"Routing to {routing['agent']} agent: {routing['reasoning']}")
-        
-        # Import and use the appropriate agent
-        from backend.agents.math_agent import MathAgent
-        from backend.agents.code_agent import CodeAgent
-        from backend.agents.concept_agent import ConceptAgent
-        from backend.agents.quiz_agent import QuizAgent
-        
-        if routing['agent'] == 'math':
-            agent = MathAgent()
-        elif routing['agent'] == 'code':
-            agent = CodeAgent()
-        elif routing['agent'] == 'quiz':
-            agent = QuizAgent()
+            routing = {"agent": agent_type, "reasoning": "User specified", "cached": False}
         else:
-            agent = ConceptAgent()
+            routing = self._cached_or_local_route(query, paper_content)
+            if routing is None:
+                if self.speculate:
+                    guess = self._likely_agent(query, paper_content)
+                    token = CancellationToken(parent=current_token())
+                    
+                    def run_guess():
+                        with cancellation_scope(token):
+                            start = time.perf_counter()
+                            return answer(guess), time.perf_counter() - start
+                    
+                    speculation = (guess, token, submit(run_guess, _fanout_executor))
+                    logger.info(f"Speculatively running {guess} agent during routing")
+                
+                routing_start = time.perf_counter()
+                routing = self._llm_route(query, paper_content, section)
+                routing_time = time.perf_counter() - routing_start
         
-        # Get response from agent
-        response = agent.process(query, paper_content, section)
+        cached_note = " (cached decision)" if routing['cached'] else ""
+        logger.info(f"Routing to {routing['agent']} agent: {routing['reasoning']}{cached_note}")
+        
+        response = None
+        speculated = False
+        if speculation is not None:
+            guess, token, future = speculation
+            if guess == routing['agent']:
+                try:
+                    response, agent_time = future.result()
+                    speculated = True
+                    # Sequential would have been routing_time + agent_time
+                    _speculation_stats.record(hit=True, saved=min(routing_time, agent_time))
+                except RequestCancelled:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Speculative {guess} run failed, retrying: {e}")
+                    _speculation_stats.record(hit=True, saved=0.0)
+            else:
+                token.cancel()
+                _speculation_stats.record(hit=False)
+                logger.info(f"Discarded speculative {guess} run (routed to {routing['agent']})")
+        
+        if response is None:
+            response = answer(routing['agent'])
         
         return {
             "agent": routing['agent'],
             "reasoning": routing['reasoning'],
+            "routing_cached": routing['cached'],
+            "speculated": speculated,
             "response": response
-        }
\ No newline at end of file
+        }
+    
+    def process_paper(
+        self,
+        query: str,
+        full_text: str,
+        section: Optional[str] = None,
+        agent_type: Optional[str] = None
+    ) -> Dict:
+        """
+        Answer a question about the whole paper with the map-reduce pipeline.
+        
+        Args:
+            query: User's question
+            full_text: Complete paper text
+            section: Paper section
+            agent_type: Force specific agent (otherwise routed on the query)
+            
+        Returns:
+            Dict with 'agent', 'response', 'reasoning', 'chunks' and
+            'cached_partials'
+        """
+        if agent_type:
+            routing = {"agent": agent_type, "reasoning": "User specified"}
+        else:
+            routing = self.route_query(query, full_text, section)
+        
+        # Quiz and chat build on one context; everything else maps over the paper
+        agent_name = routing['agent'] if routing['agent'] in FANOUT_SECTIONS else "concept"
+        result = MapReducePipeline(client=self.client).run(query, full_text, agent=agent_name)
+        
+        return {
+            "agent": agent_name,
+            "reasoning": f"{routing['reasoning']} (whole paper, {result['chunks']} chunks)",
+            "response": result['response'],
+            "chunks": result['chunks'],
+            "cached_partials": result['cached_partials']
+        }
+    
+    def process_fanout(
+        self,
+        query: str,
+        paper_content: str,
+        section: Optional[str] = None,
+        agents: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Run several specialist agents concurrently and merge their answers.
+        
+        Total latency is roughly that of the slowest agent.
+        
+        Args:
+            query: User's question
+            paper_content: Relevant paper content (shared by all agents)
+            section: Paper section
+            agents: Agents to run (default: concept, plus math/code when the
+                query or content involves them)
+            
+        Returns:
+            Dict with 'agent', 'agents', 'responses' (per agent), merged
+            'response', 'reasoning' and per-agent 'timings'
+        """
+        if agents is None:
+            has_math, has_code = self._detect_content(query, paper_content)
+            agents = ["concept"] + (["math"] if has_math else []) + (["code"] if has_code else [])
+        
+        registry = get_registry()
+        logger.info(f"Fanning out to agents: {', '.join(agents)}")
+        
+        def run(name):
+            start = time.perf_counter()
+            response = registry.get(name).process(query, paper_content, section, client=self.client)
+            return response, time.perf_counter() - start
+        
+        futures = {name: submit(lambda name=name: run(name), _fanout_executor) for name in agents}
+        
+        responses = {}
+        timings = {}
+        for name, future in futures.items():
+            try:
+                responses[name], timings[name] = future.result()
+            except (RequestCancelled, DeadlineExceeded):
+                raise
+            except Exception as e:
+                logger.error(f"{name} agent failed during fan-out: {e}")
+                responses[name] = f"_The {name} agent could not answer this time._"
+                timings[name] = None
+        
+        return {
+            "agent": "fanout",
+            "agents": agents,
+            "reasoning": f"Combined {len(agents)} specialist views",
+            "responses": responses,
+            "response": self.merge_responses(responses),
+            "timings": timings
+        }
+    
+    def routing_stats(self) -> Dict:
+        """Routing decision cache statistics (hits, misses, hit_rate, size)."""
+        return self.routing_cache.stats()
+    
+    def speculation_stats(self) -> Dict:
+        """Speculative execution statistics (hit_rate, latency saved)."""
+        return _speculation_stats.stats()
+    
+    def merge_responses(self, responses: Dict[str, str]) -> str:
+        """Merge per-agent answers into one sectioned markdown answer."""
+        ordered = [name for name in FANOUT_SECTIONS if name in responses]
+        ordered += [name for name in responses if name not in FANOUT_SECTIONS]
+        
+        parts = []
+        for name in ordered:
+            title = FANOUT_SECTIONS.get(name, f"{name.title()} Agent")
+            parts.append(f"### {title}\n\n{responses[name].strip()}")
+        return "\n\n---\n\n".join(parts)
@@ -2,31 +2,76 @@
 Mode Handler - Manages demo mode (cached) vs live mode (API) switching.
 """
 
+import contextlib
+import hashlib
+import json
 import os
 from typing import Dict, Optional
+from utils.cache_versions import versioned_key
+from utils.config import get_config
+from utils.llm_cache import refresh_cache
 from utils.response_cache import get_cache
-from backend.manager import ManagerAgent
-from backend.agents.chat_agent import ChatAgent
+from utils.routing_cache import normalize_query
+from utils.usage_tracker import usage_tags
+from utils.request_control import (
+    CancellationToken, DeadlineExceeded, RequestCancelled, cancellation_scope
+)
+from backend.cache_tasks import key_version
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Live-mode caching policies (response_cache.live_policy in config.yaml)
+READ_WRITE = "read_write"  # serve cached answers, store new ones
+WRITE_ONLY = "write_only"  # always generate, store the result
+OFF = "off"                # neither
+
+
+def live_cache_key(
+    query_type: str,
+    query: str,
+    section: Optional[str] = None,
+    whole_paper: bool = False,
+    history: Optional[list] = None
+) -> str:
+    """
+    Cache key for a live answer within one paper's cache.
+    
+    Papers are identified by content hash (see app.py), so the same PDF
+    uploaded by different users shares its answers. The key includes the
+    current version of the agents' prompts and model.
+    """
+    fingerprint = normalize_query(query)
+    if history:
+        fingerprint += json.dumps(history, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+    scope = f"{query_type}_paper" if whole_paper else query_type
+    key = f"live_{scope}_{section or 'all'}_{digest}"
+    # Answers from other prompts or models are stored under other versions
+    return versioned_key(key, key_version(key))
+
 
 class ModeHandler:
     """Handles switching between demo and live modes."""
     
-    def __init__(self, mode: str = None):
+    def __init__(self, mode: str = None, api_key: Optional[str] = None):
         """
         Initialize mode handler.
         
         Args:
             mode: "demo" or "live" (defaults to environment variable APP_MODE)
+            api_key: This session's own API key (defaults to the service keys)
         """
         self.mode = mode or os.getenv("APP_MODE", "demo")
+        self.api_key = api_key
         self.cache = get_cache()
+        # Only serve entries generated with the current prompts and model
+        self.cache.set_key_versions(key_version)
         self.manager = None  # Lazy initialization
-        self.chat_agent = None  # Lazy initialization
+        self.client = None  # Lazy initialization (bound to this session's key)
+        self._cancel_token = None  # Token of the live request in progress
+        self.force_refresh = False  # Skip cached answers in live mode
         
         logger.info(f"Initialized in {self.mode} mode")
     
@@ -37,13 +82,64 @@ class ModeHandler:
         self.mode = mode
         logger.info(f"Switched to {mode} mode")
     
+    def set_api_key(self, api_key: Optional[str]):
+        """Use a different API key for this session's live requests."""
+        if api_key == self.api_key:
+            return
+        self.api_key = api_key
+        # Rebuilt on next use with a client for the new key
+        self.manager = None
+        self.client = None
+        logger.info("Switched API key")
+    
+    def live_policy(self, query_type: str) -> str:
+        """Caching policy for live answers of a query type."""
+        policies = get_config().get("response_cache", {}).get("live_policy", {}) or {}
+        return policies.get(query_type, policies.get("default", READ_WRITE))
+    
+    def _cached_live(
+        self,
+        paper_id: str,
+        key: str,
+        query_type: str,
+        force_refresh: Optional[bool]
+    ) -> Optional[str]:
+        """Stored live answer, if the policy allows serving it."""
+        if force_refresh is None:
+            force_refresh = self.force_refresh
+        # Demo mode cannot generate, so any stored answer is better than none
+        if self.mode == "live" and (force_refresh or self.live_policy(query_type) != READ_WRITE):
+            return None
+        response = self.cache.get_entry(paper_id, key)
+        if response:
+            logger.info(f"Live cache hit: {paper_id}/{key}")
+        return response
+    
+    def _store_live(self, paper_id: str, key: str, query_type: str, response: str):
+        """Write a fresh live answer through to the response cache."""
+        from utils.vertex_client import FallbackText
+        if not response or isinstance(response, FallbackText) or self.live_policy(query_type) == OFF:
+            return
+        try:
+            self.cache.set_entry(paper_id, key, response)
+        except Exception as e:
+            logger.error(f"Could not cache live answer for {paper_id}: {e}")
+    
+    def cancel(self):
+        """Cancel the live request in progress, if any."""
+        if self._cancel_token is not None:
+            self._cancel_token.cancel()
+            logger.info("Cancelled in-flight request")
+    
     def process_query(
         self,
         paper_id: str,
         query: str,
         paper_content: str,
         query_type: str = "explain",
-        section: Optional[str] = None
+        section: Optional[str] = None,
+        whole_paper: bool = False,
+        force_refresh: Optional[bool] = None
     ) -> Dict:
         """
         Process a query in either demo or live mode.
@@ -52,12 +148,27 @@ class ModeHandler:
             paper_id: ID of the paper (e.g., "attention")
             query: User's question
             paper_content: Relevant paper content
-            query_type: "explain", "quiz", "chat", etc.
+            query_type: "explain", "quiz", "chat", etc. ("all" runs the math,
+                code and concept agents concurrently and merges their answers)
             section: Paper section if applicable
+            whole_paper: paper_content is the full text; answer with the
+                map-reduce pipeline instead of the leading excerpt (live only)
+            force_refresh: Generate a new answer even if one is cached
+                (defaults to self.force_refresh)
             
         Returns:
-            Dict with 'response', 'mode', 'agent' (if live)
+            Dict with 'response', 'mode', 'cached', 'agent' (if live)
         """
+        live_key = live_cache_key(query_type, query, section, whole_paper=whole_paper)
+        cached_response = self._cached_live(paper_id, live_key, query_type, force_refresh)
+        if cached_response:
+            return {
+                "response": cached_response,
+                "mode": self.mode,
+                "agent": query_type,
+                "cached": True
+            }
+        
         # Try demo mode first if enabled
         if self.mode == "demo":
             cached_response = self.cache.get_response(
@@ -92,8 +203,10 @@ class ModeHandler:
         
         # Live mode - use actual agents
         if not self.manager:
+            # Imported on first live request so demo mode never loads the Gemini SDK
+            from backend.manager import ManagerAgent
             try:
-                self.manager = ManagerAgent()
+                self.manager = ManagerAgent(api_key=self.api_key)
             except ValueError as e:
                 # API key not configured
                 return {
@@ -103,20 +216,63 @@ class ModeHandler:
                     "error": str(e)
                 }
         
-        result = self.manager.process_query(
-            query,
-            paper_content,
-            section,
-            agent_type=query_type if query_type != "explain" else None
-        )
+        refresh = self.force_refresh if force_refresh is None else force_refresh
+        token = self._cancel_token = CancellationToken()
+        try:
+            with usage_tags(paper_id=paper_id, mode=self.mode, section=section), \
+                    cancellation_scope(token), \
+                    (refresh_cache() if refresh else contextlib.nullcontext()):
+                if query_type == "all":
+                    result = self.manager.process_fanout(query, paper_content, section)
+                elif whole_paper:
+                    result = self.manager.process_paper(
+                        query,
+                        paper_content,
+                        section,
+                        agent_type=query_type if query_type != "explain" else None
+                    )
+                else:
+                    result = self.manager.process_query(
+                        query,
+                        paper_content,
+                        section,
+                        agent_type=query_type if query_type != "explain" else None
+                    )
+        except DeadlineExceeded as e:
+            return {
+                "response": "⏱️ The AI service is taking too long to respond. Please try again in a moment.",
+                "mode": "live",
+                "cached": False,
+                "error": str(e)
+            }
+        except RequestCancelled as e:
+            return {
+                "response": "Request cancelled.",
+                "mode": "live",
+                "cached": False,
+                "error": str(e)
+            }
+        finally:
+            # A newer request may already have replaced the token
+            if self._cancel_token is token:
+                self._cancel_token = None
         
-        return {
+        self._store_live(paper_id, live_key, query_type, result['response'])
+        
+        response = {
             "response": result['response'],
             "mode": "live",
             "agent": result['agent'],
             "reasoning": result['reasoning'],
             "cached": False
         }
+        if "agents" in result:
+            response["agents"] = result["agents"]
+        if result.get("routing_cached"):
+            response["routing_cached"] = True
+        if result.get("speculated"):
+            response["speculated"] = True
+        return response
     
     def chat(
         self,
@@ -124,7 +280,8 @@ class ModeHandler:
         query: str,
         paper_content: str,
         history: list = None,
-        section: Optional[str] = None
+        section: Optional[str] = None,
+        force_refresh: Optional[bool] = None
     ) -> Dict:
         """
         Handle chat queries.
@@ -135,10 +292,21 @@ class ModeHandler:
             paper_content: Paper content
             history: Conversation history
             section: Current section
+            force_refresh: Generate a new answer even if one is cached
+                (defaults to self.force_refresh)
             
         Returns:
             Dict with response
         """
+        live_key = live_cache_key("chat", query, section, history=history)
+        cached_response = self._cached_live(paper_id, live_key, "chat", force_refresh)
+        if cached_response:
+            return {
+                "response": cached_response,
+                "mode": self.mode,
+                "cached": True
+            }
+        
         # Try demo mode cache first
         if self.mode == "demo":
             cached_response = self.cache.get_response(
@@ -169,16 +337,53 @@ class ModeHandler:
                     "cached": False
                 }
         
-        # Live mode - use chat agent
-        if not self.chat_agent:
-            self.chat_agent = ChatAgent()
+        # Live mode - use the shared chat agent
+        from backend.agents.registry import get_registry
+        if not self.client:
+            from utils.vertex_client import get_client
+            try:
+                self.client = get_client(api_key=self.api_key)
+            except ValueError as e:
+                return {
+                    "response": "⚠️ API key not configured. Please add your Google AI Studio API key in the sidebar to use Live mode.",
+                    "mode": "live",
+                    "cached": False,
+                    "error": str(e)
+                }
+        
+        refresh = self.force_refresh if force_refresh is None else force_refresh
+        token = self._cancel_token = CancellationToken()
+        try:
+            with usage_tags(paper_id=paper_id, mode=self.mode, section=section), \
+                    cancellation_scope(token), \
+                    (refresh_cache() if refresh else contextlib.nullcontext()):
+                response = get_registry().get("chat").chat(
+                    query,
+                    paper_content,
+                    history,
+                    section,
+                    client=self.client
+                )
+        except DeadlineExceeded as e:
+            return {
+                "response": "⏱️ The AI service is taking too long to respond. Please try again in a moment.",
+                "mode": "live",
+                "cached": False,
+                "error": str(e)
+            }
+        except RequestCancelled as e:
+            return {
+                "response": "Request cancelled.",
+                "mode": "live",
+                "cached": False,
+                "error": str(e)
+            }
+        finally:
+            # A newer request may already have replaced the token
+            if self._cancel_token is token:
+                self._cancel_token = None
         
-        response = self.chat_agent.chat(
-            query,
-            paper_content,
-            history,
-            section
-        )
+        self._store_live(paper_id, live_key, "chat", response)
         
         return {
             "response": response,
@@ -0,0 +1,248 @@
+"""
+Map-reduce pipeline - explains a whole paper instead of its first few pages.
+
+The map step runs an agent's expertise over every chunk concurrently and
+caches each partial by chunk hash; the reduce step merges partials
+hierarchically into one answer. Re-running on an unchanged paper only
+redoes the reduce step.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from utils.vertex_client import FallbackText, GeminiClient, get_client, request_key
+from utils.llm_cache import get_llm_cache
+from utils.config import get_config
+from utils.request_control import submit
+from backend.agents.registry import get_registry
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pool for map/reduce tasks. Separate from the API-call pool because each
+# task waits on API calls made there.
+_pipeline_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="map-reduce")
+
+MAP_PROMPT = """You are reading one excerpt ({index} of {total}) of a research paper.
+
+Excerpt:
+{chunk}
+
+Question about the whole paper: {query}
+
+Write concise notes on everything in this excerpt that helps answer the question. Keep equations, algorithm steps and key numbers exactly. If the excerpt is irrelevant, reply with "No relevant content."
+"""
+
+# Generation parameters of map calls (part of each cached partial's key)
+MAP_PARAMS = {"temperature": 0.3, "max_tokens": 1024}
+
+COMBINE_PROMPT = """Below are notes taken from consecutive excerpts of a research paper.
+
+{partials}
+
+Question about the whole paper: {query}
+
+Merge these notes into one set of notes. Remove repetition, keep every distinct fact, equation and algorithm step, and keep the paper's order.
+"""
+
+FINAL_PROMPT = """The user is studying a research paper. Below are notes covering the whole paper, in order.
+
+{partials}
+
+User Question: {query}
+
+Answer the question using the notes, in the style described in your instructions. Cover the whole paper, not just its beginning.
+"""
+
+
+def chunk_text(text: str, chunk_chars: int = 3500) -> List[str]:
+    """
+    Split text into chunks of at most chunk_chars, on paragraph boundaries.
+
+    Paragraphs longer than chunk_chars are split on sentence ends, then hard.
+    """
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > chunk_chars:
+            cut = paragraph.rfind(". ", 0, chunk_chars)
+            cut = cut + 1 if cut > chunk_chars // 2 else chunk_chars
+            pieces.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > chunk_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_hash(chunk: str) -> str:
+    """Content hash identifying a chunk."""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+class MapReducePipeline:
+    """Runs an agent over every chunk of a paper and merges the results."""
+
+    def __init__(
+        self,
+        client: Optional[GeminiClient] = None,
+        chunk_chars: Optional[int] = None,
+        fan_in: Optional[int] = None,
+        max_concurrency: Optional[int] = None
+    ):
+        """
+        Initialize pipeline.
+
+        Args:
+            client: Client to call (defaults to the service client)
+            chunk_chars: Maximum characters per chunk
+            fan_in: Partials merged per reduce call
+            max_concurrency: Map/reduce calls in flight at once (the client's
+                rate limiter still applies on top)
+        """
+        settings = get_config().get("pipeline", {})
+        self.client = client
+        self.chunk_chars = chunk_chars or settings.get("chunk_chars", 3500)
+        self.fan_in = max(2, fan_in or settings.get("fan_in", 4))
+        self.max_concurrency = max_concurrency or settings.get("max_concurrency", 4)
+        self.cache = get_llm_cache()
+
+    def _client(self) -> GeminiClient:
+        return self.client or get_client()
+
+    def _partial_key(self, agent: str, system_instruction: str, query: str, chunk: str) -> str:
+        """
+        Cache key of a map partial: everything that shapes it except the
+        chunk's position, so a prompt, instruction, parameter or model
+        change never serves a stale partial.
+        """
+        return request_key(
+            stage="map",
+            model=getattr(self._client(), "model_name", None),
+            agent=agent,
+            prompt=MAP_PROMPT,
+            system_instruction=system_instruction,
+            params=MAP_PARAMS,
+            query=query,
+            chunk=chunk_hash(chunk)
+        )
+
+    def _run_all(self, tasks: List) -> List[str]:
+        """Run zero-argument tasks with at most max_concurrency in flight; results in order."""
+        slots = threading.BoundedSemaphore(self.max_concurrency)
+
+        def bounded(task):
+            with slots:
+                return task()
+
+        futures = [submit(lambda task=task: bounded(task), _pipeline_executor) for task in tasks]
+        return [future.result() for future in futures]
+
+    def map(self, query: str, chunks: List[str], agent: str) -> Dict:
+        """
+        Take notes on every chunk, reusing cached partials.
+
+        Returns:
+            Dict with 'partials' (in chunk order) and 'cached' (count reused)
+        """
+        system_instruction = get_registry().get(agent).system_instruction
+        partials = [None] * len(chunks)
+        pending = []
+
+        for index, chunk in enumerate(chunks):
+            cached = self.cache.get(self._partial_key(agent, system_instruction, query, chunk))
+            if cached is not None:
+                partials[index] = cached
+            else:
+                pending.append(index)
+
+        def map_chunk(index):
+            chunk = chunks[index]
+            partial = self._client().generate(
+                MAP_PROMPT.format(index=index + 1, total=len(chunks), chunk=chunk, query=query),
+                system_instruction=system_instruction,
+                tags={"agent": agent, "section": "map"},
+                use_cache=False,
+                **MAP_PARAMS
+            )
+            if partial and not isinstance(partial, FallbackText):
+                self.cache.set(self._partial_key(agent, system_instruction, query, chunk), partial)
+            return partial
+
+        results = self._run_all([lambda index=index: map_chunk(index) for index in pending])
+        for index, partial in zip(pending, results):
+            partials[index] = partial
+
+        return {"partials": partials, "cached": len(chunks) - len(pending)}
+
+    def reduce(self, query: str, partials: List[str], agent: str) -> str:
+        """Merge partials fan_in at a time until one final answer remains."""
+        system_instruction = get_registry().get(agent).system_instruction
+        client = self._client()
+
+        def join(group):
+            return "\n\n".join(f"--- Notes {i + 1} ---\n{p}" for i, p in enumerate(group))
+
+        def combine(group):
+            return client.generate(
+                COMBINE_PROMPT.format(partials=join(group), query=query),
+                temperature=0.3,
+                max_tokens=2048,
+                tags={"agent": agent, "section": "reduce"},
+                use_cache=False
+            )
+
+        level = [p for p in partials if p and not isinstance(p, FallbackText)] or list(partials)
+        while len(level) > self.fan_in:
+            groups = [level[i:i + self.fan_in] for i in range(0, len(level), self.fan_in)]
+            level = self._run_all([lambda group=group: combine(group) for group in groups])
+
+        return client.generate(
+            FINAL_PROMPT.format(partials=join(level), query=query),
+            system_instruction=system_instruction,
+            temperature=0.7,
+            max_tokens=2048,
+            tags={"agent": agent, "section": "reduce"},
+            use_cache=False
+        )
+
+    def run(self, query: str, text: str, agent: str = "concept") -> Dict:
+        """
+        Answer a question about a whole paper.
+
+        Args:
+            query: User's question
+            text: Full paper text
+            agent: Agent whose expertise (system instruction) is applied
+
+        Returns:
+            Dict with 'response', 'chunks', 'cached_partials' and 'elapsed'
+        """
+        start = time.perf_counter()
+        chunks = chunk_text(text, self.chunk_chars)
+        mapped = self.map(query, chunks, agent)
+        logger.info(
+            f"Mapped {len(chunks)} chunks with {agent} agent "
+            f"({mapped['cached']} partials from cache)"
+        )
+        response = self.reduce(query, mapped["partials"], agent)
+        return {
+            "response": response,
+            "chunks": len(chunks),
+            "cached_partials": mapped["cached"],
+            "elapsed": time.perf_counter() - start
+        }
@@ -0,0 +1,366 @@
+"""
+Question bank - chat questions derived from a paper so demo mode can
+answer more than a handful of hand-picked ones.
+
+Questions come from three places, in priority order:
+
+- Paper-level templates ("What problem does this paper solve?")
+- Numbered headings of the paper text ("3.2.2 Multi-Head Attention"),
+  each answered from its own section of the paper. Only headings naming
+  a single technique get "What is ...?" questions; plural, compound and
+  qualified headings ("Encoder and Decoder Stacks", "Main Evaluation")
+  are asked about as parts of the paper
+- Frequent acronyms ("BLEU", "ReLU"), answered from the section that
+  mentions them most
+
+PDF text often loses its spaces ("ScaledDot-ProductAttention"), so
+headings are re-segmented with a vocabulary built from the paper's own
+words. Everything here is local; answering the questions is left to the
+cache generator (see backend.cache_tasks.plan_tasks), and
+`generate_cache.py --dry-run` lists them for review before any call.
+"""
+
+import re
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAPER_QUESTIONS = [
+    "What problem does this paper solve?",
+    "What is the motivation behind this work?",
+    "What are the main results?",
+    "How is the method evaluated?",
+    "Which datasets are used?",
+    "How is the model trained?",
+    "What are the main assumptions?",
+    "What future work do the authors suggest?",
+    "Can you summarize the paper in simple terms?",
+    "What are the most important equations?",
+]
+
+# Headings of subsections name a technique; top-level ones a part of the paper
+TECHNIQUE_TEMPLATES = ["What is {term}?", "How does {term} work?", "Why is {term} used?"]
+PART_TEMPLATES = ["What does the paper say about {term}?"]
+ACRONYM_TEMPLATES = ["What is {term}?", "How is {term} used in this paper?"]
+
+# Headings with nothing to ask about (or covered by PAPER_QUESTIONS)
+SKIP_HEADINGS = {
+    "introduction", "conclusion", "conclusions", "references", "acknowledgments",
+    "acknowledgements", "appendix", "related work", "discussion", "abstract",
+    "background", "results", "experiments"
+}
+
+# Heading words that make it a part of the paper rather than a technique
+PART_WORDS = {"and", "of", "in", "on", "for", "with", "our", "the", "to", "from"}
+PART_QUALIFIERS = {"main", "overall", "qualitative", "quantitative", "further", "additional", "details"}
+# Qualifiers dropped from the question ("Main Evaluation" -> "evaluation")
+DROP_QUALIFIERS = {"main", "overall", "further", "additional"}
+# Subsections of these report what was done rather than name techniques
+# ("5.3 Optimizer", "6.1 Machine Translation")
+PART_SECTIONS = {"training", "results", "experiments", "evaluation", "experimental setup"}
+# Headings that are questions themselves ("Why Self-Attention")
+QUESTION_WORDS = {"why", "how", "what", "when", "which"}
+
+# Frequent capitalized tokens that are not concepts of the paper
+SKIP_ACRONYMS = {
+    "II", "III", "IV", "VI", "VII", "VIII", "IX", "XI", "XII",
+    "ICML", "NIPS", "ICLR", "IEEE", "CVPR", "ICCV", "ECCV", "ACL", "EMNLP", "NAACL",
+    "AAAI", "IJCAI", "JMLR", "CORR", "URL", "PDF", "ID", "PP", "CA", "USA", "UK", "ACM",
+}
+
+HEADING_PATTERN = re.compile(r"(?m)^[ \t]*(\d{1,2}(?:\.\d{1,2}){0,2})\.?[ \t]+([A-Z][A-Za-z\-]{2,}(?:[ \t]+[A-Za-z\-]+){0,5})[ \t]*$")
+# Capitals with at most one lowercase letter inside ("BLEU", "ReLU"), plural s
+# dropped; not next to < or > (figure tokens such as "<EOS>")
+ACRONYM_PATTERN = re.compile(r"(?<![A-Za-z<>])([A-Z][a-z]?[A-Z][A-Z0-9]*)s?(?![A-Za-z<>])")
+# Title-case words, acronyms (plural s kept) and lowercase runs of a squashed heading
+CAMEL_PATTERN = re.compile(r"[A-Z]{2,}(?:s(?![a-z]))?(?![a-z])|[A-Z]?[a-z]+|[A-Z]")
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+# Spaced-out words count as vocabulary once seen this often
+MIN_WORD_COUNT = 2
+MIN_WORD_CHARS = 4
+MAX_WORD_CHARS = 16
+MIN_ACRONYM_COUNT = 3
+# Shorter acronyms ("PE", "EN") are kept only when the paper defines them: "(RL)"
+MIN_ACRONYM_CHARS = 3
+MAX_QUESTION_WORDS = 12
+SECTION_CHARS = 3000
+
+# Lowercase words that lose their spaces inside title-case headings; the
+# safe ones end few other words
+GLUED_WORDS = ("and", "of", "the", "on", "in", "for", "with", "our")
+SAFE_GLUED_WORDS = ("and", "of", "the")
+
+
+class BankQuestion:
+    """A derived question and the paper text it should be answered from."""
+
+    def __init__(self, question: str, context: Optional[str] = None, kind: str = "paper"):
+        """
+        Args:
+            question: Question text
+            context: Section text to answer from (None for the start of the paper)
+            kind: "paper", "heading" or "acronym"
+        """
+        self.question = question
+        self.context = context
+        self.kind = kind
+
+    def __repr__(self) -> str:
+        return f"BankQuestion({self.question!r}, {self.kind})"
+
+
+def vocabulary(text: str) -> Counter:
+    """Counts of the paper's words seen with spaces around them."""
+    words = Counter(
+        word for word in WORD_PATTERN.findall(text.lower())
+        if MIN_WORD_CHARS <= len(word) <= MAX_WORD_CHARS
+    )
+    return Counter({word: count for word, count in words.items() if count >= MIN_WORD_COUNT})
+
+
+def segment(title: str, vocab: Counter, acronyms: Iterable[str] = ()) -> str:
+    """
+    Restore the spaces a squashed heading lost, keeping case and hyphens.
+
+    Words are split at case changes, known acronyms are kept whole and
+    glued "and", "of" and "the" are split off.
+
+    Example:
+        segment("ScaledDot-ProductAttention", vocab) -> "Scaled Dot-Product Attention"
+        segment("TrainingDataandBatching", vocab) -> "Training Data and Batching"
+    """
+    acronyms = set(acronyms)
+    # (piece, separator before it) over the whole title
+    pieces: List[Tuple[str, str]] = []
+    for chunk in title.split():
+        for part_index, part in enumerate(chunk.split("-")):
+            separator = "-" if part_index else " "
+            for piece in CAMEL_PATTERN.findall(part):
+                # Rejoin acronyms split at a case change ("Re" + "LU")
+                if pieces and separator == "" and (pieces[-1][0] + piece) in acronyms:
+                    pieces[-1] = (pieces[-1][0] + piece, pieces[-1][1])
+                else:
+                    pieces.append((piece, separator))
+                separator = ""
+
+    text = ""
+    for index, (piece, separator) in enumerate(pieces):
+        words = _split_glued(piece, vocab, followed=index + 1 < len(pieces))
+        if text:
+            text += separator or " "
+        text += " ".join(words)
+    return text
+
+
+def _split_glued(word: str, vocab: Counter, followed: bool) -> List[str]:
+    """
+    Split lowercase function words off a word they were glued to.
+
+    Title-case headings only lose spaces around lowercase words. "and",
+    "of" and "the" are split off after at least MIN_WORD_CHARS letters;
+    words such as "on" or "in" end too many words ("Position"), so they are
+    only split off a word of the paper's vocabulary. What follows must be
+    another title-case word ("Dataand Batching"), a word of the paper
+    ("Detailsoflearning") or more glued words ("Attentioninour Model").
+
+    Example:
+        _split_glued("Encoderand", vocab, followed=True) -> ["Encoder", "and"]
+    """
+    lower = word.lower()
+    for glued in GLUED_WORDS:
+        index = lower.find(glued, MIN_WORD_CHARS)
+        while index != -1:
+            head, rest = lower[:index], lower[index + len(glued):]
+            if glued in SAFE_GLUED_WORDS or head in vocab:
+                tail = _split_glued(word[index + len(glued):], vocab, followed) if rest else []
+                if (not rest and followed) or rest in vocab or len(tail) > 1 or (rest in GLUED_WORDS and followed):
+                    return [word[:index], word[index:index + len(glued)]] + tail
+            index = lower.find(glued, index + 1)
+    return [word]
+
+
+def find_headings(text: str) -> List[Tuple[str, str, str]]:
+    """
+    Numbered headings of the paper with the text under each.
+
+    Returns:
+        (number, raw title, section text) in document order; a number seen
+        twice (figure labels, tables) keeps its first occurrence
+    """
+    matches = []
+    seen = set()
+    for match in HEADING_PATTERN.finditer(text):
+        number, title = match.group(1), match.group(2).strip()
+        if number in seen or int(number.split(".")[0]) == 0:
+            continue
+        seen.add(number)
+        matches.append((number, title, match.start()))
+
+    headings = []
+    for i, (number, title, start) in enumerate(matches):
+        # A section runs until the next heading at its level or above
+        depth = number.count(".")
+        end = next(
+            (match_start for other, _, match_start in matches[i + 1:] if other.count(".") <= depth),
+            len(text)
+        )
+        headings.append((number, title, text[start:end].strip()[:SECTION_CHARS]))
+    return headings
+
+
+def find_acronyms(text: str) -> List[Tuple[str, int]]:
+    """
+    Acronyms used at least MIN_ACRONYM_COUNT times, most frequent first.
+
+    Acronyms shorter than MIN_ACRONYM_CHARS must also be defined in
+    parentheses somewhere ("reinforcement learning (RL)").
+    """
+    counts = Counter(
+        acronym for acronym in ACRONYM_PATTERN.findall(text)
+        if acronym.upper() not in SKIP_ACRONYMS and not acronym.isdigit()
+    )
+    return [
+        (acronym, count) for acronym, count in counts.most_common()
+        if count >= MIN_ACRONYM_COUNT
+        and (len(acronym) >= MIN_ACRONYM_CHARS or re.search(rf"\({acronym}s?\)", text))
+    ]
+
+
+def heading_kind(term: str) -> Optional[str]:
+    """
+    How to ask about a segmented heading.
+
+    Returns:
+        "technique" for a single singular noun phrase ("Multi-Head
+        Attention"), "part" for plural, compound or qualified headings
+        ("Encoder and Decoder Stacks", "Main Evaluation"), None for
+        headings not worth a question
+
+    Example:
+        heading_kind("Scaled Dot-Product Attention") -> "technique"
+        heading_kind("Training Data and Batching") -> "part"
+    """
+    words = term.split()
+    lower = [word.lower() for word in words]
+    if not words or term.lower() in SKIP_HEADINGS or lower[0] in QUESTION_WORDS:
+        return None
+    last = words[-1].split("-")[-1]
+    plural = last.endswith("s") and not last.endswith(("ss", "us", "is"))
+    if plural or PART_WORDS.intersection(lower) or lower[0] in PART_QUALIFIERS:
+        return "part"
+    return "technique"
+
+
+def phrase(term: str) -> str:
+    """
+    A heading as it reads inside a sentence: title-case words lowercased,
+    acronyms and mixed-case words kept.
+
+    Example:
+        phrase("Scaled Dot-Product Attention") -> "scaled dot-product attention"
+        phrase("ReLU Nonlinearity") -> "ReLU nonlinearity"
+    """
+    def lower(part):
+        return part.lower() if part.istitle() else part
+    return " ".join("-".join(lower(part) for part in word.split("-")) for word in term.split())
+
+
+def is_askable(question: str) -> bool:
+    """
+    Last check before a question costs an API call: a handful of words,
+    no repeated word ("about about") and no bare numbers left over from
+    a bad heading match.
+    """
+    words = [word.lower() for word in question.rstrip("?").split()]
+    return (
+        2 < len(words) <= MAX_QUESTION_WORDS
+        and all(word != following for word, following in zip(words, words[1:]))
+        and not any(word.isdigit() for word in words)
+    )
+
+
+def _context_for(term: str, headings: List[Tuple[str, str, str]]) -> Optional[str]:
+    """Text of the heading section mentioning term most often."""
+    best = max(headings, key=lambda heading: heading[2].count(term), default=None)
+    return best[2] if best is not None and term in best[2] else None
+
+
+def build_question_bank(
+    full_text: str,
+    limit: int,
+    exclude: Iterable[str] = ()
+) -> List[BankQuestion]:
+    """
+    Derive up to limit questions from a paper, most useful first.
+
+    Args:
+        full_text: Extracted paper text
+        limit: Maximum number of questions
+        exclude: Questions already asked elsewhere (compared case-insensitively)
+
+    Returns:
+        Paper-level questions, then heading and acronym questions
+        interleaved, each with the text it should be answered from
+    """
+    vocab = vocabulary(full_text)
+    headings = find_headings(full_text)
+    acronyms = find_acronyms(full_text)
+    seen = {question.lower().rstrip("?") for question in exclude}
+    bank: List[BankQuestion] = []
+
+    def add(question: BankQuestion):
+        key = question.question.lower().rstrip("?")
+        if not is_askable(question.question):
+            logger.debug(f"Question bank: skipped {question.question!r}")
+            return
+        if key not in seen and len(bank) < limit:
+            seen.add(key)
+            bank.append(question)
+
+    for question in PAPER_QUESTIONS:
+        add(BankQuestion(question))
+
+    # One question per heading and acronym first, further templates after
+    heading_terms = []
+    parent = ""
+    for number, title, section in headings:
+        term = segment(title, vocab, (acronym for acronym, _ in acronyms))
+        if "." not in number:
+            parent = term.lower()
+        kind = heading_kind(term)
+        if kind is None or len(term) > 60:
+            continue
+        # Top-level headings and subsections of results name parts of the
+        # paper even when singular
+        if kind == "technique" and ("." not in number or parent in PART_SECTIONS):
+            kind = "part"
+        templates = TECHNIQUE_TEMPLATES if kind == "technique" else PART_TEMPLATES
+        words = phrase(term).split()
+        if len(words) > 1 and words[0] in DROP_QUALIFIERS:
+            words = words[1:]
+        heading_terms.append((" ".join(words), templates, section))
+    heading_names = {term.lower() for term, _, _ in heading_terms}
+    acronym_terms = [
+        (acronym, ACRONYM_TEMPLATES, _context_for(acronym, headings))
+        for acronym, _ in acronyms
+        if acronym.lower() not in heading_names
+    ]
+
+    rounds = max((len(templates) for _, templates, _ in heading_terms + acronym_terms), default=0)
+    for round_index in range(rounds):
+        for (term, templates, context), kind in (
+            [(entry, "heading") for entry in heading_terms] +
+            [(entry, "acronym") for entry in acronym_terms]
+        ):
+            if round_index < len(templates):
+                add(BankQuestion(templates[round_index].format(term=term), context, kind))
+
+    logger.info(
+        f"Question bank: {len(bank)} questions from {len(heading_terms)} headings "
+        f"and {len(acronym_terms)} acronyms"
+    )
+    return bank
@@ -0,0 +1,171 @@
+"""
+Local query router - multinomial naive Bayes over query and content n-grams.
+
+Replaces the LLM routing call in ManagerAgent when the classifier is
+confident enough.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data", "routing", "examples.json"
+)
+
+# Common words that carry no routing signal
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are",
+    "was", "be", "this", "that", "it", "its", "with", "by", "as", "at", "from",
+    "me", "my", "i", "you", "can", "do", "does", "what", "which", "how", "why",
+    "paper", "explain", "section", "used", "use", "here", "these", "those"
+}
+
+# Content features count for less than query features: the same paper
+# content is shared by questions of every type
+CONTENT_WEIGHT = 0.1
+CONTENT_CHARS = 1000
+
+STEM_CHARS = 5
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def extract_features(query: str, content: str = "") -> Dict[str, float]:
+    """
+    Build weighted n-gram features for a query and its content preview.
+
+    Query unigrams, stems and bigrams count fully; content unigrams are
+    prefixed with "c:" and down-weighted.
+    """
+    features = defaultdict(float)
+    query_tokens = tokenize(query)
+    for token in query_tokens:
+        features[token] += 1.0
+        # Crude stem so "implement"/"implementation", "equation"/"equations" share evidence
+        if len(token) > STEM_CHARS:
+            features[f"s:{token[:STEM_CHARS]}"] += 1.0
+    for first, second in zip(query_tokens, query_tokens[1:]):
+        features[f"{first}_{second}"] += 1.0
+    for token in tokenize(content[:CONTENT_CHARS]):
+        features[f"c:{token}"] += CONTENT_WEIGHT
+    return features
+
+
+class QueryRouter:
+    """Multinomial naive Bayes classifier choosing math / code / concept."""
+
+    def __init__(self, alpha: float = 0.3):
+        """
+        Initialize router.
+
+        Args:
+            alpha: Additive (Laplace) smoothing
+        """
+        self.alpha = alpha
+        self.labels: List[str] = []
+        self.log_priors: Dict[str, float] = {}
+        self.log_likelihoods: Dict[str, Dict[str, float]] = {}
+        self.log_unseen: Dict[str, float] = {}
+
+    def train(self, examples: Iterable[Dict]) -> "QueryRouter":
+        """
+        Fit the classifier.
+
+        Args:
+            examples: Dicts with 'query', optional 'content' and 'agent' label
+        """
+        examples = list(examples)
+        label_counts = Counter(ex["agent"] for ex in examples)
+        feature_counts = {label: defaultdict(float) for label in label_counts}
+        vocabulary = set()
+
+        for ex in examples:
+            for feature, weight in extract_features(ex["query"], ex.get("content", "")).items():
+                feature_counts[ex["agent"]][feature] += weight
+                vocabulary.add(feature)
+
+        self.labels = sorted(label_counts)
+        total = sum(label_counts.values())
+        vocab_size = len(vocabulary)
+        self.log_priors = {}
+        self.log_likelihoods = {}
+        self.log_unseen = {}
+        for label in self.labels:
+            self.log_priors[label] = math.log(label_counts[label] / total)
+            denominator = sum(feature_counts[label].values()) + self.alpha * vocab_size
+            self.log_likelihoods[label] = {
+                feature: math.log((count + self.alpha) / denominator)
+                for feature, count in feature_counts[label].items()
+            }
+            self.log_unseen[label] = math.log(self.alpha / denominator)
+
+        logger.info(f"Trained query router on {total} examples ({vocab_size} features)")
+        return self
+
+    def predict_proba(self, query: str, content: str = "") -> Dict[str, float]:
+        """Posterior probability of each agent label."""
+        features = extract_features(query, content)
+        scores = {}
+        for label in self.labels:
+            likelihoods = self.log_likelihoods[label]
+            unseen = self.log_unseen[label]
+            score = self.log_priors[label]
+            for feature, weight in features.items():
+                score += weight * likelihoods.get(feature, unseen)
+            scores[label] = score
+
+        # Normalize with log-sum-exp
+        top = max(scores.values())
+        exps = {label: math.exp(score - top) for label, score in scores.items()}
+        norm = sum(exps.values())
+        return {label: value / norm for label, value in exps.items()}
+
+    def predict(self, query: str, content: str = "") -> Tuple[str, float]:
+        """
+        Pick the most likely agent.
+
+        Returns:
+            (agent label, confidence)
+        """
+        probabilities = self.predict_proba(query, content)
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+
+def load_examples(path: str = DEFAULT_EXAMPLES_PATH) -> List[Dict]:
+    """Load the labelled routing examples."""
+    with open(path, "r") as f:
+        return json.load(f)["examples"]
+
+
+# Global router instance
+_router = None
+_router_failed = False  # Training failed once; not retried for every manager
+_router_lock = threading.Lock()
+
+def get_router() -> Optional[QueryRouter]:
+    """Get or train the global router (None if no training data is available)."""
+    global _router, _router_failed
+    with _router_lock:
+        if _router is None and not _router_failed:
+            try:
+                _router = QueryRouter().train(load_examples())
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Could not train query router: {e}")
+                _router_failed = True
+        return _router
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Question bank benchmark for demo mode chat
+Builds each sample paper's question bank (no API calls) and measures how
+many user questions the indexed chat matcher answers from a cached
+question, with only the common questions cached versus with the bank.
+
+Queries come from data/question_bank/eval_questions.json, each labelled
+with the cached questions that answer it correctly. Coverage counts any
+match; precision counts the matches that are right, and the benchmark
+passes only when the bank raises the number of correct answers. With
+--metrics, the chat misses of a Cache Admin metrics export are added as
+unlabelled queries (coverage only).
+
+Usage: python benchmark_question_bank.py [--questions 40] [--threshold 0.3] [--metrics export.json] [--show 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+import yaml
+
+from backend.cache_tasks import COMMON_QUESTIONS, question_key
+from backend.question_bank import build_question_bank
+from tools.pdf_parser import PaperParser
+from utils.question_index import QuestionIndex, key_to_question
+
+def normalize(question):
+    """Question text as recovered from its cache key"""
+    return key_to_question(question_key(question))
+
+def load_queries(path, metrics_path=None):
+    """
+    paper_id -> [(query, expected questions)], plus missed chat queries
+    from a metrics export (expected None: unlabelled)
+    """
+    with open(path, "r") as f:
+        labelled = json.load(f)["questions"]
+    queries = {
+        paper_id: [(row["query"], {normalize(q) for q in row["expected"]}) for row in rows]
+        for paper_id, rows in labelled.items()
+    }
+    if metrics_path:
+        with open(metrics_path, "r") as f:
+            report = json.load(f)
+        for row in report.get("top_misses", []):
+            if row.get("query_type") == "chat":
+                queries.setdefault(row["paper_id"], []).extend((query, None) for query in row.get("queries", []))
+    return queries
+
+def score(index, queries, threshold):
+    """
+    Match queries against an index.
+
+    Returns:
+        Counts (queries, hits, labelled, labelled_hits, correct) and the
+        (query, matched question, correct or None) of every hit
+    """
+    counts = Counter()
+    hits = []
+    for query, expected in queries:
+        key = index.best_match(query, threshold)
+        counts["queries"] += 1
+        counts["labelled"] += expected is not None
+        if key is None:
+            continue
+        question = key_to_question(key)
+        correct = None if expected is None else question in expected
+        counts["hits"] += 1
+        counts["labelled_hits"] += expected is not None
+        counts["correct"] += bool(correct)
+        hits.append((query, question, correct))
+    return counts, hits
+
+def describe(counts):
+    """Coverage, precision and correct answers of a score() result"""
+    coverage = counts["hits"] / counts["queries"] if counts["queries"] else 0.0
+    precision = counts["correct"] / counts["labelled_hits"] if counts["labelled_hits"] else 0.0
+    return (f"{coverage:6.1%} coverage, {precision:6.1%} precision, "
+            f"{counts['correct']}/{counts['labelled']} answered correctly")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Measure demo mode chat coverage and precision with a derived question bank")
+    arg_parser.add_argument("--questions", type=int, default=None,
+                            help="Bank size per paper (default: question_bank.questions_per_paper)")
+    arg_parser.add_argument("--threshold", type=float, default=None,
+                            help="Match threshold (default: response_cache.chat_match_threshold)")
+    arg_parser.add_argument("--queries", default="data/question_bank/eval_questions.json")
+    arg_parser.add_argument("--metrics", default=None, help="Cache Admin metrics export with missed queries (needs cache_metrics.record_queries)")
+    arg_parser.add_argument("--show", type=int, default=5, help="Example matches to print per paper")
+    args = arg_parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    bank_size = args.questions
+    if bank_size is None:
+        bank_size = (config.get("question_bank") or {}).get("questions_per_paper", 40)
+    threshold = args.threshold
+    if threshold is None:
+        threshold = (config.get("response_cache") or {}).get("chat_match_threshold", 0.3)
+
+    print("=" * 60)
+    print("Question Bank Benchmark")
+    print("=" * 60)
+    print(f"[INFO] {bank_size} derived questions per paper, match threshold {threshold}")
+
+    queries = load_queries(args.queries, args.metrics)
+    common_keys = [question_key(question) for question in COMMON_QUESTIONS]
+    totals = {"common": Counter(), "bank": Counter()}
+
+    for paper in config["sample_papers"]:
+        paper_queries = queries.get(paper["id"], [])
+        paper_path = f"data/sample_papers/{paper['file']}"
+        if not paper_queries or not os.path.exists(paper_path):
+            print(f"\n[WARN] {paper['id']}: no queries or PDF, skipped")
+            continue
+
+        parser = PaperParser(paper_path)
+        parser.extract_all_text()
+        bank = build_question_bank(parser.full_text, bank_size, exclude=COMMON_QUESTIONS)
+        bank_keys = common_keys + [question_key(entry.question) for entry in bank]
+
+        common, _ = score(QuestionIndex.from_cache_keys(common_keys), paper_queries, threshold)
+        with_bank, hits = score(QuestionIndex.from_cache_keys(bank_keys), paper_queries, threshold)
+        print(f"\n[INFO] {paper['id']}: {len(paper_queries)} queries, {len(bank_keys)} cached questions")
+        print(f"  Common questions only: {describe(common)}")
+        print(f"  With question bank:    {describe(with_bank)}")
+        for query, question, correct in hits[:args.show]:
+            mark = {True: "ok", False: "WRONG", None: "?"}[correct]
+            print(f"    [{mark}] {query!r} -> {question!r}")
+
+        totals["common"].update(common)
+        totals["bank"].update(with_bank)
+
+    if not totals["bank"]["queries"]:
+        print("\n[FAIL] No papers to evaluate")
+        return 1
+
+    print("\n" + "=" * 60)
+    print(f"Common questions only: {describe(totals['common'])}")
+    print(f"With question bank:    {describe(totals['bank'])}")
+    print("=" * 60)
+
+    if totals["bank"]["correct"] <= totals["common"]["correct"]:
+        print("[WARN] The question bank did not raise the number of correct answers")
+        return 1
+    print("[PASS] The question bank raises the number of correctly answered questions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Response cache benchmark with many synthetic papers
+Compares loading every cache file up front (the previous behaviour) with
+lazy per-paper loading: startup time, listing time, first/repeat lookup
+latency and peak memory. Also times chat question matching against a
+paper with thousands of cached questions.
+
+Usage: python benchmark_response_cache.py [--papers 5000] [--entries 12] [--max-memory-mb 16] [--questions 5000]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from utils.question_index import QuestionIndex
+from utils.response_cache import ResponseCache
+
+def make_caches(cache_dir, papers, entries, seed):
+    """Write synthetic <paper_id>.json files shaped like generated caches"""
+    rng = random.Random(seed)
+    words = ["attention", "gradient", "layer", "token", "proof", "kernel",
+             "policy", "reward", "encoder", "matrix", "sample", "loss"]
+    for i in range(papers):
+        cache = {"chat_general": f"I'm ready to answer questions about paper {i}."}
+        for j in range(entries):
+            text = " ".join(rng.choice(words) for _ in range(120))
+            cache[f"chat_question_{j}_about_{rng.choice(words)}"] = text
+        cache["quiz_general"] = " ".join(rng.choice(words) for _ in range(200))
+        with open(os.path.join(cache_dir, f"paper{i:05d}.json"), "w") as f:
+            json.dump(cache, f, indent=2)
+
+def load_all(cache_dir):
+    """The previous behaviour: parse every cache file at startup"""
+    caches = {}
+    for filename in os.listdir(cache_dir):
+        if filename.endswith(".json") and filename != "index.json":
+            with open(os.path.join(cache_dir, filename), "r") as f:
+                caches[filename[:-len(".json")]] = json.load(f)
+    return caches
+
+def benchmark_chat_matching(questions, queries, seed):
+    """Median/p99 latency of matching a chat question against N cached questions"""
+    rng = random.Random(seed)
+    subjects = ["attention", "the encoder", "dropout", "the optimizer", "beam search",
+                "positional encoding", "the reward", "the critic", "batch norm", "the loss"]
+    verbs = ["why use", "how does", "what is", "how is", "compare", "limitations of",
+             "how to train", "results of", "motivation for", "architecture of"]
+    keys = [
+        f"chat_{rng.choice(verbs)}_{rng.choice(subjects)}_{i}".replace(" ", "_")
+        for i in range(questions)
+    ]
+    build_start = time.perf_counter()
+    index = QuestionIndex.from_cache_keys(keys)
+    build_ms = (time.perf_counter() - build_start) * 1000
+
+    timings = []
+    for _ in range(queries):
+        query = f"{rng.choice(verbs)} {rng.choice(subjects)}?"
+        start = time.perf_counter()
+        index.search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return build_ms, statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+def timed(fn):
+    """Run fn once; return (result, seconds, peak traced bytes)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark demo-mode response cache loading")
+    arg_parser.add_argument("--papers", type=int, default=5000)
+    arg_parser.add_argument("--entries", type=int, default=12,
+                            help="Chat entries per synthetic paper")
+    arg_parser.add_argument("--max-memory-mb", type=float, default=16,
+                            help="Memory cap for the lazy cache")
+    arg_parser.add_argument("--lookups", type=int, default=2000)
+    arg_parser.add_argument("--questions", type=int, default=5000,
+                            help="Cached chat questions for the matching benchmark")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    print("=" * 60)
+    print("Research Paper Chat - Response Cache Benchmark")
+    print("=" * 60)
+
+    cache_dir = tempfile.mkdtemp(prefix="response_cache_bench_")
+    try:
+        print(f"\n[INFO] Writing {args.papers} synthetic paper caches...")
+        make_caches(cache_dir, args.papers, args.entries, args.seed)
+        disk_mb = sum(e.stat().st_size for e in os.scandir(cache_dir)) / 1e6
+        print(f"[INFO] {disk_mb:.1f} MB on disk")
+
+        _, eager_s, eager_peak = timed(lambda: load_all(cache_dir))
+
+        # First start builds the index; later starts only read it
+        _, index_s, _ = timed(lambda: ResponseCache(cache_dir, max_memory_mb=args.max_memory_mb))
+        cache, lazy_s, lazy_peak = timed(lambda: ResponseCache(cache_dir, max_memory_mb=args.max_memory_mb))
+        papers, list_s, _ = timed(cache.list_cached_papers)
+
+        rng = random.Random(args.seed)
+        hot = papers[:20]
+        cold_ms, warm_ms = [], []
+        tracemalloc.start()
+        for _ in range(args.lookups):
+            # Mostly a few popular papers, sometimes a random one
+            paper_id = rng.choice(hot) if rng.random() < 0.9 else rng.choice(papers)
+            was_loaded = paper_id in cache.caches
+            start = time.perf_counter()
+            cache.get_response(paper_id, "quiz")
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            (warm_ms if was_loaded else cold_ms).append(elapsed_ms)
+        _, lookups_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats = cache.stats()
+        print(f"\nEager load (all files):   {eager_s * 1000:9.1f} ms, peak {eager_peak / 1e6:7.1f} MB")
+        print(f"Index build (first run):  {index_s * 1000:9.1f} ms")
+        print(f"Lazy startup (index):     {lazy_s * 1000:9.1f} ms, peak {lazy_peak / 1e6:7.1f} MB")
+        print(f"list_cached_papers():     {list_s * 1000:9.3f} ms ({len(papers)} papers)")
+        print(f"\n{args.lookups} lookups (90% on {len(hot)} papers):")
+        if cold_ms:
+            print(f"  first access  median {statistics.median(cold_ms):7.3f} ms  (n={len(cold_ms)})")
+        if warm_ms:
+            print(f"  loaded        median {statistics.median(warm_ms):7.3f} ms  (n={len(warm_ms)})")
+        print(f"  peak memory {lookups_peak / 1e6:.1f} MB, {stats['loaded']} papers resident "
+              f"({stats['memory_bytes'] / 1e6:.1f} MB by file size), {stats['evictions']} evictions")
+
+        build_ms, match_median_ms, match_p99_ms = benchmark_chat_matching(
+            args.questions, args.lookups, args.seed
+        )
+        print(f"\nChat matching over {args.questions} cached questions:")
+        print(f"  index build {build_ms:.1f} ms, match median {match_median_ms:.3f} ms, p99 {match_p99_ms:.3f} ms")
+
+        ok = len(papers) == args.papers and stats["memory_bytes"] <= cache.max_memory_bytes
+        print(f"\n[{'PASS' if ok else 'FAIL'}] Index lists all papers and loaded caches stay under the cap")
+        if match_median_ms >= 1.0:
+            ok = False
+            print("[FAIL] Chat matching is not sub-millisecond")
+        else:
+            print("[PASS] Chat matching is sub-millisecond")
+        return 0 if ok else 1
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Routing benchmark for the local query router
+Measures cross-validated accuracy, how many LLM routing calls the
+confidence threshold avoids, and per-query prediction latency.
+
+Also calibrates routing.confidence_threshold: accuracy above each
+candidate threshold (cross-validation repeated over several shuffles) is
+compared with the LLM router's accuracy - measured on the same examples
+with --llm (one API call per example), otherwise the assumed
+routing.target_accuracy.
+
+Usage: python benchmark_router.py [--folds 5] [--seeds 5] [--threshold 0.999] [--target 0.97] [--llm]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+import yaml
+
+from backend.router import QueryRouter, load_examples
+
+# Candidate confidence thresholds for calibration
+THRESHOLDS = [0.9, 0.95, 0.98, 0.99, 0.995, 0.998, 0.999, 0.9995]
+
+def cross_validate(examples, folds, seed):
+    """k-fold cross-validation; returns (gold, predicted, confidence) triples"""
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    results = []
+    for fold in range(folds):
+        test = shuffled[fold::folds]
+        train = [ex for i, ex in enumerate(shuffled) if i % folds != fold]
+        router = QueryRouter().train(train)
+        for ex in test:
+            label, confidence = router.predict(ex["query"], ex.get("content", ""))
+            results.append((ex["agent"], label, confidence))
+    return results
+
+def threshold_table(results, thresholds):
+    """(threshold, accuracy above it or None, share answered locally) per threshold"""
+    table = []
+    for threshold in thresholds:
+        confident = [(g, p) for g, p, c in results if c >= threshold]
+        accuracy = sum(g == p for g, p in confident) / len(confident) if confident else None
+        table.append((threshold, accuracy, len(confident) / len(results)))
+    return table
+
+def llm_accuracy(examples):
+    """Accuracy of the LLM routing call on the examples (one API call each)"""
+    from dotenv import load_dotenv
+    from backend.manager import ManagerAgent
+    load_dotenv()
+    manager = ManagerAgent()
+    correct = 0
+    for ex in examples:
+        routing = manager._llm_route(ex["query"], ex.get("content", ""))
+        correct += routing["agent"] == ex["agent"]
+    return correct / len(examples)
+
+def measure_latency(examples, repeats):
+    """Per-prediction latency in microseconds"""
+    router = QueryRouter().train(examples)
+    timings = []
+    for _ in range(repeats):
+        for ex in examples:
+            start = time.perf_counter()
+            router.predict(ex["query"], ex.get("content", ""))
+            timings.append((time.perf_counter() - start) * 1e6)
+    return sorted(timings)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the local query router")
+    arg_parser.add_argument("--folds", type=int, default=5)
+    arg_parser.add_argument("--threshold", type=float, default=None,
+                            help="Confidence needed to skip the LLM routing call "
+                                 "(default: routing.confidence_threshold)")
+    arg_parser.add_argument("--seeds", type=int, default=5,
+                            help="Shuffles the cross-validation is repeated over")
+    arg_parser.add_argument("--target", type=float, default=None,
+                            help="LLM router accuracy to match (default: routing.target_accuracy)")
+    arg_parser.add_argument("--llm", action="store_true",
+                            help="Measure the LLM router's accuracy on the examples (API calls)")
+    arg_parser.add_argument("--repeats", type=int, default=20,
+                            help="Passes over the examples for latency timing")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        routing = yaml.safe_load(f).get("routing", {}) or {}
+    if args.threshold is None:
+        args.threshold = routing.get("confidence_threshold", 0.999)
+    target = args.target if args.target is not None else routing.get("target_accuracy", 0.97)
+
+    print("=" * 60)
+    print("Research Paper Chat - Router Benchmark")
+    print("=" * 60)
+
+    examples = load_examples()
+    print(f"\n[INFO] {len(examples)} labelled examples: {dict(Counter(ex['agent'] for ex in examples))}")
+
+    results = []
+    for seed in range(args.seed, args.seed + args.seeds):
+        results += cross_validate(examples, args.folds, seed)
+    correct = sum(gold == predicted for gold, predicted, _ in results)
+    confident = [(g, p) for g, p, c in results if c >= args.threshold]
+    confident_correct = sum(g == p for g, p in confident)
+
+    print(f"\nAccuracy ({args.folds}-fold CV over {args.seeds} shuffles):")
+    print(f"  All predictions:       {correct / len(results):.1%} ({correct}/{len(results)})")
+    if confident:
+        print(f"  Confident (>= {args.threshold:g}): {confident_correct / len(confident):.1%} "
+              f"({confident_correct}/{len(confident)})")
+    print(f"  Answered locally:      {len(confident) / len(results):.1%} of ambiguous queries")
+    print(f"  LLM fallbacks:         {len(results) - len(confident)}")
+
+    print("\nConfusion (gold -> predicted):")
+    for (gold, predicted), count in sorted(Counter((g, p) for g, p, _ in results).items()):
+        print(f"  {gold:8s} -> {predicted:8s} {count}")
+
+    timings = measure_latency(examples, args.repeats)
+    print(f"\nLatency per prediction ({len(timings)} runs):")
+    print(f"  mean: {statistics.mean(timings):.1f} us")
+    print(f"  p50:  {timings[len(timings) // 2]:.1f} us")
+    print(f"  p99:  {timings[int(len(timings) * 0.99)]:.1f} us")
+
+    if args.llm:
+        print(f"\n[WARN] Measuring the LLM router: {len(examples)} API calls")
+        target = llm_accuracy(examples)
+        print(f"[INFO] LLM router accuracy: {target:.1%}")
+        source = "measured"
+    else:
+        source = "given by --target" if args.target is not None else "assumed in routing.target_accuracy"
+        print(f"\n[WARN] LLM router accuracy {target:.1%} is {source}, not measured; pass --llm to measure it")
+
+    print(f"\nThreshold calibration (target: LLM router accuracy {target:.1%}, {source}):")
+    table = threshold_table(results, sorted(set(THRESHOLDS + [args.threshold])))
+    for threshold, accuracy, local in table:
+        shown = f"{accuracy:.1%}" if accuracy is not None else "-"
+        mark = " <- configured" if threshold == args.threshold else ""
+        print(f"  >= {threshold:<7g} accuracy {shown:>6s}, answered locally {local:.1%}{mark}")
+
+    recommended = next((t for t, accuracy, _ in table if accuracy is not None and accuracy >= target), None)
+    configured = next(accuracy for t, accuracy, _ in table if t == args.threshold)
+    if recommended is not None:
+        print(f"[INFO] Lowest candidate threshold matching the LLM router: {recommended:g}")
+    if configured is None or configured < target:
+        print(f"[WARN] Threshold {args.threshold:g} routes less accurately than the LLM router ({source})")
+        return 1
+    print(f"[PASS] Threshold {args.threshold:g} routes at least as accurately as the LLM router ({source})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Convert demo-mode response caches to the compressed format
+Trains a shared dictionary from every cached response, rewrites each
+paper as a .rpc file (entries compressed individually) and compares disk
+size, paper load latency and per-entry lookup latency against JSON. Set
+response_cache.format to "compressed" in config.yaml to keep new writes
+compressed.
+
+Usage: python compress_response_cache.py [--cache-dir data/cached_responses] [--codec auto] [--dry-run] [--synthetic N]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from utils.cache_codec import default_codec, train_dictionary
+from utils.response_cache import ResponseCache
+
+# Dictionary training samples; more adds little once common phrasing is covered
+MAX_SAMPLES = 5000
+
+def make_caches(cache, papers, seed):
+    """Write synthetic papers with generated-looking markdown answers"""
+    rng = random.Random(seed)
+    phrases = [
+        "## Key Contributions", "## Methodology", "The authors propose",
+        "**Main idea:**", "In summary, the paper shows that", "- Improves accuracy on",
+        "compared to prior work", "the attention mechanism", "the training objective",
+        "Limitations include", "### Results", "which reduces computational cost"
+    ]
+    words = ["model", "layer", "token", "gradient", "dataset", "baseline", "encoder",
+             "benchmark", "loss", "sequence", "parameter", "evaluation"]
+    for i in range(papers):
+        entries = {}
+        for key in ("chat_general", "quiz_general", "explain_all", "summary_all",
+                    "chat_what_is_novel", "chat_limitations", "chat_results", "chat_method"):
+            lines = []
+            for _ in range(rng.randint(8, 20)):
+                lines.append(f"{rng.choice(phrases)} {' '.join(rng.choice(words) for _ in range(rng.randint(6, 16)))}.")
+            entries[key] = "\n".join(lines)
+        cache.save_cache(f"paper{i:04d}", entries)
+
+def time_loads(cache_dir, paper_ids, fmt):
+    """Median ms to open a paper from disk, and to read an entry once loaded"""
+    cache = ResponseCache(cache_dir, max_memory_mb=1024, format=fmt)
+    load_ms, get_ms = [], []
+    for paper_id in paper_ids:
+        start = time.perf_counter()
+        entries = cache._get_paper(paper_id)
+        load_ms.append((time.perf_counter() - start) * 1000)
+        for key in list(entries)[:5]:
+            start = time.perf_counter()
+            entries[key]
+            get_ms.append((time.perf_counter() - start) * 1000)
+    return statistics.median(load_ms), statistics.median(get_ms)
+
+def directory_bytes(cache_dir, suffix):
+    return sum(
+        entry.stat().st_size for entry in os.scandir(cache_dir)
+        if entry.name.endswith(suffix) and not entry.name.startswith(".") and entry.name != "index.json"
+    )
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Convert response caches to the compressed format")
+    arg_parser.add_argument("--cache-dir", default="data/cached_responses")
+    arg_parser.add_argument("--codec", default="auto", choices=["auto", "zstd", "zlib"])
+    arg_parser.add_argument("--dry-run", action="store_true",
+                            help="Convert a temporary copy and only report the comparison")
+    arg_parser.add_argument("--synthetic", type=int, default=0,
+                            help="Benchmark N synthetic papers instead of --cache-dir")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    codec = default_codec() if args.codec == "auto" else args.codec
+
+    print("=" * 60)
+    print("Research Paper Chat - Response Cache Compression")
+    print("=" * 60)
+
+    work_dir = None
+    if args.synthetic:
+        work_dir = tempfile.mkdtemp(prefix="response_cache_compress_")
+        cache_dir = work_dir
+        print(f"\n[INFO] Writing {args.synthetic} synthetic paper caches...")
+        make_caches(ResponseCache(cache_dir, format="json"), args.synthetic, args.seed)
+    elif not os.path.isdir(args.cache_dir):
+        print(f"\n[FAIL] Cache directory not found: {args.cache_dir}")
+        return 1
+    elif args.dry_run:
+        work_dir = tempfile.mkdtemp(prefix="response_cache_compress_")
+        cache_dir = os.path.join(work_dir, "cache")
+        shutil.copytree(args.cache_dir, cache_dir)
+    else:
+        cache_dir = args.cache_dir
+
+    try:
+        source = ResponseCache(cache_dir, format="json")
+        paper_ids = sorted(source.rebuild_index())
+        papers = {paper_id: source.read_paper(paper_id) for paper_id in paper_ids}
+        if not papers:
+            print(f"\n[WARN] No cached papers in {cache_dir}")
+            return 0
+        print(f"\n[INFO] {len(papers)} papers, {sum(len(p) for p in papers.values())} entries, codec {codec}")
+
+        # Make sure there are JSON files to compare against
+        for paper_id, entries in papers.items():
+            source.save_cache(paper_id, entries)
+        json_bytes = directory_bytes(cache_dir, ".json")
+        json_load_ms, json_get_ms = time_loads(cache_dir, paper_ids, "json")
+
+        samples = [response for entries in papers.values() for response in entries.values()]
+        random.Random(args.seed).shuffle(samples)
+        start = time.perf_counter()
+        dictionary = train_dictionary(samples[:MAX_SAMPLES], codec)
+        dict_id = source.dictionaries.save(dictionary)
+        if dict_id:
+            print(f"[INFO] Trained {len(dictionary) / 1024:.1f} KiB dictionary {dict_id} "
+                  f"in {time.perf_counter() - start:.2f}s")
+        else:
+            print("[WARN] Too little repeated text for a dictionary - compressing without one")
+
+        target = ResponseCache(cache_dir, format="compressed")
+        target.codec_name = codec
+        failed = []
+        for paper_id, entries in papers.items():
+            try:
+                target.save_cache(paper_id, entries)
+                if target.read_paper(paper_id) != entries:
+                    raise ValueError("decoded entries differ from the JSON file")
+            except Exception as e:
+                print(f"  [FAIL] {paper_id}: {e}")
+                failed.append(paper_id)
+
+        packed_bytes = directory_bytes(cache_dir, ".rpc")
+        packed_load_ms, packed_get_ms = time_loads(cache_dir, paper_ids, "compressed")
+
+        print(f"\n{'':14}{'JSON':>12}{'compressed':>14}")
+        print(f"{'disk size':14}{json_bytes / 1e6:>9.2f} MB{packed_bytes / 1e6:>11.2f} MB"
+              f"   ({json_bytes / max(packed_bytes, 1):.1f}x smaller)")
+        print(f"{'paper load':14}{json_load_ms:>9.3f} ms{packed_load_ms:>11.3f} ms")
+        print(f"{'entry get':14}{json_get_ms:>9.4f} ms{packed_get_ms:>11.4f} ms")
+
+        if failed:
+            print(f"\n[FAIL] {len(failed)} papers could not be converted: {', '.join(failed)}")
+            return 1
+        print("\n[PASS] All papers converted and verified")
+        if args.dry_run or args.synthetic:
+            print("[INFO] Dry run - the cache directory was not changed")
+        else:
+            print('[INFO] Set response_cache.format: "compressed" in config.yaml to keep writing this format')
+        return 0
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
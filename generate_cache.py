@@ -2,158 +2,241 @@
 """
 Cache Generator for Research Paper Chat
 Generates cached responses for sample papers to enable Demo mode
+
+Each response is checkpointed as soon as it is generated, so an
+interrupted run resumes where it stopped when rerun. With --only-missing,
+only entries that are missing or whose section content changed are
+generated. --dry-run also lists the question bank questions, to review
+them before paying for them.
+
+Usage: python generate_cache.py [--yes] [--only-missing] [--restart] [--dry-run] [--max-calls N]
 """
 
-import os
+import argparse
 import json
+import os
+import sys
+from collections import Counter
+
 import yaml
 from dotenv import load_dotenv
 from tools.pdf_parser import PaperParser
-from backend.manager import ManagerAgent
-from backend.agents.quiz_agent import QuizAgent
-from backend.agents.chat_agent import ChatAgent
+from backend.cache_engine import GenerationEngine, RunJournal, journal_path
+from backend.cache_tasks import SOURCES_KEY, diff_sources, plan_tasks, read_sources, sources_entry, static_entries
+from utils.usage_tracker import get_usage_tracker
+from utils.response_cache import get_cache
 
 # Load environment
 load_dotenv()
 
-def generate_cache_for_paper(paper_config):
-    """Generate comprehensive cache for a paper"""
-    print(f"\n{'='*60}")
-    print(f"Generating cache for: {paper_config['title']}")
-    print(f"{'='*60}")
-    
+def run_tasks(tasks, cache, on_result=None):
+    """Run cache tasks concurrently within the API quota, storing each response under its versioned key"""
+    cache.update(GenerationEngine().run(tasks, on_result=on_result))
+
+def plan_paper(paper_config, **plan_options):
+    """Parse a paper and list the cache entries to generate for it (options go to plan_tasks)"""
     paper_path = f"data/sample_papers/{paper_config['file']}"
     
     if not os.path.exists(paper_path):
-        print(f"[FAIL] Paper not found: {paper_path}")
+        print(f"[FAIL] {paper_config['id']}: paper not found at {paper_path}")
         return None
     
     # Parse paper
-    print("[INFO] Parsing PDF...")
     parser = PaperParser(paper_path)
     parser.extract_sections()
     
-    cache = {}
-    manager = ManagerAgent()
-    quiz_agent = QuizAgent()
-    chat_agent = ChatAgent()
-    
-    # Generate explanations for each section
-    print("\n[INFO] Generating section explanations...")
-    for section_name, section_content in parser.sections.items():
-        print(f"  Processing: {section_name}")
-        
-        # Math explanation
-        try:
-            result = manager.process_query(
-                f"Explain the mathematical concepts in the {section_name} section",
-                section_content,
-                section=section_name,
-                agent_type="math"
-            )
-            cache[f"explain_{section_name}_math"] = result['response']
-            print(f"    [PASS] Math explanation")
-        except Exception as e:
-            print(f"    [WARN] Math explanation failed: {e}")
-        
-        # Code explanation
-        try:
-            result = manager.process_query(
-                f"Explain the algorithms and implementation in the {section_name} section",
-                section_content,
-                section=section_name,
-                agent_type="code"
-            )
-            cache[f"explain_{section_name}_code"] = result['response']
-            print(f"    [PASS] Code explanation")
-        except Exception as e:
-            print(f"    [WARN] Code explanation failed: {e}")
-        
-        # Concept explanation
-        try:
-            result = manager.process_query(
-                f"Explain the key concepts in the {section_name} section",
-                section_content,
-                section=section_name,
-                agent_type="concept"
-            )
-            cache[f"explain_{section_name}_concept"] = result['response']
-            print(f"    [PASS] Concept explanation")
-        except Exception as e:
-            print(f"    [WARN] Concept explanation failed: {e}")
+    # Section explanations, quizzes and common chat questions
+    return plan_tasks(paper_config, parser, **plan_options)
+
+def select_tasks(paper_config, tasks, journal, only_missing=False):
+    """
+    Drop tasks an interrupted run already completed and, with only_missing,
+    tasks whose cached entry was built from the current content.
     
-    # Generate quizzes
-    print("\n[INFO] Generating quizzes...")
+    Entries cached before source hashes were recorded count as current.
+    """
+    pending = [task for task in tasks if not journal.is_done(task)]
+    resumed = len(tasks) - len(pending)
+    notes = [f"{resumed} done before interruption"] if resumed else []
     
-    # General quiz
-    try:
-        response = quiz_agent.process(
-            "Generate quiz questions",
-            parser.full_text[:4000],
-            section=None
-        )
-        cache["quiz_general"] = response
-        print("  [PASS] General quiz")
-    except Exception as e:
-        print(f"  [WARN] General quiz failed: {e}")
-    
-    # Section-specific quizzes
-    for section_name, section_content in parser.sections.items():
-        try:
-            response = quiz_agent.process(
-                f"Generate quiz questions for {section_name}",
-                section_content,
-                section=section_name
-            )
-            cache[f"quiz_{section_name}"] = response
-            print(f"  [PASS] Quiz for {section_name}")
-        except Exception as e:
-            print(f"  [WARN] Quiz for {section_name} failed: {e}")
-    
-    # Generate common chat responses
-    print("\n[INFO] Generating chat responses...")
-    common_questions = [
-        "What is the main contribution of this paper?",
-        "What are the key innovations?",
-        "What are the limitations?",
-        "How does this compare to previous work?",
-        "What are the practical applications?"
-    ]
+    if only_missing:
+        states = diff_sources(pending, get_cache().read_paper(paper_config['id']) or {})
+        pending = states["new"] + states["changed"]
+        notes += [
+            f"{len(states[state])} {state}" for state in ("new", "changed", "unchanged", "untracked")
+            if states[state]
+        ]
     
-    for question in common_questions:
-        try:
-            response = chat_agent.chat(
-                question,
-                parser.full_text[:3000],
-                history=None,
-                section=None
-            )
-            key = f"chat_{question.lower().replace(' ', '_').replace('?', '')}"
-            cache[key] = response
-            print(f"  [PASS] {question}")
-        except Exception as e:
-            print(f"  [WARN] {question} failed: {e}")
+    note = f" ({', '.join(notes)})" if notes else ""
+    print(f"[INFO] {paper_config['id']}: {len(pending)}/{len(tasks)} responses to generate{note}")
+    return pending
+
+def generate(plans, journal, only_missing=False):
+    """
+    Generate planned entries, checkpointing each one as it finishes.
+    
+    Responses are written to the response cache (ResponseCache.set_entry),
+    together with the hash of their source content, and recorded in the
+    run journal one by one. When all of a paper's
+    tasks succeeded, its cache file is rewritten with exactly the planned
+    entries (with only_missing, existing entries are kept instead).
     
-    # Add general chat response
-    cache["chat_general"] = f"I'm ready to answer questions about '{paper_config['title']}'. Feel free to ask about any aspect - the architecture, the math, the training process, or how it compares to other approaches!"
+    Args:
+        plans: paper_id -> (paper config, all planned tasks, tasks to run)
+        journal: RunJournal of this run
+        only_missing: Keep existing entries and only fill gaps
     
-    return cache
+    Returns:
+        Number of tasks that failed
+    """
+    cache = get_cache()
+    pending = {paper_id: len(todo) for paper_id, (_, _, todo) in plans.items()}
+    failed = Counter()
+    sources = {paper_id: read_sources(cache.read_paper(paper_id) or {}) for paper_id in plans}
+    
+    def finish_paper(paper_id):
+        paper, tasks, _ = plans[paper_id]
+        if failed[paper_id]:
+            print(f"[WARN] {paper_id}: {failed[paper_id]} entries failed, rerun to retry just those")
+            return
+        entries = cache.read_paper(paper_id) or {}
+        if only_missing:
+            for key, response in static_entries(paper).items():
+                if key not in entries:
+                    cache.set_entry(paper_id, key, response)
+            print(f"[PASS] {paper_id}: cache complete")
+            return
+        final = static_entries(paper)
+        final.update({task.stored_key: entries[task.stored_key] for task in tasks if task.stored_key in entries})
+        final[SOURCES_KEY] = sources_entry(final, tasks)
+        save_cache(paper_id, final)
+        print(f"[PASS] Successfully generated cache for {paper['title']}")
+    
+    def checkpoint(task, response, error):
+        if response is None:
+            failed[task.paper_id] += 1
+        else:
+            cache.set_entry(task.paper_id, task.stored_key, response)
+            if task.source:
+                sources[task.paper_id][task.stored_key] = task.source
+                cache.set_entry(task.paper_id, SOURCES_KEY, json.dumps(sources[task.paper_id], sort_keys=True))
+            journal.record(task)
+        pending[task.paper_id] -= 1
+        if pending[task.paper_id] == 0:
+            finish_paper(task.paper_id)
+    
+    for paper_id, remaining in pending.items():
+        if remaining == 0:
+            finish_paper(paper_id)
+    
+    todo = [task for _, _, paper_todo in plans.values() for task in paper_todo]
+    if todo:
+        print(f"\n[INFO] Generating {len(todo)} responses...")
+        GenerationEngine().run(todo, on_result=checkpoint)
+    return sum(failed.values())
 
-def save_cache(paper_id, cache_data):
-    """Save cache to file"""
-    cache_dir = "data/cached_responses"
-    os.makedirs(cache_dir, exist_ok=True)
+def add_generation_arguments(arg_parser):
+    """Options shared by the cache generators"""
+    arg_parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation (batch jobs)")
+    arg_parser.add_argument("--only-missing", action="store_true",
+                            help="Keep current cache entries; generate only missing ones and those "
+                                 "whose section content changed")
+    arg_parser.add_argument("--restart", action="store_true",
+                            help="Ignore an interrupted run instead of resuming it")
+    arg_parser.add_argument("--dry-run", action="store_true",
+                            help="Only print how many API calls would be made")
+    arg_parser.add_argument("--max-calls", type=int, default=None,
+                            help="API call budget of this run; the least important entries "
+                                 "(question bank first) are deferred to the next run")
+
+def confirm(args, calls):
+    """Ask before spending API calls unless --yes was given"""
+    if args.yes or calls == 0:
+        return True
+    response = input("\nContinue? (yes/no): ")
+    if response.lower() != 'yes':
+        print("Cancelled.")
+        return False
+    return True
+
+def apply_budget(plans, max_calls):
+    """
+    Keep the max_calls most important tasks of a run (lowest priority value,
+    then paper and plan order); returns how many were deferred.
+    """
+    ranked = [
+        (task.priority, paper_index, task_index, paper_id)
+        for paper_index, (paper_id, (_, _, todo)) in enumerate(plans.items())
+        for task_index, task in enumerate(todo)
+    ]
+    if max_calls is None or len(ranked) <= max_calls:
+        return 0
     
-    cache_path = os.path.join(cache_dir, f"{paper_id}.json")
+    kept = {(paper_id, task_index) for _, _, task_index, paper_id in sorted(ranked)[:max_calls]}
+    for paper_id, (paper, tasks, todo) in plans.items():
+        plans[paper_id] = (paper, tasks, [task for i, task in enumerate(todo) if (paper_id, i) in kept])
+    return len(ranked) - max_calls
+
+def print_bank_questions(plans):
+    """List the question bank questions a run would pay for, for review"""
+    for paper_id, (_, _, todo) in plans.items():
+        questions = [task.label for task in todo if task.priority]
+        if questions:
+            print(f"\n[INFO] {paper_id}: {len(questions)} question bank questions")
+            for question in questions:
+                print(f"  - {question}")
+
+def run_generation(plans, journal, only_missing=False, deferred=0):
+    """Generate, print usage and report the outcome; returns the exit code"""
+    try:
+        failed = generate(plans, journal, only_missing)
+    except KeyboardInterrupt:
+        print(f"\n[WARN] Interrupted - {len(journal)} entries checkpointed, rerun to resume")
+        return 130
+    finally:
+        print_usage_summary()
     
-    with open(cache_path, 'w') as f:
-        json.dump(cache_data, f, indent=2)
+    if failed:
+        print(f"\n[WARN] {failed} entries failed; rerun to retry only those")
+        return 1
+    if deferred:
+        # Keep the journal so the next run continues with the deferred tasks
+        print(f"\n[INFO] {deferred} responses deferred by --max-calls; rerun to continue")
+        return 0
+    journal.discard()
+    return 0
+
+def save_cache(paper_id, cache_data):
+    """Save cache to file (through ResponseCache so its index stays current)"""
+    response_cache = get_cache()
+    response_cache.save_cache(paper_id, cache_data)
     
+    cache_path = os.path.join(response_cache.cache_dir, f"{paper_id}.json")
     print(f"\n[INFO] Cache saved to: {cache_path}")
     print(f"[INFO] Total cached responses: {len(cache_data)}")
 
+def print_usage_summary(export_path="data/usage/cache_generation.jsonl"):
+    """Print API calls and tokens per paper and agent, and export raw records"""
+    tracker = get_usage_tracker()
+    usage = tracker.aggregate(by=("paper_id", "agent"))
+    if not usage:
+        return
+    
+    print("\n[INFO] API usage by paper and agent:")
+    for (paper_id, agent), totals in sorted(usage.items(), key=lambda item: str(item[0])):
+        print(f"  {paper_id}/{agent}: {totals['calls']} calls, "
+              f"{totals['total_tokens']} tokens, {totals['wall_time']:.1f}s")
+    
+    os.makedirs(os.path.dirname(export_path), exist_ok=True)
+    tracker.export_jsonl(export_path)
+    print(f"[INFO] Usage records saved to: {export_path}")
+
 def main():
     """Main function"""
+    arg_parser = argparse.ArgumentParser(description="Generate demo mode caches for the sample papers")
+    add_generation_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    
     print("=" * 60)
     print("Research Paper Chat - Cache Generator")
     print("=" * 60)
@@ -169,26 +252,49 @@ def main():
         config = yaml.safe_load(f)
     
     papers = config['sample_papers']
-    
     print(f"\nFound {len(papers)} paper(s) in config")
-    print("\n[WARN] WARNING: This will make many API calls!")
-    print("Estimated: ~20-30 calls per paper")
-    print("Free tier limit: 15 requests/minute, 1500/day")
     
-    response = input("\nContinue? (yes/no): ")
-    if response.lower() != 'yes':
-        print("Cancelled.")
-        return 0
+    # Questions derived from each paper's headings and key terms
+    bank_size = (config.get('question_bank') or {}).get('questions_per_paper', 0)
     
-    # Generate cache for each paper
+    journal = RunJournal(journal_path("generate_cache"))
+    if args.restart:
+        journal.discard()
+    elif len(journal):
+        print(f"[INFO] Resuming an interrupted run ({len(journal)} entries already generated, --restart to start over)")
+    
+    # Plan every paper, then generate all entries in one pass so the
+    # workers stay busy across paper boundaries
+    plans = {}
     for paper in papers:
         try:
-            cache = generate_cache_for_paper(paper)
-            if cache:
-                save_cache(paper['id'], cache)
-                print(f"[PASS] Successfully generated cache for {paper['title']}")
+            tasks = plan_paper(paper, question_bank=bank_size)
         except Exception as e:
-            print(f"[FAIL] Error generating cache for {paper['title']}: {e}")
+            print(f"[FAIL] Error parsing {paper['title']}: {e}")
+            continue
+        if tasks is not None:
+            plans[paper['id']] = (paper, tasks, select_tasks(paper, tasks, journal, args.only_missing))
+    
+    deferred = apply_budget(plans, args.max_calls)
+    calls = sum(len(todo) for _, _, todo in plans.values())
+    if deferred:
+        print(f"\n[INFO] {deferred} responses deferred to a later run by --max-calls {args.max_calls}")
+    if args.dry_run:
+        print_bank_questions(plans)
+        print(f"\n[INFO] {calls} API calls would be made (dry run)")
+        return 0
+    print(f"\n[WARN] This will make {calls} API calls!")
+    print(f"Quota: {GenerationEngine.quota_rpm():.0f} requests/minute across all API keys, 1500/day per key")
+    
+    if calls and not args.yes and not sys.stdin.isatty():
+        print("\n[FAIL] Not running in a terminal; pass --yes to run without confirmation")
+        return 1
+    if not confirm(args, calls):
+        return 0
+    
+    status = run_generation(plans, journal, args.only_missing, deferred)
+    if status:
+        return status
     
     print("\n" + "=" * 60)
     print("[PASS] Cache generation complete!")
@@ -198,5 +304,4 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    import sys
     sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Selective demo cache invalidation
+Compares the version stored with every cache entry against the current
+model, prompts and generation parameters, and regenerates only the
+entries whose version changed. Entries written before versioning are
+reported and regenerated with --include-unversioned.
+
+Usage: python invalidate_cache.py [paper_id ...] [--dry-run] [--include-unversioned] [--prune] [--yes]
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+
+import yaml
+from dotenv import load_dotenv
+
+from backend.cache_tasks import SOURCES_KEY, key_version, plan_tasks, sources_entry
+from generate_cache import print_usage_summary, run_tasks
+from tools.pdf_parser import PaperParser
+from utils.cache_versions import split_key
+from utils.response_cache import get_cache
+
+load_dotenv()
+
+def classify(entries, tasks, include_unversioned):
+    """
+    Split a paper's entries by version state.
+
+    Returns:
+        (tasks to rerun, stored keys they replace, stale stored keys no task
+        generates, current entry count)
+    """
+    planned = {task.key: task for task in tasks}
+    rerun = {}
+    replaced = []
+    orphaned = []
+    current = 0
+    for stored_key in entries:
+        key, version = split_key(stored_key)
+        wanted = key_version(key)
+        if wanted is None or version == wanted:
+            current += 1
+            continue
+        if version is None and not include_unversioned:
+            continue
+        if key in planned:
+            rerun[key] = planned[key]
+            replaced.append(stored_key)
+        else:
+            orphaned.append(stored_key)
+    return list(rerun.values()), replaced, orphaned, current
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Regenerate demo cache entries whose version changed")
+    arg_parser.add_argument("papers", nargs="*", help="Paper ids (default: every cached sample paper)")
+    arg_parser.add_argument("--dry-run", action="store_true",
+                            help="Only report what would be regenerated")
+    arg_parser.add_argument("--include-unversioned", action="store_true",
+                            help="Also regenerate entries written before cache versioning")
+    arg_parser.add_argument("--prune", action="store_true",
+                            help="Delete outdated entries no generator task produces (e.g. live answers)")
+    arg_parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    args = arg_parser.parse_args()
+
+    print("=" * 60)
+    print("Research Paper Chat - Cache Invalidation")
+    print("=" * 60)
+
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    paper_configs = {paper['id']: paper for paper in config['sample_papers']}
+    # Plan the question bank too, so its entries are regenerated rather than orphaned
+    bank_size = (config.get('question_bank') or {}).get('questions_per_paper', 0)
+
+    cache = get_cache()
+    paper_ids = args.papers or [p for p in paper_configs if p in cache.list_cached_papers()]
+
+    plans = []
+    for paper_id in paper_ids:
+        paper = paper_configs.get(paper_id)
+        entries = cache.read_paper(paper_id)
+        if paper is None or entries is None:
+            print(f"\n[WARN] {paper_id}: no sample paper config or cache, skipped")
+            continue
+        paper_path = f"data/sample_papers/{paper['file']}"
+        if not os.path.exists(paper_path):
+            print(f"\n[WARN] {paper_id}: paper not found at {paper_path}, skipped")
+            continue
+
+        parser = PaperParser(paper_path)
+        parser.extract_sections()
+        tasks = plan_tasks(paper, parser, question_bank=bank_size)
+        rerun, replaced, orphaned, current = classify(entries, tasks, args.include_unversioned)
+        unversioned = sum(
+            1 for stored_key in entries
+            if split_key(stored_key)[1] is None and key_version(stored_key) is not None
+        )
+
+        print(f"\n[INFO] {paper_id}: {len(entries)} entries, {current} current, {unversioned} unversioned")
+        by_agent = Counter(task.agent for task in rerun)
+        for agent, count in sorted(by_agent.items()):
+            print(f"  {agent}: {count} to regenerate")
+        if orphaned:
+            action = "will be deleted" if args.prune else "left in place (--prune deletes them)"
+            print(f"  {len(orphaned)} outdated entries without a generator task {action}")
+        plans.append((paper, entries, rerun, replaced, orphaned))
+
+    calls = sum(len(rerun) for _, _, rerun, _, _ in plans)
+    deletions = sum(len(orphaned) for _, _, _, _, orphaned in plans) if args.prune else 0
+    print(f"\n[INFO] {calls} API calls needed")
+    if args.dry_run or (calls == 0 and deletions == 0):
+        print("[PASS] Nothing changed" + (" (dry run)" if args.dry_run else ""))
+        return 0
+
+    if not args.yes and not sys.stdin.isatty():
+        print("\n[FAIL] Not running in a terminal; pass --yes to run without confirmation")
+        return 1
+    if not args.yes:
+        response = input("\nContinue? (yes/no): ")
+        if response.lower() != 'yes':
+            print("Cancelled.")
+            return 0
+
+    failed = 0
+    for paper, _, rerun, replaced, orphaned in plans:
+        print(f"\n[INFO] {paper['id']}: regenerating {len(rerun)} entries...")
+        fresh = {}
+        run_tasks(rerun, fresh)
+        failed += len(rerun) - len(fresh)
+
+        # Keep an old answer until its replacement exists
+        regenerated = {task.key for task in rerun if task.stored_key in fresh}
+        saved = {}
+
+        def merge(entries):
+            # Current entries, re-read under the cache's write lock, so live
+            # answers written while regenerating are kept
+            updated = {
+                stored_key: response for stored_key, response in (entries or {}).items()
+                if not (stored_key in replaced and split_key(stored_key)[0] in regenerated)
+                and not (args.prune and stored_key in orphaned)
+            }
+            updated.update(fresh)
+            updated[SOURCES_KEY] = sources_entry(updated, [task for task in rerun if task.stored_key in fresh])
+            saved["entries"] = len(updated)
+            return updated
+
+        cache.update_paper(paper['id'], merge)
+        print(f"[INFO] {paper['id']}: {saved['entries']} entries saved")
+
+    print_usage_summary()
+
+    if failed:
+        print(f"\n[WARN] {failed} entries could not be regenerated; their old versions were kept")
+        return 1
+    print("\n[PASS] Cache entries are up to date")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
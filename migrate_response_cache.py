@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Migrate demo-mode response caches from JSON files to SQLite or the shared store
+Imports every data/cached_responses/<paper_id>.json into the SQLite
+response cache (or, with --target shared, the shared_cache backend) and
+verifies each entry afterwards. Set response_cache.backend to "sqlite" or
+"shared" in config.yaml to use it. The in-memory shared backend is refused
+as a target, since it is gone when the script exits; the source directory
+is only read.
+
+Usage: python migrate_response_cache.py [--cache-dir data/cached_responses] [--target sqlite|shared] [--backend sqlite|redis] [--db data/cached_responses.sqlite3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from utils.cache_backend import create_backend
+from utils.config import get_config
+from utils.response_cache import ResponseCache, SharedResponseCache, SQLiteResponseCache
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Migrate JSON response caches to SQLite or the shared store")
+    arg_parser.add_argument("--cache-dir", default="data/cached_responses",
+                            help="Directory with <paper_id>.json cache files")
+    arg_parser.add_argument("--target", default="sqlite", choices=["sqlite", "shared"],
+                            help="SQLite database, or the shared_cache backend from config.yaml")
+    arg_parser.add_argument("--db", default="data/cached_responses.sqlite3",
+                            help="SQLite database to create or update")
+    arg_parser.add_argument("--backend", default=None, choices=["sqlite", "redis"],
+                            help="Shared store for --target shared (default: shared_cache.backend)")
+    args = arg_parser.parse_args()
+
+    print("=" * 60)
+    print("Research Paper Chat - Response Cache Migration")
+    print("=" * 60)
+
+    if not os.path.isdir(args.cache_dir):
+        print(f"\n[FAIL] Cache directory not found: {args.cache_dir}")
+        return 1
+
+    if args.target == "shared":
+        settings = dict(get_config().get("shared_cache", {}) or {})
+        if args.backend:
+            settings["backend"] = args.backend
+        if settings.get("backend", "memory") == "memory":
+            print("\n[FAIL] shared_cache.backend is \"memory\", which does not outlive this script; "
+                  "pass --backend sqlite or --backend redis")
+            return 1
+        store = SharedResponseCache(create_backend(settings))
+
+    source = ResponseCache(args.cache_dir, read_only=True)
+    paper_ids = sorted(source.rebuild_index())
+    print(f"\n[INFO] {len(paper_ids)} JSON caches in {args.cache_dir}")
+    if args.target == "shared":
+        print(f"[INFO] Target: shared {store.backend.name} backend")
+    else:
+        store = SQLiteResponseCache(args.db)
+        print(f"[INFO] Target database: {args.db}")
+    start = time.perf_counter()
+    migrated = 0
+    entries = 0
+    failed = []
+
+    for paper_id in paper_ids:
+        try:
+            # Paper file plus any journalled entries
+            cache_data = source.read_paper(paper_id)
+            store.save_cache(paper_id, cache_data)
+
+            stored = store.read_paper(paper_id)
+            if stored != cache_data:
+                raise ValueError("stored entries differ from the JSON file")
+        except Exception as e:
+            print(f"  [FAIL] {paper_id}: {e}")
+            failed.append(paper_id)
+            continue
+
+        migrated += 1
+        entries += len(cache_data)
+        print(f"  [PASS] {paper_id} ({len(cache_data)} entries)")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n[INFO] Migrated {migrated} papers, {entries} entries in {elapsed:.2f}s")
+
+    if failed:
+        print(f"[FAIL] {len(failed)} papers could not be migrated: {', '.join(failed)}")
+        return 1
+
+    print("[PASS] All caches migrated and verified")
+    print(f'[INFO] Set response_cache.backend: "{args.target}" in config.yaml to use it')
+    if args.target == "shared" and args.backend:
+        print(f'[INFO] Set shared_cache.backend: "{args.backend}" too')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Cache Admin - response cache hit ratios, lookup latency and the keys demo
+users miss most (candidates for precomputation).
+
+Metrics are per server process and reset on restart. The page is only
+shown once CACHE_ADMIN_TOKEN (environment or Streamlit secrets) is set,
+and then asks for that token.
+"""
+
+import json
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+
+from utils.cache_metrics import LATENCY_BUCKETS_MS, get_cache_metrics
+from utils.response_cache import get_cache
+
+st.set_page_config(page_title="Cache Admin", page_icon="🗄️", layout="wide")
+
+admin_token = os.getenv("CACHE_ADMIN_TOKEN")
+if not admin_token:
+    try:
+        admin_token = st.secrets.get("CACHE_ADMIN_TOKEN")
+    except Exception:
+        # No secrets.toml in local dev
+        admin_token = None
+
+# Fail closed: missed queries are other users' questions
+if not admin_token:
+    st.error("🔒 Cache Admin is disabled: set CACHE_ADMIN_TOKEN (environment or Streamlit secrets) to enable it")
+    st.stop()
+
+if st.session_state.get("cache_admin_token") != admin_token:
+    entered = st.text_input("Admin token:", type="password")
+    if entered != admin_token:
+        if entered:
+            st.error("❌ Wrong token")
+        st.stop()
+    st.session_state.cache_admin_token = entered
+
+metrics = get_cache_metrics()
+cache = get_cache()
+
+st.markdown("## 🗄️ Response Cache")
+
+totals = metrics.totals()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Lookups", totals["lookups"])
+col2.metric("Hit ratio", f"{totals['hit_ratio']:.1%}" if totals["hit_ratio"] is not None else "–")
+col3.metric("Fallbacks", totals["fallbacks"], help="Served a more general entry (generic explain, chat_general)")
+col4.metric("Misses", totals["misses"])
+st.caption(f"Since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(totals['since']))}")
+
+with st.expander("Storage", expanded=False):
+    st.json(cache.stats())
+
+st.markdown("#### Per paper and query type")
+summary = metrics.summary()
+if summary:
+    st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+else:
+    st.info("No cache lookups yet")
+
+st.markdown("#### Lookup latency")
+papers = sorted({row["paper_id"] for row in summary})
+query_types = sorted({row["query_type"] for row in summary})
+col1, col2 = st.columns(2)
+paper_filter = col1.selectbox("Paper:", ["All"] + papers)
+type_filter = col2.selectbox("Query type:", ["All"] + query_types)
+histogram = metrics.histogram(
+    paper_id=None if paper_filter == "All" else paper_filter,
+    query_type=None if type_filter == "All" else type_filter
+)
+histogram_frame = pd.DataFrame({
+    "latency": [f"≤ {row['le_ms']:g} ms" if row["le_ms"] != float("inf") else f"> {LATENCY_BUCKETS_MS[-1]:g} ms" for row in histogram],
+    "lookups": [row["count"] for row in histogram],
+}).set_index("latency")
+st.bar_chart(histogram_frame, sort=False)
+
+st.markdown("#### Most missed keys")
+top_n = st.slider("Show:", 5, 100, 20)
+top_misses = metrics.top_misses(top_n, paper_id=None if paper_filter == "All" else paper_filter)
+if top_misses:
+    st.dataframe(
+        pd.DataFrame([{**row, "queries": " | ".join(row["queries"])} for row in top_misses]),
+        use_container_width=True,
+        hide_index=True
+    )
+else:
+    st.info("No missed keys")
+
+col1, col2 = st.columns(2)
+report = {"totals": totals, "summary": summary, "top_misses": metrics.top_misses(100)}
+col1.download_button(
+    "⬇️ Download report (JSON)",
+    json.dumps(report, indent=2, default=str),
+    file_name="cache_metrics.json",
+    mime="application/json",
+    use_container_width=True
+)
+if col2.button("🔄 Reset metrics", use_container_width=True):
+    metrics.reset()
+    st.rerun()
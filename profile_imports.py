@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Import-time profiler for Research Paper Chat cold start
+Runs `python -X importtime` on the modules app.py loads at startup and
+reports the cumulative import time, the slowest modules, and any heavy
+dependency that was pulled in too early.
+
+Usage: python profile_imports.py [--runs 5] [--budget-ms 300] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules imported by app.py before the first page renders (demo mode)
+STARTUP_MODULES = [
+    "tools.pdf_parser",
+    "backend.mode_handler",
+]
+
+# Heavy packages that must only load on first use
+DEFERRED_PACKAGES = [
+    "google.generativeai",
+    "google.ai.generativelanguage",
+    "grpc",
+    "pdfplumber",
+    "pdfminer",
+    "numpy",
+]
+
+def profile_once(modules):
+    """Import modules in a fresh interpreter and parse -X importtime output"""
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # Format: "import time:  <self us> | <cumulative us> | <indented module>"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        timings[name.strip()] = {
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us)
+        }
+    return timings
+
+def summarize(timings, modules):
+    """Total cold-start time and offending heavy imports for one run"""
+    total_us = sum(timings.get(m, {}).get("cumulative_us", 0) for m in modules)
+    loaded_early = sorted(
+        name for name in timings
+        if any(name == pkg or name.startswith(pkg + ".") for pkg in DEFERRED_PACKAGES)
+    )
+    return total_us / 1000.0, loaded_early
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Profile cold-start import time")
+    arg_parser.add_argument("--modules", nargs="+", default=STARTUP_MODULES,
+                            help="Modules to import (default: app startup modules)")
+    arg_parser.add_argument("--runs", type=int, default=5,
+                            help="Fresh-interpreter runs; the median is reported")
+    arg_parser.add_argument("--top", type=int, default=15,
+                            help="Number of slowest modules to list")
+    arg_parser.add_argument("--budget-ms", type=float, default=None,
+                            help="Fail if the median import time exceeds this")
+    arg_parser.add_argument("--json", dest="json_path", default=None,
+                            help="Write the metrics to this JSON file")
+    args = arg_parser.parse_args()
+
+    print("=" * 60)
+    print("Research Paper Chat - Import Time Profile")
+    print("=" * 60)
+
+    runs = []
+    for _ in range(args.runs):
+        timings = profile_once(args.modules)
+        total_ms, loaded_early = summarize(timings, args.modules)
+        runs.append((total_ms, timings, loaded_early))
+
+    median_ms = statistics.median(run[0] for run in runs)
+    _, timings, loaded_early = min(runs, key=lambda run: abs(run[0] - median_ms))
+
+    print(f"\n[INFO] Modules: {', '.join(args.modules)}")
+    print(f"[INFO] Cold-start import time (median of {args.runs}): {median_ms:.1f} ms")
+    print(f"[INFO] Modules loaded: {len(timings)}")
+
+    print(f"\nSlowest {args.top} imports (cumulative):")
+    slowest = sorted(timings.items(), key=lambda item: item[1]["cumulative_us"], reverse=True)
+    for name, timing in slowest[:args.top]:
+        print(f"  {timing['cumulative_us'] / 1000.0:8.1f} ms  {name}")
+
+    ok = True
+    if loaded_early:
+        ok = False
+        print("\n[FAIL] Heavy packages imported at startup:")
+        for name in loaded_early[:20]:
+            print(f"     - {name}")
+    else:
+        print("\n[PASS] No Gemini SDK / PDF stack / NumPy imported at startup")
+
+    if args.budget_ms is not None:
+        if median_ms > args.budget_ms:
+            ok = False
+            print(f"[FAIL] {median_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+        else:
+            print(f"[PASS] Within budget of {args.budget_ms:.1f} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                "modules": args.modules,
+                "runs": args.runs,
+                "median_ms": round(median_ms, 2),
+                "all_runs_ms": [round(run[0], 2) for run in runs],
+                "modules_loaded": len(timings),
+                "heavy_imports": loaded_early,
+                "slowest": [
+                    {"module": name, "cumulative_ms": timing["cumulative_us"] / 1000.0}
+                    for name, timing in slowest[:args.top]
+                ]
+            }, f, indent=2)
+        print(f"[INFO] Metrics saved to: {args.json_path}")
+
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Tests for utils.cache_backend - the same round trips through every store.
+"""
+
+import time
+
+import pytest
+
+from utils.cache_backend import MemoryBackend, RedisBackend, SQLiteBackend
+from utils.response_cache import SharedResponseCache
+
+
+def redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisBackend(client=fakeredis.FakeRedis(), prefix="test:")
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "shared.sqlite3"))
+    return redis_backend()
+
+
+def test_set_get_delete(backend):
+    backend.set("ns", "key", "value")
+    assert backend.get("ns", "key") == "value"
+    assert backend.get("other", "key") is None
+
+    backend.delete("ns", "key")
+    assert backend.get("ns", "key") is None
+
+
+def test_namespaces_are_separate(backend):
+    backend.set_many("papers/a", {"summary": "A", "quiz": "QA"})
+    backend.set("papers/b", "summary", "B")
+
+    assert sorted(backend.keys("papers/a")) == ["quiz", "summary"]
+    assert backend.get_all("papers/b") == {"summary": "B"}
+
+    backend.clear("papers/a")
+    assert backend.keys("papers/a") == []
+    assert backend.get("papers/b", "summary") == "B"
+
+
+def test_special_characters_in_namespaces(backend):
+    # Glob characters must not widen a namespace scan
+    backend.set("papers/[a]*", "key", "1")
+    backend.set("papers/ab", "key", "2")
+    assert backend.get_all("papers/[a]*") == {"key": "1"}
+
+
+def test_upsert_reports_new_keys(backend):
+    assert backend.upsert("ns", "key", "v1") is True
+    assert backend.upsert("ns", "key", "v2") is False
+    assert backend.get("ns", "key") == "v2"
+
+
+def test_incr(backend):
+    assert backend.incr("counts", "paper") == 1
+    assert backend.incr("counts", "paper", 4) == 5
+    assert int(backend.get("counts", "paper")) == 5
+
+
+def test_ttl_expires(backend):
+    backend.set("ns", "short", "value", ttl=0.1)
+    backend.set("ns", "long", "value")
+    time.sleep(0.2)
+    assert backend.get("ns", "short") is None
+    assert backend.keys("ns") == ["long"]
+
+
+def test_shared_response_cache_round_trip(backend):
+    cache = SharedResponseCache(backend)
+    cache.save_cache("paper", {"summary": "S", "quiz_general": "Q"})
+    cache.set_entry("paper", "chat_what_is_attention", "A")
+
+    assert cache.list_cached_papers() == ["paper"]
+    assert cache.read_paper("paper") == {"summary": "S", "quiz_general": "Q", "chat_what_is_attention": "A"}
+    assert cache.entry_count("paper") == 3
+    assert cache.get_response("paper", "quiz") == "Q"
+    assert cache.get_response("paper", "chat", query="what is attention") == "A"
+
+    # A second replica on the same store sees the same entries
+    assert SharedResponseCache(backend).read_paper("paper") == cache.read_paper("paper")
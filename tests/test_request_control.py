@@ -0,0 +1,81 @@
+"""
+Tests for utils.request_control - deadlines and cooperative cancellation.
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils.rate_limiter import RateLimiter
+from utils.request_control import (
+    CancellationToken, DeadlineExceeded, RequestCancelled, cancellation_scope, current_token,
+    run_with_deadline
+)
+
+
+def test_returns_the_result_within_the_deadline():
+    assert run_with_deadline(lambda: 42, timeout=1.0) == 42
+
+
+def test_deadline_fires_and_cancels_the_worker():
+    seen = {}
+    stopped = threading.Event()
+
+    def slow():
+        seen["token"] = current_token()
+        # A cooperative worker stops once its token is cancelled
+        while not seen["token"].cancelled:
+            time.sleep(0.01)
+        stopped.set()
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        run_with_deadline(slow, timeout=0.2)
+    assert time.monotonic() - start < 1.0
+    assert stopped.wait(1.0)
+
+
+def test_token_cancels_the_wait():
+    token = CancellationToken()
+    threading.Timer(0.1, token.cancel).start()
+
+    start = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        run_with_deadline(lambda: time.sleep(2), cancel_token=token)
+    assert time.monotonic() - start < 1.0
+
+
+def test_cancelled_token_fails_before_running():
+    token = CancellationToken()
+    token.cancel()
+    ran = []
+
+    with pytest.raises(RequestCancelled):
+        run_with_deadline(lambda: ran.append(1), cancel_token=token)
+    assert not ran
+
+
+def test_parent_cancellation_reaches_child_and_scope():
+    parent = CancellationToken()
+    child = CancellationToken(parent=parent)
+    with cancellation_scope(child):
+        assert current_token() is child
+        parent.cancel()
+        with pytest.raises(RequestCancelled):
+            current_token().raise_if_cancelled()
+    assert current_token() is None
+
+
+def test_cancelled_request_does_not_take_a_rate_limit_slot():
+    limiter = RateLimiter(rpm=1)
+    assert limiter.acquire()
+    token = CancellationToken()
+
+    # The worker waits for the next slot until the caller cancels
+    threading.Timer(0.1, token.cancel).start()
+    with pytest.raises(RequestCancelled):
+        run_with_deadline(lambda: limiter.acquire(30, cancel_token=current_token()), cancel_token=token)
+    # Give the worker time to notice; only the first request was counted
+    time.sleep(0.3)
+    assert limiter.remaining()["day"] == limiter.rpd - 1
@@ -0,0 +1,75 @@
+"""
+Tests for the response cache journal - set_entry appends, compact folds it in.
+"""
+
+import os
+
+import pytest
+
+import utils.response_cache as response_cache
+from utils.response_cache import JOURNAL_SUFFIX, ResponseCache, read_journal
+
+
+@pytest.fixture(params=["json", "compressed"])
+def cache_dir(request, tmp_path):
+    """A cache directory holding one saved paper in each file format."""
+    ResponseCache(str(tmp_path), format=request.param).save_cache("paper", {"summary": "S", "quiz_general": "Q"})
+    return tmp_path
+
+
+def journal_path(cache_dir):
+    return os.path.join(str(cache_dir), f"paper{JOURNAL_SUFFIX}")
+
+
+def test_set_entry_appends_to_the_journal(cache_dir):
+    cache = ResponseCache(str(cache_dir))
+    cache.set_entry("paper", "chat_what_is_attention", "A")
+    cache.set_entry("paper", "summary", "S2")
+
+    assert read_journal(journal_path(cache_dir)) == {"chat_what_is_attention": "A", "summary": "S2"}
+    assert cache.get_entry("paper", "summary") == "S2"
+
+
+def test_compact_then_reload(cache_dir):
+    cache = ResponseCache(str(cache_dir))
+    cache.set_entry("paper", "chat_what_is_attention", "A")
+    cache.set_entry("paper", "summary", "S2")
+    cache.compact("paper")
+
+    assert not os.path.exists(journal_path(cache_dir))
+    reloaded = ResponseCache(str(cache_dir))
+    assert reloaded.read_paper("paper") == {"summary": "S2", "quiz_general": "Q", "chat_what_is_attention": "A"}
+    assert reloaded.get_response("paper", "quiz") == "Q"
+
+
+def test_journal_is_compacted_once_it_grows(cache_dir, monkeypatch):
+    monkeypatch.setattr(response_cache, "MIN_COMPACT_BYTES", 0)
+    cache = ResponseCache(str(cache_dir))
+    for i in range(20):
+        cache.set_entry("paper", f"chat_question_{i}", "answer " * 20)
+
+    # The journal never grows past the paper file before being folded in
+    assert len(read_journal(journal_path(cache_dir))) < 20
+    assert len(ResponseCache(str(cache_dir)).read_paper("paper")) == 22
+
+
+def test_torn_record_is_skipped_and_next_append_survives(cache_dir):
+    cache = ResponseCache(str(cache_dir))
+    cache.set_entry("paper", "summary", "S2")
+    with open(journal_path(cache_dir), "a") as f:
+        f.write('{"key": "chat_torn", "resp')  # crash mid-append
+
+    cache.set_entry("paper", "quiz_general", "Q2")
+    entries = ResponseCache(str(cache_dir)).read_paper("paper")
+    assert entries["summary"] == "S2"
+    assert entries["quiz_general"] == "Q2"
+    assert "chat_torn" not in entries
+
+
+def test_entries_from_another_process_are_seen(cache_dir, monkeypatch):
+    monkeypatch.setattr(response_cache, "STALE_CHECK_SECONDS", 0)
+    reader = ResponseCache(str(cache_dir))
+    assert reader.get_entry("paper", "summary") == "S"
+
+    ResponseCache(str(cache_dir)).set_entry("paper", "summary", "S2")
+    assert reader.get_entry("paper", "summary") == "S2"
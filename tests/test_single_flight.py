@@ -0,0 +1,104 @@
+"""
+Tests for utils.single_flight - concurrent identical calls share one execution.
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+CALLERS = 8
+
+
+def run_concurrently(flight, key, fn, callers=CALLERS):
+    """Call flight.do(key, fn) from several threads; returns (results, errors)."""
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            value = flight.do(key, fn)
+            with lock:
+                results.append(value)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results, errors = run_concurrently(flight, "key", slow)
+    # Let every follower join the leader's call before it finishes
+    while flight.stats()["coalesced"] < CALLERS - 1:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == ["answer"] * CALLERS
+    assert not errors
+    assert flight.stats()["executed"] == 1
+    assert flight.in_flight() == 0
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    threads, results, errors = run_concurrently(flight, "key", failing)
+    while flight.stats()["coalesced"] < CALLERS - 1:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert not results
+    assert len(errors) == CALLERS
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flight = SingleFlight()
+    calls = []
+
+    def record(value):
+        calls.append(value)
+        return value
+
+    assert flight.do("a", lambda: record("a")) == "a"
+    assert flight.do("b", lambda: record("b")) == "b"
+    # A finished call is not reused
+    assert flight.do("a", lambda: record("a2")) == "a2"
+    assert calls == ["a", "b", "a2"]
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_failed_call_is_not_cached():
+    flight = SingleFlight()
+
+    def boom():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", boom)
+    assert flight.do("key", lambda: "retried") == "retried"
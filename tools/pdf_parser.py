@@ -1,15 +1,24 @@
 """
 PDF parsing utilities for extracting text and sections from research papers.
+
+Extracted text is cached by PDF content hash in the shared cache backend
+when "parse" is listed in shared_cache.layers, so a PDF opened again (by
+any session or replica) is not re-extracted.
 """
 
-import pdfplumber
+import hashlib
 import re
 from typing import Dict, List, Optional
+from utils.cache_backend import shared_backend_for
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump when text extraction changes so cached text is not reused
+EXTRACTOR_VERSION = "1"
+PARSE_NAMESPACE = "parse"
+
 
 class PaperParser:
     """Parse research papers and extract structured content."""
@@ -19,8 +28,33 @@ class PaperParser:
         self.full_text = ""
         self.sections = {}
         
+    def _content_key(self) -> str:
+        """Cache key of the PDF: extractor version plus content hash."""
+        digest = hashlib.sha256()
+        with open(self.pdf_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return f"v{EXTRACTOR_VERSION}-{digest.hexdigest()}"
+    
     def extract_all_text(self) -> str:
-        """Extract all text from PDF."""
+        """Extract all text from PDF (or reuse text cached for identical content)."""
+        backend = shared_backend_for(PARSE_NAMESPACE)
+        content_key = None
+        if backend is not None:
+            try:
+                content_key = self._content_key()
+                cached = backend.get(PARSE_NAMESPACE, content_key)
+            except Exception as e:
+                logger.warning(f"Parse cache unavailable: {e}")
+                cached = None
+            if cached:
+                self.full_text = cached
+                logger.info(f"Reused {len(cached)} characters of cached PDF text")
+                return self.full_text
+        
+        # Imported here so the app can start without the PDF stack
+        import pdfplumber
+        
         try:
             text_content = []
             with pdfplumber.open(self.pdf_path) as pdf:
@@ -31,6 +65,12 @@ class PaperParser:
             
             self.full_text = "\n\n".join(text_content)
             logger.info(f"Extracted {len(self.full_text)} characters from PDF")
+            
+            if content_key is not None and self.full_text:
+                try:
+                    backend.set(PARSE_NAMESPACE, content_key, self.full_text)
+                except Exception as e:
+                    logger.warning(f"Could not cache PDF text: {e}")
             return self.full_text
             
         except Exception as e:
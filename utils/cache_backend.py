@@ -0,0 +1,385 @@
+"""
+Shared cache backends - key-value storage that several app replicas can
+use together, so one replica's cached work serves the others.
+
+Each cache layer uses its own namespace (e.g. "parse", "routing",
+"responses/<paper_id>"). Values are strings; callers serialize.
+
+- MemoryBackend: this process only (single replica, tests)
+- SQLiteBackend: processes on one host, WAL mode
+- RedisBackend: any host; needs the optional redis package (or a
+  fakeredis client for tests)
+"""
+
+import os
+import re
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from utils.config import get_config
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Interface of a namespaced string key-value store."""
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        """Value for key, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        """Store a value, expiring after ttl seconds if given."""
+
+    @abstractmethod
+    def upsert(self, namespace: str, key: str, value: str) -> bool:
+        """Store a value without expiry; True if the key did not exist before (atomic)."""
+
+    @abstractmethod
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        """Add amount to an integer value (missing counts as 0); returns the new value."""
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        """Delete a key if it exists."""
+
+    @abstractmethod
+    def keys(self, namespace: str) -> List[str]:
+        """All live keys of a namespace."""
+
+    @abstractmethod
+    def clear(self, namespace: str):
+        """Delete every key of a namespace."""
+
+    def get_all(self, namespace: str) -> Dict[str, str]:
+        """Every live key and value of a namespace."""
+        values = {key: self.get(namespace, key) for key in self.keys(namespace)}
+        return {key: value for key, value in values.items() if value is not None}
+
+    def set_many(self, namespace: str, values: Dict[str, str]):
+        for key, value in values.items():
+            self.set(namespace, key, value)
+
+    def stats(self) -> Dict:
+        return {"backend": self.name}
+
+
+class MemoryBackend(CacheBackend):
+    """In-process dict with TTLs, bounded by least recently used eviction."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        # (namespace, key) -> (value, expires_at or None), least recently used first
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[(namespace, key)] = (value, expires_at)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _live(self, entry_key: tuple) -> bool:
+        """Whether an entry exists and has not expired (call with the lock held)."""
+        entry = self._entries.get(entry_key)
+        return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+    def upsert(self, namespace: str, key: str, value: str) -> bool:
+        with self._lock:
+            created = not self._live((namespace, key))
+        self.set(namespace, key, value)
+        return created
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        with self._lock:
+            entry_key = (namespace, key)
+            value = int(self._entries[entry_key][0]) + amount if self._live(entry_key) else amount
+            self._entries[entry_key] = (str(value), None)
+            self._entries.move_to_end(entry_key)
+            return value
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def keys(self, namespace: str) -> List[str]:
+        now = time.time()
+        with self._lock:
+            return [
+                key for (entry_namespace, key), (_, expires_at) in self._entries.items()
+                if entry_namespace == namespace and (expires_at is None or expires_at > now)
+            ]
+
+    def clear(self, namespace: str):
+        with self._lock:
+            for entry in [entry for entry in self._entries if entry[0] == namespace]:
+                del self._entries[entry]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"backend": self.name, "entries": len(self._entries), "evictions": self.evictions}
+
+
+class SQLiteBackend(CacheBackend):
+    """SQLite table shared by processes on one host (WAL mode)."""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str = "data/cache/shared.sqlite3"):
+        """
+        Args:
+            db_path: SQLite database file (":memory:" for a throwaway store)
+        """
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS kv (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, expires_at)
+            )
+
+    def set_many(self, namespace: str, values: Dict[str, str]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, NULL)",
+                ((namespace, key, value) for key, value in values.items())
+            )
+
+    def upsert(self, namespace: str, key: str, value: str) -> bool:
+        with self._lock, self._conn:
+            existed = self._conn.execute(
+                "SELECT 1 FROM kv WHERE namespace = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, key, time.time())
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, NULL)",
+                (namespace, key, value)
+            )
+        return existed is None
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, NULL) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET value = CAST("
+                "CASE WHEN expires_at IS NULL OR expires_at > ? THEN CAST(value AS INTEGER) ELSE 0 END "
+                "+ ? AS TEXT), expires_at = NULL",
+                (namespace, key, str(amount), time.time(), amount)
+            )
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return int(row[0])
+
+    def delete(self, namespace: str, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def keys(self, namespace: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, time.time())
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_all(self, namespace: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, time.time())
+            ).fetchall()
+        return dict(rows)
+
+    def clear(self, namespace: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM kv WHERE namespace = ?", (namespace,))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+        return {"backend": self.name, "entries": entries, "db_path": self.db_path}
+
+
+_GLOB_SPECIAL = re.compile(r"([*?\[\]\\])")
+
+
+class RedisBackend(CacheBackend):
+    """Redis (or anything speaking its protocol) shared by every replica."""
+
+    name = "redis"
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "rpc:", client=None):
+        """
+        Args:
+            url: Redis server URL (ignored when client is given)
+            prefix: Prepended to every key so several apps can share a server
+            client: Existing client, e.g. fakeredis.FakeRedis() in tests
+        """
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("The redis backend requires the redis package (pip install redis)")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    def _pattern(self, namespace: str) -> str:
+        return _GLOB_SPECIAL.sub(r"\\\1", f"{self.prefix}{namespace}:") + "*"
+
+    @staticmethod
+    def _text(value) -> Optional[str]:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        return self._text(self.client.get(self._key(namespace, key)))
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        self.client.set(self._key(namespace, key), value, px=int(ttl * 1000) if ttl else None)
+
+    def set_many(self, namespace: str, values: Dict[str, str]):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.set(self._key(namespace, key), value)
+        pipeline.execute()
+
+    def upsert(self, namespace: str, key: str, value: str) -> bool:
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.exists(self._key(namespace, key))
+        pipeline.set(self._key(namespace, key), value)
+        existed, _ = pipeline.execute()
+        return not existed
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        return int(self.client.incrby(self._key(namespace, key), amount))
+
+    def delete(self, namespace: str, key: str):
+        self.client.delete(self._key(namespace, key))
+
+    def _scan(self, namespace: str) -> List[str]:
+        return [self._text(name) for name in self.client.scan_iter(match=self._pattern(namespace), count=500)]
+
+    def keys(self, namespace: str) -> List[str]:
+        start = len(self._key(namespace, ""))
+        return [name[start:] for name in self._scan(namespace)]
+
+    def get_all(self, namespace: str) -> Dict[str, str]:
+        names = self._scan(namespace)
+        if not names:
+            return {}
+        start = len(self._key(namespace, ""))
+        values = self.client.mget(names)
+        return {
+            name[start:]: self._text(value)
+            for name, value in zip(names, values) if value is not None
+        }
+
+    def clear(self, namespace: str):
+        names = self._scan(namespace)
+        if names:
+            self.client.delete(*names)
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, "prefix": self.prefix}
+
+
+def create_backend(settings: Optional[Dict] = None) -> CacheBackend:
+    """
+    Build a backend from shared_cache settings.
+
+    Args:
+        settings: Dict with 'backend' ("memory", "sqlite" or "redis") and
+            its options (defaults to shared_cache in config.yaml)
+    """
+    if settings is None:
+        settings = get_config().get("shared_cache", {}) or {}
+    kind = settings.get("backend", "memory")
+    if kind == "memory":
+        return MemoryBackend(settings.get("max_entries", 10000))
+    if kind == "sqlite":
+        return SQLiteBackend(settings.get("sqlite_path", "data/cache/shared.sqlite3"))
+    if kind == "redis":
+        return RedisBackend(
+            settings.get("redis_url", "redis://localhost:6379/0"),
+            prefix=settings.get("prefix", "rpc:")
+        )
+    raise ValueError(f"Unknown shared_cache backend: {kind}")
+
+
+# Global backend instance
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend() -> CacheBackend:
+    """Get or create the global shared cache backend."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+            logger.info(f"Shared cache backend: {_backend.name}")
+        return _backend
+
+
+def shared_backend_for(layer: str) -> Optional[CacheBackend]:
+    """The shared backend if a cache layer is listed in shared_cache.layers, else None."""
+    layers = (get_config().get("shared_cache", {}) or {}).get("layers", []) or []
+    return get_backend() if layer in layers else None
@@ -0,0 +1,271 @@
+"""
+Compressed paper cache format - entries are compressed one by one with a
+dictionary shared across papers, and decompressed only when accessed.
+
+File layout (<paper_id>.rpc):
+
+    MAGIC | 4-byte big-endian header length | header JSON | entry blobs
+
+The header maps each key to the offset and length of its blob and names
+the codec and dictionary used. Uses zstd when the optional `zstandard`
+package is installed, otherwise zlib with a preset dictionary.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import Counter
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, Optional
+import logging
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RPCZ1\n"
+PACKED_SUFFIX = ".rpc"
+DICT_PREFIX = "dict-"
+
+# zlib only looks back 32 KiB, so larger preset dictionaries are wasted
+ZLIB_DICT_SIZE = 32 * 1024
+ZSTD_DICT_SIZE = 110 * 1024
+
+
+def default_codec() -> str:
+    """Best codec available in this environment."""
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def train_dictionary(samples: Iterable[str], codec: Optional[str] = None) -> bytes:
+    """
+    Build a shared dictionary from sample responses.
+
+    zstd trains a real dictionary; for zlib (or too few samples for zstd
+    training) the dictionary is the most common lines across samples, most
+    frequent last (closest to the data), used as raw content.
+    """
+    codec = codec or default_codec()
+    samples = [s.encode("utf-8") for s in samples if s]
+
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd codec requires the zstandard package")
+        try:
+            return zstandard.train_dictionary(ZSTD_DICT_SIZE, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            logger.warning(f"zstd dictionary training failed ({e}), using common lines")
+
+    line_counts = Counter(
+        line.strip() for sample in samples for line in sample.splitlines()
+        if len(line.strip()) >= 8
+    )
+    chosen = []
+    size = 0
+    for line, count in line_counts.most_common():
+        if count < 2 or size + len(line) + 1 > ZLIB_DICT_SIZE:
+            continue
+        chosen.append(line)
+        size += len(line) + 1
+    return b"\n".join(reversed(chosen))
+
+
+def dictionary_id(dictionary: bytes) -> str:
+    return hashlib.sha256(dictionary).hexdigest()[:12]
+
+
+class Codec:
+    """
+    Per-entry compressor bound to one shared dictionary.
+
+    Safe to share between threads: zstd compressor and decompressor objects
+    are not, so each thread gets its own.
+    """
+
+    def __init__(self, codec: str, dictionary: bytes = b"", level: Optional[int] = None):
+        """
+        Args:
+            codec: "zstd" or "zlib"
+            dictionary: Shared dictionary bytes (empty for none)
+            level: Compression level (codec default if None)
+        """
+        if codec == "zstd" and zstandard is None:
+            raise RuntimeError("zstd codec requires the zstandard package")
+        self.codec = codec
+        self.dictionary = dictionary
+        self.dict_id = dictionary_id(dictionary) if dictionary else None
+
+        if codec == "zstd":
+            self._zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self.level = level or 19
+            self._local = threading.local()
+        else:
+            self.level = level or 9
+
+    def _zstd(self, kind: str):
+        """This thread's ZstdCompressor or ZstdDecompressor (created on first use)."""
+        instance = getattr(self._local, kind, None)
+        if instance is None:
+            if kind == "compressor":
+                instance = zstandard.ZstdCompressor(level=self.level, dict_data=self._zdict)
+            else:
+                instance = zstandard.ZstdDecompressor(dict_data=self._zdict)
+            setattr(self._local, kind, instance)
+        return instance
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._zstd("compressor").compress(data)
+        if self.dictionary:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(self.level)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._zstd("decompressor").decompress(data)
+        if self.dictionary:
+            decompressor = zlib.decompressobj(zdict=self.dictionary)
+        else:
+            decompressor = zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+class DictionaryStore:
+    """Shared dictionaries kept next to the caches as dict-<id>.bin files."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._codecs: Dict[tuple, Codec] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, dict_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{DICT_PREFIX}{dict_id}.bin")
+
+    def save(self, dictionary: bytes) -> Optional[str]:
+        """Store a dictionary; returns its id (None for an empty dictionary, which is not stored)."""
+        if not dictionary:
+            return None
+        dict_id = dictionary_id(dictionary)
+        path = self._path(dict_id)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(dictionary)
+        return dict_id
+
+    def latest(self) -> Optional[str]:
+        """Id of the most recently written dictionary (None if there is none)."""
+        candidates = [
+            entry for entry in os.scandir(self.cache_dir)
+            if entry.name.startswith(DICT_PREFIX) and entry.name.endswith(".bin")
+        ]
+        if not candidates:
+            return None
+        newest = max(candidates, key=lambda entry: entry.stat().st_mtime_ns)
+        return newest.name[len(DICT_PREFIX):-len(".bin")]
+
+    def codec(self, codec: str, dict_id: Optional[str]) -> Codec:
+        """Codec for a codec name and dictionary id (cached)."""
+        key = (codec, dict_id)
+        with self._lock:
+            if key not in self._codecs:
+                dictionary = b""
+                if dict_id:
+                    with open(self._path(dict_id), "rb") as f:
+                        dictionary = f.read()
+                self._codecs[key] = Codec(codec, dictionary)
+            return self._codecs[key]
+
+
+def write_packed(path: str, entries: Dict[str, str], codec: Codec):
+    """Write entries as a packed file, atomically (temp file + rename)."""
+    blobs = []
+    index = {}
+    offset = 0
+    for key, response in entries.items():
+        blob = codec.compress(response.encode("utf-8"))
+        index[key] = [offset, len(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps({
+        "codec": codec.codec,
+        "dict": codec.dict_id,
+        "entries": index
+    }, ensure_ascii=False).encode("utf-8")
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack(">I", len(header)))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PackedEntries(MutableMapping):
+    """
+    One paper's packed cache held compressed in memory.
+
+    Each entry is decompressed when accessed. Assigned entries (e.g.
+    replayed from the journal) are kept uncompressed on top.
+    """
+
+    def __init__(self, path: str, dictionaries: DictionaryStore):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"Not a packed cache file: {path}")
+
+        start = len(MAGIC)
+        (header_length,) = struct.unpack(">I", data[start:start + 4])
+        header = json.loads(data[start + 4:start + 4 + header_length])
+
+        self._blobs = memoryview(data)[start + 4 + header_length:]
+        self._index = header["entries"]
+        self._codec = dictionaries.codec(header["codec"], header.get("dict"))
+        self._overlay: Dict[str, str] = {}
+        self.compressed_bytes = len(data)
+
+    def __getitem__(self, key: str) -> str:
+        if key in self._overlay:
+            return self._overlay[key]
+        offset, length = self._index[key]
+        return self._codec.decompress(bytes(self._blobs[offset:offset + length])).decode("utf-8")
+
+    def __setitem__(self, key: str, value: str):
+        self._overlay[key] = value
+
+    def __delitem__(self, key: str):
+        raise TypeError("Packed cache entries cannot be deleted")
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._index
+        for key in self._overlay:
+            if key not in self._index:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self._index) + sum(1 for key in self._overlay if key not in self._index)
+
+    def __contains__(self, key) -> bool:
+        return key in self._overlay or key in self._index
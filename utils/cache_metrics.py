@@ -0,0 +1,253 @@
+"""
+Response cache metrics - hit ratios, lookup latency histograms and the
+keys demo users miss most, with the raw queries behind them.
+
+Kept in process memory; shown on the Cache Admin page (pages/cache_admin.py).
+"""
+
+import json
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+from utils.config import get_config
+from utils.routing_cache import normalize_query
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lookup outcomes
+HIT = "hit"
+FALLBACK = "fallback"  # served a more general entry (generic explain, chat_general)
+MISS = "miss"
+OUTCOMES = (HIT, FALLBACK, MISS)
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+
+class _GroupStats:
+    """Counters and latency histogram for one (paper_id, query_type)."""
+
+    def __init__(self):
+        self.counts = {outcome: 0 for outcome in OUTCOMES}
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+
+    def add(self, outcome: str, latency_ms: float):
+        self.counts[outcome] += 1
+        self.total_ms += latency_ms
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate latency quantile (upper bound of the bucket it falls in)."""
+        lookups = sum(self.buckets)
+        if not lookups:
+            return None
+        target = q * lookups
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float("inf")
+        return float("inf")
+
+
+class CacheMetrics:
+    """Thread-safe response cache lookup metrics."""
+
+    def __init__(
+        self,
+        max_missed_keys: int = 1000,
+        queries_per_key: int = 5,
+        record_queries: bool = False
+    ):
+        """
+        Initialize metrics.
+
+        Args:
+            max_missed_keys: Distinct missed keys tracked (least missed dropped beyond this)
+            queries_per_key: Most recent raw queries kept per missed key
+            record_queries: Keep raw query text (disable if queries may be sensitive)
+        """
+        self.max_missed_keys = max_missed_keys
+        self.queries_per_key = queries_per_key
+        self.record_queries = record_queries
+        self._lock = threading.Lock()
+        self._groups: Dict[tuple, _GroupStats] = {}
+        self._missed: Counter = Counter()
+        self._queries: Dict[tuple, deque] = {}
+        self.started_at = time.time()
+
+    def record(
+        self,
+        paper_id: str,
+        query_type: str,
+        key: str,
+        outcome: str,
+        latency_ms: float,
+        query: Optional[str] = None
+    ):
+        """
+        Record one cache lookup.
+
+        Args:
+            paper_id: Paper looked up
+            query_type: "explain"/"math"/"code"/"concept", "quiz", "chat", ...
+            key: Key that was wanted. For chat fallbacks this is the
+                normalized question, as there is no cached key for it
+            outcome: HIT, FALLBACK or MISS
+            latency_ms: Lookup time in milliseconds
+            query: Raw user query, if any
+        """
+        with self._lock:
+            group = self._groups.get((paper_id, query_type))
+            if group is None:
+                group = self._groups[(paper_id, query_type)] = _GroupStats()
+            group.add(outcome, latency_ms)
+
+            if outcome == HIT:
+                return
+            missed = (paper_id, query_type, key)
+            self._missed[missed] += 1
+            if self.record_queries and query:
+                self._queries.setdefault(missed, deque(maxlen=self.queries_per_key)).append(query)
+            if len(self._missed) > self.max_missed_keys:
+                self._drop_least_missed()
+
+    def _drop_least_missed(self):
+        # Drop the bottom tenth at once so this stays rare
+        keep = self.max_missed_keys - max(1, self.max_missed_keys // 10)
+        for missed, _ in self._missed.most_common()[keep:]:
+            del self._missed[missed]
+            self._queries.pop(missed, None)
+
+    def summary(self) -> List[Dict]:
+        """
+        Per (paper_id, query_type) lookup counts, hit ratio and latency.
+
+        Returns:
+            Rows sorted by lookups, each with paper_id, query_type, lookups,
+            hit/fallback/miss counts, hit_ratio, mean_ms, p50_ms and p95_ms
+        """
+        with self._lock:
+            rows = []
+            for (paper_id, query_type), group in self._groups.items():
+                lookups = sum(group.counts.values())
+                rows.append({
+                    "paper_id": paper_id,
+                    "query_type": query_type,
+                    "lookups": lookups,
+                    "hits": group.counts[HIT],
+                    "fallbacks": group.counts[FALLBACK],
+                    "misses": group.counts[MISS],
+                    "hit_ratio": group.counts[HIT] / lookups,
+                    "mean_ms": group.total_ms / lookups,
+                    "p50_ms": group.quantile(0.5),
+                    "p95_ms": group.quantile(0.95),
+                })
+        return sorted(rows, key=lambda row: row["lookups"], reverse=True)
+
+    def totals(self) -> Dict:
+        """Lookup counts and hit ratio across all papers."""
+        counts = Counter()
+        with self._lock:
+            for group in self._groups.values():
+                counts.update(group.counts)
+        lookups = sum(counts.values())
+        return {
+            "lookups": lookups,
+            "hits": counts[HIT],
+            "fallbacks": counts[FALLBACK],
+            "misses": counts[MISS],
+            "hit_ratio": counts[HIT] / lookups if lookups else None,
+            "since": self.started_at,
+        }
+
+    def histogram(self, paper_id: Optional[str] = None, query_type: Optional[str] = None) -> List[Dict]:
+        """
+        Lookup latency histogram, optionally for one paper and/or query type.
+
+        Returns:
+            One row per bucket: le_ms (upper bound, inf for the last) and count
+        """
+        buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        with self._lock:
+            for (group_paper, group_type), group in self._groups.items():
+                if paper_id is not None and group_paper != paper_id:
+                    continue
+                if query_type is not None and group_type != query_type:
+                    continue
+                buckets = [a + b for a, b in zip(buckets, group.buckets)]
+        bounds = list(LATENCY_BUCKETS_MS) + [float("inf")]
+        return [{"le_ms": bound, "count": count} for bound, count in zip(bounds, buckets)]
+
+    def top_misses(self, n: int = 20, paper_id: Optional[str] = None) -> List[Dict]:
+        """
+        Most frequently missed keys - candidates for precomputation.
+
+        Returns:
+            Up to n rows with paper_id, query_type, key, count and the most
+            recent raw queries
+        """
+        with self._lock:
+            rows = []
+            for (missed_paper, query_type, key), count in self._missed.most_common():
+                if paper_id is not None and missed_paper != paper_id:
+                    continue
+                rows.append({
+                    "paper_id": missed_paper,
+                    "query_type": query_type,
+                    "key": key,
+                    "count": count,
+                    "queries": list(self._queries.get((missed_paper, query_type, key), ())),
+                })
+                if len(rows) >= n:
+                    break
+        return rows
+
+    def export_json(self, path: str, top_n: int = 100) -> Dict:
+        """Write totals, per-group summary and top misses to a JSON file."""
+        report = {
+            "totals": self.totals(),
+            "summary": self.summary(),
+            "top_misses": self.top_misses(top_n),
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        logger.info(f"Exported cache metrics to {path}")
+        return report
+
+    def reset(self):
+        """Drop all recorded lookups."""
+        with self._lock:
+            self._groups.clear()
+            self._missed.clear()
+            self._queries.clear()
+            self.started_at = time.time()
+
+
+def chat_miss_key(query: str) -> str:
+    """Cache-style key for a chat question with no cached answer."""
+    return "chat_" + normalize_query(query).replace(" ", "_")
+
+
+# Global metrics instance
+_metrics = None
+
+def get_cache_metrics() -> CacheMetrics:
+    """Get or create global cache metrics instance."""
+    global _metrics
+    if _metrics is None:
+        settings = get_config().get("cache_metrics", {})
+        _metrics = CacheMetrics(
+            max_missed_keys=settings.get("max_missed_keys", 1000),
+            queries_per_key=settings.get("queries_per_key", 5),
+            record_queries=settings.get("record_queries", False)
+        )
+    return _metrics
@@ -0,0 +1,35 @@
+"""
+Versioned response cache keys.
+
+A generated entry is stored as "<key>@<version>", where the version is a
+fingerprint of everything that shaped the answer: model, system
+instruction, prompt template and generation parameters (see
+backend.cache_tasks.key_version). Changing any of them changes the
+version, so old entries stop being served and can be found and
+regenerated selectively (invalidate_cache.py).
+"""
+
+import hashlib
+import json
+from typing import Optional, Tuple
+
+VERSION_SEPARATOR = "@"
+
+
+def fingerprint(**parts) -> str:
+    """Short stable hash of JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=5).hexdigest()
+
+
+def versioned_key(key: str, version: Optional[str]) -> str:
+    """Storage key for an entry (key unchanged for unversioned entries)."""
+    return f"{key}{VERSION_SEPARATOR}{version}" if version else key
+
+
+def split_key(stored_key: str) -> Tuple[str, Optional[str]]:
+    """Split a storage key into (key, version); version is None if absent."""
+    key, separator, version = stored_key.rpartition(VERSION_SEPARATOR)
+    if not separator:
+        return stored_key, None
+    return key, version
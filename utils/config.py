@@ -0,0 +1,54 @@
+"""
+Access to config.yaml for backend modules.
+"""
+
+import os
+from typing import Dict
+import yaml
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yaml")
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+# Global config instance
+_config = None
+
+def get_config() -> Dict:
+    """Load config.yaml once and return it (empty dict if missing)."""
+    global _config
+    if _config is None:
+        try:
+            with open(CONFIG_PATH, "r") as f:
+                _config = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            logger.warning(f"Config file not found: {CONFIG_PATH}")
+            _config = {}
+    return _config
+
+
+def default_model() -> str:
+    """Model name from config.yaml (model.name)."""
+    return get_config().get("model", {}).get("name", DEFAULT_MODEL)
+
+
+def get_request_limits(agent: str = None) -> Dict:
+    """
+    Get deadline/hedging settings for an agent.
+
+    Agent-specific values in the request_limits section override the
+    defaults entry.
+
+    Returns:
+        Dict with 'timeout' (seconds or None), 'hedge' (bool) and
+        'hedge_min_delay' (seconds)
+    """
+    limits_config = get_config().get("request_limits", {}) or {}
+    limits = {"timeout": None, "hedge": False, "hedge_min_delay": 1.0}
+    limits.update(limits_config.get("default", {}) or {})
+    if agent:
+        limits.update(limits_config.get(agent, {}) or {})
+    return limits
@@ -0,0 +1,220 @@
+"""
+Persistent exact-match cache for live-mode LLM responses (SQLite).
+"""
+
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Buffered last_access updates are written in one transaction once this many pile up
+ACCESS_FLUSH_BATCH = 64
+
+_refreshing: contextvars.ContextVar = contextvars.ContextVar("llm_cache_refresh", default=False)
+
+
+@contextmanager
+def refresh_cache():
+    """
+    Skip cache reads for calls inside the block (fresh answers still get stored).
+
+    Example:
+        with refresh_cache():
+            agent.process(...)   # regenerates even if the prompt was seen before
+    """
+    token = _refreshing.set(True)
+    try:
+        yield
+    finally:
+        _refreshing.reset(token)
+
+
+def cache_refreshing() -> bool:
+    """Whether the current context asked for fresh answers."""
+    return _refreshing.get()
+
+
+class LLMCache:
+    """SQLite-backed response cache with TTL and size-bounded LRU eviction."""
+
+    def __init__(
+        self,
+        db_path: str = "data/cache/llm_responses.sqlite3",
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 10000
+    ):
+        """
+        Initialize LLM cache.
+
+        Args:
+            db_path: SQLite database file (":memory:" for a throwaway cache)
+            ttl_seconds: Entries older than this are treated as misses
+            max_entries: Least recently used entries are evicted beyond this
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pending_access: Dict[str, float] = {}  # key -> last hit not yet written
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+        # Kept up to date by set/delete so writes need no COUNT(*); re-synced by stats()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _flush_access(self):
+        """Write buffered last_access updates (caller holds the lock and commits)."""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(ts, key) for key, ts in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response.
+
+        Args:
+            key: Request key (see utils.vertex_client.request_key)
+
+        Returns:
+            Cached response or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._pending_access.pop(key, None)
+                cursor = self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= cursor.rowcount
+                self.misses += 1
+                return None
+
+            # Hits only reorder the LRU, so their timestamps are written in batches
+            self._pending_access[key] = now
+            if len(self._pending_access) >= ACCESS_FLUSH_BATCH:
+                self._flush_access()
+                self._conn.commit()
+            self.hits += 1
+
+        logger.info(f"LLM cache hit: {key[:12]}")
+        return response
+
+    def set(self, key: str, response: str):
+        """Store a response, evicting least recently used entries if full."""
+        now = time.time()
+        with self._lock:
+            self._pending_access.pop(key, None)
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO responses (key, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            ).rowcount
+            if inserted:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    "UPDATE responses SET response = ?, created_at = ?, last_access = ? WHERE key = ?",
+                    (response, now, now, key)
+                )
+            if self._count > self.max_entries:
+                # Evict by up-to-date access order
+                self._flush_access()
+                excess = self._count - self.max_entries
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                    (excess,)
+                )
+                self._count -= cursor.rowcount
+                self.evictions += cursor.rowcount
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete all expired entries. Returns the number removed."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            self._flush_access()
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (cutoff,)
+            )
+            self._conn.commit()
+            self._count -= cursor.rowcount
+        return cursor.rowcount
+
+    def clear(self):
+        """Delete all entries."""
+        with self._lock:
+            self._pending_access.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._count = 0
+
+    def flush(self):
+        """Write buffered last_access updates now."""
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+            # Other processes may share the file, so re-sync the running count
+            size = self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": size,
+        }
+
+
+# Global cache instance
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMCache:
+    """Get or create global LLM cache instance."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
@@ -0,0 +1,169 @@
+"""
+Question index - matches chat questions to cached questions by TF-IDF similarity.
+
+Questions are reduced to canonical terms (synonyms folded together, crude
+stems, bigrams) so paraphrases such as "what's new in this paper" and
+"main contribution" share features. Scoring walks NumPy posting arrays
+for the query's terms only, so lookups stay well under a millisecond with
+thousands of cached questions.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.cache_versions import split_key
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Words that carry no matching signal
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are",
+    "was", "were", "be", "this", "that", "it", "its", "with", "by", "as", "at",
+    "from", "me", "my", "i", "you", "can", "could", "do", "does", "did", "what",
+    "which", "how", "s", "paper", "authors", "please", "tell", "about", "there",
+    "they", "their", "some", "any"
+}
+
+# Canonical term -> words folded into it
+SYNONYMS = {
+    "novel": ["new", "novel", "novelty", "contribution", "contributions", "contribute",
+              "innovation", "innovations", "innovative", "original", "breakthrough"],
+    "main": ["main", "key", "primary", "central", "core", "principal", "major"],
+    "why": ["why", "motivation", "motivate", "motivated", "reason", "reasons", "purpose"],
+    "result": ["result", "results", "finding", "findings", "outcome", "outcomes",
+               "performance", "perform", "performs", "accuracy"],
+    "limitation": ["limitation", "limitations", "weakness", "weaknesses", "drawback",
+                   "drawbacks", "shortcoming", "shortcomings", "downside", "downsides"],
+    "compare": ["compare", "compared", "comparison", "versus", "vs", "differ",
+                "difference", "differences", "different", "better", "previous", "prior"],
+    "work": ["work", "works", "working", "function", "functions", "operate",
+             "operates", "mechanism", "happens"],
+    "train": ["train", "trained", "training", "optimize", "optimized", "optimization",
+              "fit", "learned", "learns"],
+    "architecture": ["architecture", "structure", "design", "components", "layout",
+                     "pipeline", "framework"],
+    "future": ["future", "next", "extension", "extensions", "followup", "open"],
+    "data": ["data", "dataset", "datasets", "benchmark", "benchmarks", "corpus"],
+    "summary": ["summary", "summarize", "summarise", "overview", "gist", "tldr", "explain",
+                "describe", "idea"],
+}
+
+_CANONICAL = {word: canonical for canonical, words in SYNONYMS.items() for word in words}
+
+STEM_CHARS = 5
+BIGRAM_WEIGHT = 0.5
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def extract_terms(text: str) -> Dict[str, float]:
+    """Weighted canonical terms of a question."""
+    tokens = [
+        _CANONICAL.get(token, token)
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+    terms = defaultdict(float)
+    for token in tokens:
+        terms[token] += 1.0
+        if len(token) > STEM_CHARS and token not in SYNONYMS:
+            terms[f"s:{token[:STEM_CHARS]}"] += 1.0
+    for first, second in zip(tokens, tokens[1:]):
+        terms[f"{first}_{second}"] += BIGRAM_WEIGHT
+    return terms
+
+
+def key_to_question(key: str) -> str:
+    """Recover question text from a cache key such as "chat_why_self_attention" (version ignored)."""
+    key = split_key(key)[0]
+    return key[len("chat_"):].replace("_", " ") if key.startswith("chat_") else key.replace("_", " ")
+
+
+class QuestionIndex:
+    """TF-IDF index over cached questions with NumPy posting arrays."""
+
+    def __init__(self, questions: Dict[str, str]):
+        """
+        Build the index.
+
+        Args:
+            questions: Cache key -> question text
+        """
+        import numpy as np
+
+        self._np = np
+        self.keys: List[str] = list(questions)
+        documents = [extract_terms(questions[key]) for key in self.keys]
+        count = len(documents)
+
+        document_frequency = Counter(term for terms in documents for term in terms)
+        self.idf = {
+            term: math.log((1 + count) / (1 + df)) + 1.0
+            for term, df in document_frequency.items()
+        }
+        # Terms never seen in a cached question still count against the query
+        self.unseen_idf = math.log(1 + count) + 1.0
+
+        postings = defaultdict(lambda: ([], []))
+        for doc_id, terms in enumerate(documents):
+            weights = {term: tf * self.idf[term] for term, tf in terms.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, weight in weights.items():
+                ids, values = postings[term]
+                ids.append(doc_id)
+                values.append(weight / norm)
+
+        self.postings = {
+            term: (np.array(ids, dtype=np.int32), np.array(values, dtype=np.float32))
+            for term, (ids, values) in postings.items()
+        }
+
+    @classmethod
+    def from_cache_keys(cls, keys: Iterable[str]) -> "QuestionIndex":
+        """Index the chat questions of one paper's cache (chat_general excluded)."""
+        return cls({
+            key: key_to_question(key)
+            for key in keys
+            if key.startswith("chat_") and split_key(key)[0] != "chat_general"
+        })
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def search(self, query: str, k: int = 1) -> List[Tuple[str, float]]:
+        """
+        Find the cached questions most similar to query.
+
+        Returns:
+            Up to k (key, cosine similarity) pairs, best first
+        """
+        np = self._np
+        terms = extract_terms(query)
+        if not terms or not self.keys:
+            return []
+
+        weights = {term: tf * self.idf.get(term, self.unseen_idf) for term, tf in terms.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+
+        scores = np.zeros(len(self.keys), dtype=np.float32)
+        for term, weight in weights.items():
+            posting = self.postings.get(term)
+            if posting is not None:
+                ids, values = posting
+                scores[ids] += values * (weight / norm)
+
+        if k == 1:
+            best = int(scores.argmax())
+            return [(self.keys[best], float(scores[best]))] if scores[best] > 0 else []
+
+        top = np.argsort(-scores)[:k]
+        return [(self.keys[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def best_match(self, query: str, threshold: float) -> Optional[str]:
+        """Key of the nearest cached question if its similarity reaches threshold."""
+        results = self.search(query, k=1)
+        if results and results[0][1] >= threshold:
+            return results[0][0]
+        return None
@@ -0,0 +1,127 @@
+"""
+Per-API-key request rate limiting and quota tracking.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINUTE = 60.0
+DAY = 24 * 3600.0
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class RateLimiter:
+    """Sliding-window limiter for requests per minute and per day."""
+
+    def __init__(self, rpm: int = 15, rpd: int = 1500):
+        """
+        Initialize rate limiter.
+
+        Args:
+            rpm: Requests allowed per rolling minute
+            rpd: Requests allowed per rolling day
+        """
+        self.rpm = rpm
+        self.rpd = rpd
+        self._minute = deque()
+        self._day = deque()
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def _prune(self, now: float):
+        while self._minute and now - self._minute[0] >= MINUTE:
+            self._minute.popleft()
+        while self._day and now - self._day[0] >= DAY:
+            self._day.popleft()
+
+    def _wait_time(self, now: float) -> float:
+        """Seconds until a request may be sent (0 if allowed now)."""
+        waits = [self._cooldown_until - now]
+        if len(self._minute) >= self.rpm:
+            waits.append(self._minute[0] + MINUTE - now)
+        if len(self._day) >= self.rpd:
+            waits.append(self._day[0] + DAY - now)
+        return max(0.0, *waits)
+
+    def try_acquire(self) -> bool:
+        """Take a request slot if one is free right now."""
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            if self._wait_time(now) > 0:
+                return False
+            self._minute.append(now)
+            self._day.append(now)
+            return True
+
+    def acquire(self, timeout: Optional[float] = None, cancel_token=None) -> bool:
+        """
+        Block until a request slot is free and take it.
+
+        Args:
+            timeout: Maximum seconds to wait (None = wait as long as needed)
+            cancel_token: Optional CancellationToken; the wait is abandoned
+                (its raise_if_cancelled raises) once it is cancelled
+
+        Returns:
+            True if a slot was taken, False if timeout expired first
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        waited = False
+        while True:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            with self._lock:
+                now = time.time()
+                self._prune(now)
+                wait_for = self._wait_time(now)
+                if wait_for <= 0:
+                    self._minute.append(now)
+                    self._day.append(now)
+                    return True
+
+            if deadline is not None:
+                if now >= deadline:
+                    return False
+                wait_for = min(wait_for, deadline - now)
+
+            if not waited:
+                self.throttled += 1
+                waited = True
+                logger.info(f"Rate limit reached, waiting {wait_for:.1f}s")
+            if cancel_token is not None:
+                # Wake up regularly to notice cancellation
+                wait_for = min(wait_for, CANCEL_POLL_INTERVAL)
+            time.sleep(wait_for)
+
+    def penalize(self, seconds: float = MINUTE):
+        """Stop issuing requests for a while (e.g. after a 429 from the API)."""
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.time() + seconds)
+        logger.warning(f"Quota exhausted, cooling down for {seconds:.0f}s")
+
+    def remaining(self) -> Dict:
+        """Get remaining quota in the current windows."""
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            cooling = self._cooldown_until > now
+            return {
+                "minute": 0 if cooling else self.rpm - len(self._minute),
+                "day": self.rpd - len(self._day),
+                "cooldown": max(0.0, self._cooldown_until - now),
+            }
+
+    def score(self) -> float:
+        """Scheduling score: higher means more headroom for the next request."""
+        remaining = self.remaining()
+        if remaining["cooldown"] > 0 or remaining["day"] <= 0:
+            return -remaining["cooldown"]
+        return remaining["minute"] / self.rpm + remaining["day"] / self.rpd
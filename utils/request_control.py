@@ -0,0 +1,182 @@
+"""
+Deadlines, cooperative cancellation and hedged requests for API calls.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How often a waiting caller re-checks its cancellation token (seconds)
+POLL_INTERVAL = 0.1
+
+# Shared pool for calls that run under a deadline. Abandoned calls keep a
+# worker busy until the SDK-level timeout ends them.
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="gemini-call")
+
+# Individual upstream attempts started by hedged(); kept apart from the pool
+# above because the hedging wrapper itself runs there and waits on them
+_attempt_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="gemini-attempt")
+
+
+class RequestCancelled(Exception):
+    """The caller cancelled the request before it completed."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request did not complete within its deadline."""
+
+
+class CancellationToken:
+    """Cooperative cancellation flag shared between a caller and its requests."""
+
+    def __init__(self, parent: Optional["CancellationToken"] = None):
+        """
+        Args:
+            parent: Token whose cancellation also cancels this one, so work
+                can be abandoned on its own or together with its caller
+        """
+        self._event = threading.Event()
+        self.parent = parent
+
+    def cancel(self):
+        """Request cancellation. Waiting calls raise RequestCancelled."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise RequestCancelled("Request was cancelled")
+
+
+_current_token: contextvars.ContextVar = contextvars.ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken):
+    """
+    Make every API call inside the block cancellable through token.
+
+    Example:
+        token = CancellationToken()
+        with cancellation_scope(token):
+            manager.process_query(...)   # token.cancel() from another thread aborts
+    """
+    previous = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(previous)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Get the cancellation token active in the current context."""
+    return _current_token.get()
+
+
+def submit(fn: Callable[[], Any], executor: Optional[ThreadPoolExecutor] = None):
+    """
+    Run fn on a thread pool, carrying over context (usage tags, cancellation).
+
+    Args:
+        fn: Zero-argument callable
+        executor: Pool to use (defaults to the shared API-call pool). Work
+            that itself makes API calls must use a separate pool so it
+            cannot starve the calls it waits on.
+    """
+    ctx = contextvars.copy_context()
+    return (executor or _executor).submit(ctx.run, fn)
+
+
+def run_with_deadline(
+    fn: Callable[[], Any],
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> Any:
+    """
+    Run fn in a worker thread and wait for it with a deadline.
+
+    Args:
+        fn: Zero-argument callable doing the actual work
+        timeout: Seconds to wait before raising DeadlineExceeded (None = no limit)
+        cancel_token: Token that aborts the wait with RequestCancelled
+
+    fn runs under a child token of cancel_token (see current_token) that is
+    also cancelled when the deadline passes, so the worker can stop before
+    waiting for a rate-limit slot or sending a request nobody will read.
+
+    Returns:
+        Result of fn
+    """
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+    worker_token = CancellationToken(parent=cancel_token)
+
+    def scoped():
+        with cancellation_scope(worker_token):
+            return fn()
+
+    deadline = time.monotonic() + timeout if timeout else None
+    future = submit(scoped)
+
+    while True:
+        wait_for = POLL_INTERVAL
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                worker_token.cancel()
+                future.cancel()
+                logger.warning(f"Request exceeded deadline of {timeout:.1f}s")
+                raise DeadlineExceeded(f"Request did not complete within {timeout:.1f}s")
+            wait_for = min(wait_for, remaining)
+
+        done, _ = wait([future], timeout=wait_for)
+        if done:
+            return future.result()
+
+        if cancel_token is not None and cancel_token.cancelled:
+            worker_token.cancel()
+            future.cancel()
+            logger.info("Request cancelled by caller")
+            raise RequestCancelled("Request was cancelled")
+
+
+def hedged(fn: Callable[[], Any], delay: float) -> Callable[[], Any]:
+    """
+    Wrap fn so a duplicate attempt starts if the first runs longer than delay.
+
+    Whichever attempt finishes first wins; if it failed, the other attempt's
+    outcome is used instead.
+
+    Args:
+        fn: Zero-argument callable making one upstream request
+        delay: Seconds to wait before issuing the hedge request
+
+    Returns:
+        Zero-argument callable returning the first successful result
+    """
+    def run():
+        primary = submit(fn, _attempt_executor)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        logger.info(f"Hedging request after {delay:.2f}s")
+        attempts = [primary, submit(fn, _attempt_executor)]
+        done, pending = wait(attempts, return_when=FIRST_COMPLETED)
+        first = next(iter(done))
+        if first.exception() is None or not pending:
+            return first.result()
+        return next(iter(pending)).result()
+
+    return run
@@ -1,38 +1,151 @@
 """
 Response cache for demo mode - pre-computed answers for sample papers.
+
+Three storage backends share the get_response / save_cache API and lookup
+logic of BaseResponseCache:
+
+- ResponseCache: one JSON file per paper, loaded on first access into a
+  memory-bounded LRU, with an index file listing the cached papers. Files
+  are replaced atomically under an advisory lock; single new entries are
+  appended to a per-paper JSONL journal that is folded back periodically.
+  With response_cache.format "compressed", papers are stored as .rpc files
+  (see utils.cache_codec) and entries are decompressed only when read.
+- SQLiteResponseCache: one row per (paper_id, key) in a WAL-mode SQLite
+  database; lookups read single rows and nothing is held in memory.
+- SharedResponseCache: entries in the shared cache backend (memory,
+  SQLite or Redis, see utils.cache_backend) so app replicas share them.
+
+Generated entries are stored under versioned keys (utils.cache_versions);
+once set_key_versions is called, only current versions are served.
 """
 
 import json
 import os
-from typing import Dict, Optional
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+from utils.config import get_config
+from utils.cache_backend import CacheBackend, get_backend
+from utils.cache_codec import PACKED_SUFFIX, DictionaryStore, PackedEntries, default_codec, write_packed
+from utils.cache_metrics import FALLBACK, HIT, MISS, chat_miss_key, get_cache_metrics
+from utils.cache_versions import split_key, versioned_key
+from utils.question_index import QuestionIndex
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    import fcntl
+except ImportError:  # Windows - writers are only serialized within the process
+    fcntl = None
 
-class ResponseCache:
-    """Manage cached responses for sample papers."""
-    
-    def __init__(self, cache_dir: str = "data/cached_responses"):
-        self.cache_dir = cache_dir
-        os.makedirs(cache_dir, exist_ok=True)
-        self.caches = {}
-        self._load_caches()
-    
-    def _load_caches(self):
-        """Load all cache files."""
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith('.json'):
-                paper_id = filename.replace('.json', '')
-                cache_path = os.path.join(self.cache_dir, filename)
+INDEX_FILENAME = "index.json"
+LOCK_FILENAME = ".lock"
+JOURNAL_SUFFIX = ".jsonl"
+
+# Journals are folded into the paper file once they grow past this or the
+# paper file itself, whichever is larger
+MIN_COMPACT_BYTES = 64 * 1024
+
+# A loaded paper's files are checked for writes by other processes at most
+# this often (seconds), keeping stat calls off most lookups
+STALE_CHECK_SECONDS = 1.0
+
+
+def atomic_write_json(path: str, data, indent: Optional[int] = 2):
+    """
+    Write JSON so readers see either the old or the new file, never a partial one.
+
+    Writes to a temporary file in the same directory, fsyncs it and renames
+    it over path.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_journal(path: str) -> Dict[str, str]:
+    """
+    Replay a JSONL journal of {"key", "response"} records (later records win).
+
+    A torn last line from a crash mid-append is ignored.
+    """
+    entries = {}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
                 try:
-                    with open(cache_path, 'r') as f:
-                        self.caches[paper_id] = json.load(f)
-                    logger.info(f"Loaded cache for {paper_id}")
-                except Exception as e:
-                    logger.error(f"Error loading cache {filename}: {e}")
-    
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping incomplete journal record in {path}")
+                    continue
+                entries[record["key"]] = record["response"]
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+class BaseResponseCache(ABC):
+    """
+    Lookup logic shared by every response cache backend.
+
+    Subclasses store the entries (see _get_paper and the abstract write
+    methods); key resolution, versions and chat matching live here.
+    """
+
+    def __init__(self):
+        settings = get_config().get("response_cache", {})
+        self._lock = threading.RLock()
+
+        # paper_id -> (paper stamp, QuestionIndex over its cached chat questions)
+        self._question_indexes: Dict[str, tuple] = {}
+        self.chat_match_threshold = settings.get("chat_match_threshold", 0.3)
+
+        # Current version per cache key (see set_key_versions)
+        self.key_version: Optional[Callable[[str], Optional[str]]] = None
+        self.accept_unversioned = settings.get("accept_unversioned", True)
+
+    @abstractmethod
+    def _get_paper(self, paper_id: str) -> Optional[Mapping]:
+        """A paper's entries (None if the paper is not cached)."""
+
+    @abstractmethod
+    def read_paper(self, paper_id: str) -> Optional[Dict]:
+        """Read all of a paper's entries from storage (None if it has none)."""
+
+    @abstractmethod
+    def save_cache(self, paper_id: str, cache_data: Dict):
+        """Replace all entries of a paper."""
+
+    @abstractmethod
+    def set_entry(self, paper_id: str, key: str, response: str):
+        """Add or replace one entry of a paper's cache."""
+
+    @abstractmethod
+    def list_cached_papers(self) -> list:
+        """Get list of papers with caches."""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Backend name and size counters."""
+
     def get_response(
         self,
         paper_id: str,
@@ -42,77 +155,756 @@ class ResponseCache:
     ) -> Optional[str]:
         """
         Get cached response.
-        
+
         Args:
             paper_id: ID of the paper (e.g., "attention")
             query_type: Type of query ("explain", "quiz", "chat", etc.)
             section: Paper section if applicable
             query: Specific query if applicable
-            
+
         Returns:
             Cached response or None
         """
-        if paper_id not in self.caches:
+        start = time.perf_counter()
+        cache = self._get_paper(paper_id)
+        if cache is None:
+            self._record_lookup(paper_id, query_type, query_type, MISS, start, query)
             return None
-        
-        cache = self.caches[paper_id]
-        
+
         # Build cache key
+        wanted = None
         if section and query_type in ["math", "code", "concept"]:
             # Try specific agent type first
             key = f"explain_{section}_{query_type}"
-            if key not in cache:
+            stored = self._resolve(cache, key)
+            if stored is None:
                 # Fallback to generic explain
+                wanted = key
                 key = f"explain_{section}"
+                stored = self._resolve(cache, key)
         elif query_type == "quiz":
             key = f"quiz_{section}" if section else "quiz_general"
+            stored = self._resolve(cache, key)
         elif query_type == "chat" and query:
-            # Simple matching for common questions
-            key = self._match_chat_query(cache, query)
+            # Nearest cached question (paraphrases included)
+            stored = self._match_chat_query(paper_id, cache, query)
+            if stored is None:
+                # Return default if no match
+                wanted = chat_miss_key(query)
+                stored = self._resolve(cache, "chat_general")
+            key = split_key(stored)[0] if stored else "chat_general"
         else:
             key = query_type
-        
-        response = cache.get(key)
+            stored = self._resolve(cache, key)
+
+        response = cache.get(stored) if stored else None
         if response:
-            logger.info(f"Cache hit: {paper_id}/{key}")
+            logger.info(f"Cache hit: {paper_id}/{stored}")
+            outcome = FALLBACK if wanted else HIT
         else:
             logger.info(f"Cache miss: {paper_id}/{key}")
-        
+            outcome = MISS
+        self._record_lookup(paper_id, query_type, wanted or key, outcome, start, query)
+
         return response
-    
-    def _match_chat_query(self, cache: Dict, query: str) -> str:
-        """Match a chat query to cached responses."""
-        query_lower = query.lower()
-        
-        # Check for exact matches first
-        for key in cache.keys():
+
+    def _record_lookup(self, paper_id, query_type, key, outcome, start, query):
+        latency_ms = (time.perf_counter() - start) * 1000
+        get_cache_metrics().record(paper_id, query_type, key, outcome, latency_ms, query)
+
+    def _match_chat_query(self, paper_id: str, cache: Mapping, query: str) -> Optional[str]:
+        """Stored key of the most similar cached question (None if nothing is similar enough)."""
+        # Lazy views carry the paper's last write time, so an index built
+        # before another process wrote to the paper is rebuilt
+        stamp = getattr(cache, "updated_at", None)
+        with self._lock:
+            built = self._question_indexes.get(paper_id)
+            if built is not None and built[0] == stamp:
+                index = built[1]
+            else:
+                index = QuestionIndex.from_cache_keys(
+                    stored for stored in cache.keys() if self._servable(stored)
+                )
+                self._question_indexes[paper_id] = (stamp, index)
+
+        return index.best_match(query, self.chat_match_threshold)
+
+    # ----- Versions -----
+
+    def set_key_versions(self, key_version: Callable[[str], Optional[str]]):
+        """
+        Make lookups version-aware.
+
+        Args:
+            key_version: Current version of a cache key, or None for keys
+                that are not versioned (see backend.cache_tasks.key_version).
+                Entries stored under any other version are no longer served.
+        """
+        with self._lock:
+            if key_version is not self.key_version:
+                self.key_version = key_version
+                self._question_indexes.clear()
+
+    def _current_version(self, key: str) -> Optional[str]:
+        return self.key_version(key) if self.key_version else None
+
+    def _servable(self, stored_key: str) -> bool:
+        """Whether a stored entry may be served under the current versions."""
+        key, version = split_key(stored_key)
+        current = self._current_version(key)
+        if version is None:
+            return current is None or self.accept_unversioned
+        return version == current
+
+    def _resolve(self, cache: Mapping, key: str) -> Optional[str]:
+        """Stored key to serve for key: its current version, else an accepted unversioned entry."""
+        current = self._current_version(key)
+        if current is not None:
+            stored = versioned_key(key, current)
+            if stored in cache:
+                return stored
+            if not self.accept_unversioned:
+                return None
+        return key if key in cache else None
+
+    def get_entry(self, paper_id: str, key: str) -> Optional[str]:
+        """Get one entry by its exact key (None if missing)."""
+        cache = self._get_paper(paper_id)
+        return cache.get(key) if cache is not None else None
+
+    def update_paper(self, paper_id: str, update: Callable[[Optional[Dict]], Dict]):
+        """
+        Read-modify-write a paper's entries without losing concurrent writes.
+
+        Args:
+            paper_id: Paper to update
+            update: Called with the paper's current entries (None if it has
+                none) while writers are locked out; returns the entries to save
+
+        Backends without a cross-process lock (the shared store) only lock
+        out writers in this process and read right before saving.
+        """
+        with self._lock:
+            self.save_cache(paper_id, update(self.read_paper(paper_id)))
+
+
+class ResponseCache(BaseResponseCache):
+    """Manage cached responses for sample papers."""
+
+    def __init__(
+        self,
+        cache_dir: str = "data/cached_responses",
+        max_memory_mb: Optional[float] = None,
+        format: Optional[str] = None,
+        read_only: bool = False
+    ):
+        """
+        Initialize response cache.
+
+        Args:
+            cache_dir: Directory with one <paper_id>.json file per paper
+            max_memory_mb: Approximate cap on loaded caches (by file size);
+                least recently used papers are evicted beyond it.
+                Defaults to response_cache.max_memory_mb in config.yaml.
+            format: Format written by save_cache, "json" or "compressed"
+                (defaults to response_cache.format). Both are always readable.
+            read_only: Never write to cache_dir (e.g. a migration source):
+                the index is rebuilt in memory only and writes raise
+        """
+        super().__init__()
+        settings = get_config().get("response_cache", {})
+        if max_memory_mb is None:
+            max_memory_mb = settings.get("max_memory_mb", 64)
+
+        self.format = format or settings.get("format", "json")
+        self.codec_name = settings.get("codec", "auto")
+        self.cache_dir = cache_dir
+        self.read_only = read_only
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        if not read_only:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        # paper_id -> cache dict, least recently used first
+        self.caches: "OrderedDict[str, Dict]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._states: Dict[str, tuple] = {}  # paper_id -> _disk_state when loaded
+        self._checked_at: Dict[str, float] = {}  # paper_id -> last state check (monotonic)
+        self.memory_bytes = 0
+        self.loads = 0
+        self.evictions = 0
+        self._lock_depth = 0  # _write_lock nesting in the thread holding _lock
+
+        self.dictionaries = DictionaryStore(cache_dir)
+        self.index = self._load_index()
+
+    # ----- Index -----
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILENAME)
+
+    def _load_index(self) -> Dict[str, Dict]:
+        """
+        Read the index, rebuilding it if cache files were added or removed
+        since it was written.
+        """
+        index_path = self._index_path()
+        try:
+            # Adding or removing a file updates the directory mtime
+            if os.stat(index_path).st_mtime_ns >= os.stat(self.cache_dir).st_mtime_ns:
+                with open(index_path, 'r') as f:
+                    return json.load(f)["papers"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return self.rebuild_index()
+
+    def rebuild_index(self) -> Dict[str, Dict]:
+        """Rebuild the index from the directory listing (cache files are not opened)."""
+        papers = {}
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or entry.name == INDEX_FILENAME:
+                    continue
+                for suffix in ('.json', PACKED_SUFFIX, JOURNAL_SUFFIX):
+                    if entry.name.endswith(suffix):
+                        paper = papers.setdefault(entry.name[:-len(suffix)], {"size": 0})
+                        paper["size"] += entry.stat().st_size
+        self.index = papers
+        self._write_index()
+        logger.info(f"Indexed {len(papers)} cached papers")
+        return papers
+
+    def _write_index(self):
+        if self.read_only:
+            return
+        try:
+            # Rewritten in place so the directory mtime only tracks cache files
+            with open(self._index_path(), 'w') as f:
+                json.dump({"papers": self.index}, f)
+        except OSError as e:
+            logger.warning(f"Could not write cache index: {e}")
+
+    # ----- Files and locking -----
+
+    def _paper_path(self, paper_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{paper_id}.json")
+
+    def _packed_path(self, paper_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{paper_id}{PACKED_SUFFIX}")
+
+    def _base_path(self, paper_id: str) -> Optional[str]:
+        """The paper's packed or JSON file, whichever exists."""
+        for path in (self._packed_path(paper_id), self._paper_path(paper_id)):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _journal_path(self, paper_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{paper_id}{JOURNAL_SUFFIX}")
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers across threads and (via flock) across processes. Reentrant."""
+        if self.read_only:
+            raise RuntimeError(f"Response cache in {self.cache_dir} is read-only")
+        with self._lock:
+            if fcntl is None or self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with open(os.path.join(self.cache_dir, LOCK_FILENAME), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open_paper(self, paper_id: str) -> Optional[MutableMapping]:
+        """
+        Open a paper's file plus its journal (None if neither exists).
+
+        Packed files stay compressed in memory and decode entries on access.
+        """
+        base_path = self._base_path(paper_id)
+        journal_path = self._journal_path(paper_id)
+        if base_path is None and not os.path.exists(journal_path):
+            return None
+
+        cache = {}
+        if base_path is not None and base_path.endswith(PACKED_SUFFIX):
+            cache = PackedEntries(base_path, self.dictionaries)
+        elif base_path is not None:
+            with open(base_path, 'r') as f:
+                cache = json.load(f)
+        cache.update(read_journal(journal_path))
+        return cache
+
+    def read_paper(self, paper_id: str) -> Optional[Dict]:
+        """Read all of a paper's entries from disk, bypassing the LRU (None if it has none)."""
+        cache = self._open_paper(paper_id)
+        return dict(cache) if cache is not None else None
+
+    def _disk_state(self, paper_id: str) -> tuple:
+        """(inode, mtime, size) of a paper's files; changes whenever any process writes them."""
+        state = []
+        for path in (self._packed_path(paper_id), self._paper_path(paper_id), self._journal_path(paper_id)):
+            try:
+                st = os.stat(path)
+                state.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                state.append(None)
+        return tuple(state)
+
+    @staticmethod
+    def _state_size(state: tuple) -> int:
+        return sum(file_state[2] for file_state in state if file_state)
+
+    # ----- Loading and eviction -----
+
+    def _get_paper(self, paper_id: str) -> Optional[Dict]:
+        """
+        Get a paper's cache, loading it on first access.
+
+        A loaded paper is reloaded once its files changed (another process
+        wrote to it), checked at most every STALE_CHECK_SECONDS.
+        """
+        with self._lock:
+            cache = self.caches.get(paper_id)
+            now = time.monotonic()
+            if cache is not None and now - self._checked_at.get(paper_id, 0.0) < STALE_CHECK_SECONDS:
+                self.caches.move_to_end(paper_id)
+                return cache
+
+            state = self._disk_state(paper_id)
+            if cache is not None:
+                if self._states.get(paper_id) == state:
+                    self._checked_at[paper_id] = now
+                    self.caches.move_to_end(paper_id)
+                    return cache
+                # Replaced or appended to since it was loaded
+                self._forget(paper_id)
+                self._question_indexes.pop(paper_id, None)
+
+            try:
+                # State taken before reading, so a write during the read forces another reload
+                cache = self._open_paper(paper_id)
+                size = self._state_size(state)
+            except Exception as e:
+                logger.error(f"Error loading cache {paper_id}: {e}")
+                return None
+            if cache is None:
+                return None
+
+            if paper_id not in self.index:
+                self.index[paper_id] = {"size": size}
+            self._remember(paper_id, cache, size, state)
+            self.loads += 1
+            logger.info(f"Loaded cache for {paper_id}")
+            return cache
+
+    def _forget(self, paper_id: str):
+        """Drop a paper from the LRU."""
+        if self.caches.pop(paper_id, None) is not None:
+            self.memory_bytes -= self._sizes.pop(paper_id)
+            self._states.pop(paper_id, None)
+            self._checked_at.pop(paper_id, None)
+
+    def _remember(self, paper_id: str, cache: Dict, size: int, state: tuple):
+        """
+        Add a loaded cache to the LRU and evict down to the memory cap.
+
+        state is the _disk_state the cache reflects; it is reloaded once the
+        files no longer match.
+        """
+        if paper_id in self.caches:
+            self.memory_bytes -= self._sizes[paper_id]
+        self.caches[paper_id] = cache
+        self.caches.move_to_end(paper_id)
+        self._sizes[paper_id] = size
+        self._states[paper_id] = state
+        self._checked_at[paper_id] = time.monotonic()
+        self.memory_bytes += size
+
+        # Never evict the paper that was just requested
+        while self.memory_bytes > self.max_memory_bytes and len(self.caches) > 1:
+            evicted, _ = self.caches.popitem(last=False)
+            self.memory_bytes -= self._sizes.pop(evicted)
+            self._states.pop(evicted, None)
+            self._checked_at.pop(evicted, None)
+            self._question_indexes.pop(evicted, None)
+            self.evictions += 1
+
+    def set_entry(self, paper_id: str, key: str, response: str):
+        """
+        Add or replace one entry of a paper's cache.
+
+        The entry is appended to the paper's journal instead of rewriting
+        the whole file; the journal is folded in once it grows large.
+        """
+        record = json.dumps({"key": key, "response": response}, ensure_ascii=False) + "\n"
+        journal_path = self._journal_path(paper_id)
+
+        with self._write_lock():
+            created = not os.path.exists(journal_path)
+            # Whether the loaded copy already holds every write made so far
+            current = paper_id in self.caches and self._states.get(paper_id) == self._disk_state(paper_id)
+            with open(journal_path, 'ab+') as f:
+                # Start a fresh line after a record torn by an earlier crash
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        record = "\n" + record
+                f.write(record.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+            if current:
+                cache = self.caches[paper_id]
+                cache[key] = response
+                self._remember(paper_id, cache, self._sizes[paper_id] + len(record), self._disk_state(paper_id))
+            else:
+                # Reloaded on next access, with other processes' writes
+                self._forget(paper_id)
             if key.startswith("chat_"):
-                cached_q = key.replace("chat_", "").replace("_", " ")
-                if cached_q in query_lower or query_lower in cached_q:
-                    return key
-        
-        # Return default if no match
-        return "chat_general"
-    
+                self._question_indexes.pop(paper_id, None)
+
+            journal_bytes = os.path.getsize(journal_path)
+            base_path = self._base_path(paper_id)
+            base_bytes = os.path.getsize(base_path) if base_path else 0
+            if journal_bytes > max(base_bytes, MIN_COMPACT_BYTES):
+                self.compact(paper_id)
+            elif created or paper_id not in self.index:
+                self.index[paper_id] = {"size": base_bytes + journal_bytes}
+                self._write_index()
+
+    def compact(self, paper_id: str):
+        """Fold a paper's journal into its paper file."""
+        with self._write_lock():
+            # Re-read from disk to include entries appended by other processes
+            cache = self.read_paper(paper_id)
+            if cache is not None:
+                self.save_cache(paper_id, cache)
+                logger.info(f"Compacted journal for {paper_id}")
+
+    def _write_codec(self):
+        """Codec for new packed files: configured codec with the newest shared dictionary."""
+        codec = default_codec() if self.codec_name == "auto" else self.codec_name
+        return self.dictionaries.codec(codec, self.dictionaries.latest())
+
     def save_cache(self, paper_id: str, cache_data: Dict):
-        """Save cache for a paper."""
-        cache_path = os.path.join(self.cache_dir, f"{paper_id}.json")
-        with open(cache_path, 'w') as f:
-            json.dump(cache_data, f, indent=2)
-        self.caches[paper_id] = cache_data
+        """Save cache for a paper (atomically replacing its file and journal)."""
+        if self.format == "compressed":
+            cache_path, stale_path = self._packed_path(paper_id), self._paper_path(paper_id)
+        else:
+            cache_path, stale_path = self._paper_path(paper_id), self._packed_path(paper_id)
+
+        with self._write_lock():
+            if self.format == "compressed":
+                write_packed(cache_path, cache_data, self._write_codec())
+            else:
+                atomic_write_json(cache_path, cache_data)
+            # The file now holds every journalled entry
+            for path in (stale_path, self._journal_path(paper_id)):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            size = os.path.getsize(cache_path)
+
+            self._question_indexes.pop(paper_id, None)
+            if self.format == "compressed":
+                # Reopened compressed on next access
+                self._forget(paper_id)
+            else:
+                self._remember(paper_id, cache_data, size, self._disk_state(paper_id))
+            self.index[paper_id] = {"size": size}
+            self._write_index()
         logger.info(f"Saved cache for {paper_id}")
-    
+
+    def update_paper(self, paper_id: str, update: Callable[[Optional[Dict]], Dict]):
+        """Read-modify-write a paper's entries with writers in every process locked out."""
+        with self._write_lock():
+            self.save_cache(paper_id, update(self.read_paper(paper_id)))
+
     def list_cached_papers(self) -> list:
         """Get list of papers with caches."""
-        return list(self.caches.keys())
+        return list(self.index.keys())
+
+    def stats(self) -> Dict:
+        """Loaded papers, approximate memory use, loads and evictions."""
+        with self._lock:
+            return {
+                "backend": "json",
+                "indexed": len(self.index),
+                "loaded": len(self.caches),
+                "memory_bytes": self.memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
+
+
+class _PaperEntries(Mapping):
+    """Read-only view of one paper's rows; keys and values are fetched on demand."""
+
+    def __init__(self, store: "SQLiteResponseCache", paper_id: str, updated_at: float):
+        self._store = store
+        self._paper_id = paper_id
+        self.updated_at = updated_at
+
+    def __getitem__(self, key: str) -> str:
+        with self._store._lock:
+            row = self._store._conn.execute(
+                "SELECT response FROM entries WHERE paper_id = ? AND key = ?",
+                (self._paper_id, key)
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._store._lock:
+            rows = self._store._conn.execute(
+                "SELECT key FROM entries WHERE paper_id = ?", (self._paper_id,)
+            ).fetchall()
+        return iter(row[0] for row in rows)
+
+    def __len__(self) -> int:
+        with self._store._lock:
+            return self._store._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE paper_id = ?", (self._paper_id,)
+            ).fetchone()[0]
+
+
+class SQLiteResponseCache(BaseResponseCache):
+    """Response cache stored in SQLite, one row per (paper_id, key)."""
+
+    def __init__(self, db_path: str = "data/cached_responses.sqlite3"):
+        """
+        Initialize SQLite response cache.
+
+        Args:
+            db_path: SQLite database file (":memory:" for a throwaway cache).
+                Use migrate_response_cache.py to import existing JSON caches.
+        """
+        super().__init__()
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        # WAL lets readers in other Streamlit processes run alongside a writer
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                paper_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                response TEXT NOT NULL,
+                PRIMARY KEY (paper_id, key)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS papers (
+                paper_id TEXT PRIMARY KEY,
+                entries INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def _get_paper(self, paper_id: str) -> Optional[Mapping]:
+        """Get a lazy view of a paper's entries (None if the paper has none)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at FROM papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        return _PaperEntries(self, paper_id, row[0]) if row else None
+
+    def read_paper(self, paper_id: str) -> Optional[Dict]:
+        """Read all of a paper's entries (None if it has none)."""
+        entries = self._get_paper(paper_id)
+        return dict(entries) if entries is not None else None
+
+    def save_cache(self, paper_id: str, cache_data: Dict):
+        """Replace all entries of a paper in one transaction."""
+        with self._lock:
+            self._question_indexes.pop(paper_id, None)
+            with self._conn:
+                self._conn.execute("DELETE FROM entries WHERE paper_id = ?", (paper_id,))
+                self._conn.executemany(
+                    "INSERT INTO entries (paper_id, key, response) VALUES (?, ?, ?)",
+                    ((paper_id, key, response) for key, response in cache_data.items())
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO papers (paper_id, entries, updated_at) VALUES (?, ?, ?)",
+                    (paper_id, len(cache_data), time.time())
+                )
+        logger.info(f"Saved cache for {paper_id}")
+
+    def set_entry(self, paper_id: str, key: str, response: str):
+        """Add or replace one row."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (paper_id, key, response) VALUES (?, ?, ?)",
+                    (paper_id, key, response)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO papers (paper_id, entries, updated_at) VALUES "
+                    "(?, (SELECT COUNT(*) FROM entries WHERE paper_id = ?), ?)",
+                    (paper_id, paper_id, time.time())
+                )
+            if key.startswith("chat_"):
+                self._question_indexes.pop(paper_id, None)
+
+    def update_paper(self, paper_id: str, update: Callable[[Optional[Dict]], Dict]):
+        """Read-modify-write a paper's entries in one write transaction (see BaseResponseCache.update_paper)."""
+        with self._lock:
+            # Take the database write lock before reading, so writers in other processes wait
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cache_data = update(self.read_paper(paper_id))
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self.save_cache(paper_id, cache_data)
+
+    def list_cached_papers(self) -> list:
+        """Get list of papers with caches."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT paper_id FROM papers")]
+
+    def stats(self) -> Dict:
+        """Paper and entry counts."""
+        with self._lock:
+            papers, entries = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(entries), 0) FROM papers"
+            ).fetchone()
+        return {"backend": "sqlite", "indexed": papers, "entries": entries}
+
+
+class _BackendEntries(Mapping):
+    """Read-only view of one paper's entries in a shared backend, fetched on demand."""
+
+    def __init__(self, store: "SharedResponseCache", paper_id: str, updated_at: Optional[float]):
+        self._store = store
+        self._backend = store.backend
+        self._paper_id = paper_id
+        self.updated_at = updated_at
+        self._namespace = store._namespace(paper_id)
+
+    def __getitem__(self, key: str) -> str:
+        value = self._backend.get(self._namespace, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._backend.keys(self._namespace))
+
+    def __len__(self) -> int:
+        return self._store.entry_count(self._paper_id)
+
+
+class SharedResponseCache(BaseResponseCache):
+    """Response cache kept in a shared backend (utils.cache_backend) used by every replica."""
+
+    PAPERS_NAMESPACE = "responses"
+    # Entry count per paper, kept with atomic increments so writes never scan
+    COUNTS_NAMESPACE = "responses_counts"
+
+    def __init__(self, backend: CacheBackend):
+        """
+        Initialize shared response cache.
+
+        Args:
+            backend: Shared backend (e.g. get_backend() for shared_cache in config.yaml)
+        """
+        super().__init__()
+        self.backend = backend
+
+    def _namespace(self, paper_id: str) -> str:
+        return f"{self.PAPERS_NAMESPACE}/{paper_id}"
+
+    def _touch(self, paper_id: str):
+        self.backend.set(self.PAPERS_NAMESPACE, paper_id, json.dumps({"updated_at": time.time()}))
+
+    def entry_count(self, paper_id: str) -> int:
+        """Number of entries of a paper (scanned once if no count was recorded)."""
+        count = self.backend.get(self.COUNTS_NAMESPACE, paper_id)
+        if count is not None:
+            return int(count)
+        count = len(self.backend.keys(self._namespace(paper_id)))
+        self.backend.set(self.COUNTS_NAMESPACE, paper_id, str(count))
+        return count
+
+    def _get_paper(self, paper_id: str) -> Optional[Mapping]:
+        """Get a lazy view of a paper's entries (None if the paper is not cached)."""
+        meta = self.backend.get(self.PAPERS_NAMESPACE, paper_id)
+        if meta is None:
+            return None
+        return _BackendEntries(self, paper_id, json.loads(meta).get("updated_at"))
+
+    def read_paper(self, paper_id: str) -> Optional[Dict]:
+        """Read all of a paper's entries (None if it has none)."""
+        if self.backend.get(self.PAPERS_NAMESPACE, paper_id) is None:
+            return None
+        return self.backend.get_all(self._namespace(paper_id))
+
+    def save_cache(self, paper_id: str, cache_data: Dict):
+        """Replace all entries of a paper."""
+        with self._lock:
+            self._question_indexes.pop(paper_id, None)
+            namespace = self._namespace(paper_id)
+            self.backend.clear(namespace)
+            self.backend.set_many(namespace, cache_data)
+            self.backend.set(self.COUNTS_NAMESPACE, paper_id, str(len(cache_data)))
+            self._touch(paper_id)
+        logger.info(f"Saved cache for {paper_id}")
+
+    def set_entry(self, paper_id: str, key: str, response: str):
+        """Add or replace one entry (O(1): the entry count is incremented, not rescanned)."""
+        with self._lock:
+            if self.backend.upsert(self._namespace(paper_id), key, response):
+                if (self.backend.get(self.COUNTS_NAMESPACE, paper_id) is None
+                        and self.backend.get(self.PAPERS_NAMESPACE, paper_id) is not None):
+                    # Cache written before counts were kept: one scan, new entry included
+                    self.entry_count(paper_id)
+                else:
+                    self.backend.incr(self.COUNTS_NAMESPACE, paper_id)
+            self._touch(paper_id)
+            if key.startswith("chat_"):
+                self._question_indexes.pop(paper_id, None)
+
+    def list_cached_papers(self) -> list:
+        """Get list of papers with caches."""
+        return self.backend.keys(self.PAPERS_NAMESPACE)
+
+    def stats(self) -> Dict:
+        """Paper and entry counts."""
+        papers = self.backend.get_all(self.PAPERS_NAMESPACE)
+        entries = sum(self.entry_count(paper_id) for paper_id in papers)
+        return {"backend": f"shared ({self.backend.name})", "indexed": len(papers), "entries": entries}
 
 
 # Global cache instance
 _cache = None
 
-def get_cache() -> ResponseCache:
-    """Get or create global cache instance."""
+def get_cache() -> BaseResponseCache:
+    """Get or create global cache instance (backend from response_cache.backend)."""
     global _cache
     if _cache is None:
-        _cache = ResponseCache()
-    return _cache
\ No newline at end of file
+        settings = get_config().get("response_cache", {})
+        backend = settings.get("backend", "json")
+        if backend == "sqlite":
+            _cache = SQLiteResponseCache(settings.get("db_path", "data/cached_responses.sqlite3"))
+        elif backend == "shared":
+            _cache = SharedResponseCache(get_backend())
+        else:
+            _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,148 @@
+"""
+Routing decision cache - repeated queries on the same paper skip routing.
+
+Decisions live in an in-process LRU, written through to the shared cache
+backend when "routing" is listed in shared_cache.layers so that other
+replicas can reuse them.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from utils.cache_backend import CacheBackend, shared_backend_for
+from utils.config import get_config
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    query = _WHITESPACE.sub(" ", query.strip().lower())
+    return _TRAILING_PUNCTUATION.sub("", query)
+
+
+def content_fingerprint(content: str) -> str:
+    """Short stable hash identifying the content a decision was made on."""
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class RoutingCache:
+    """Bounded LRU of routing decisions keyed by (normalized query, content fingerprint)."""
+
+    namespace = "routing"
+
+    def __init__(self, capacity: int = 1024, backend: Optional[CacheBackend] = None):
+        """
+        Initialize cache.
+
+        Args:
+            capacity: Maximum number of decisions kept (least recently used evicted)
+            backend: Shared backend consulted on local misses and written through
+        """
+        self.capacity = capacity
+        self.backend = backend
+        self.shared_hits = 0
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(query: str, content: str) -> Tuple[str, str]:
+        return normalize_query(query), content_fingerprint(content)
+
+    def get(self, query: str, content: str) -> Optional[Dict]:
+        """
+        Look up a routing decision.
+
+        Returns:
+            Copy of the stored decision ('agent', 'reasoning'), or None
+        """
+        key = self.key(query, content)
+        with self._lock:
+            decision = self._entries.get(key)
+            if decision is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(decision)
+
+        decision = self._shared_get(key)
+        with self._lock:
+            if decision is None:
+                self.misses += 1
+                return None
+            self._remember(key, decision)
+            self.hits += 1
+            self.shared_hits += 1
+            return dict(decision)
+
+    def set(self, query: str, content: str, decision: Dict):
+        """Store a routing decision."""
+        key = self.key(query, content)
+        decision = {"agent": decision["agent"], "reasoning": decision["reasoning"]}
+        with self._lock:
+            self._remember(key, decision)
+        if self.backend is not None:
+            try:
+                self.backend.set(self.namespace, "|".join(key), json.dumps(decision))
+            except Exception as e:
+                logger.warning(f"Shared routing cache write failed: {e}")
+
+    def _remember(self, key: Tuple[str, str], decision: Dict):
+        self._entries[key] = decision
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _shared_get(self, key: Tuple[str, str]) -> Optional[Dict]:
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(self.namespace, "|".join(key))
+        except Exception as e:
+            # The local cache still works without the shared one
+            logger.warning(f"Shared routing cache read failed: {e}")
+            return None
+        return json.loads(value) if value else None
+
+    def clear(self):
+        """Drop all decisions and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.shared_hits = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Global cache instance
+_routing_cache = None
+
+def get_routing_cache() -> RoutingCache:
+    """Get or create the global routing cache (shared by all managers)."""
+    global _routing_cache
+    if _routing_cache is None:
+        capacity = get_config().get("routing", {}).get("cache_size", 1024)
+        _routing_cache = RoutingCache(capacity=capacity, backend=shared_backend_for("routing"))
+    return _routing_cache
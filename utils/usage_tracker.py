@@ -0,0 +1,229 @@
+"""
+Per-call token and latency accounting for Gemini API calls.
+"""
+
+import contextvars
+import csv
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tags every record can carry
+TAG_FIELDS = ["agent", "paper_id", "section", "mode"]
+
+# Column order used by the CSV export
+RECORD_FIELDS = [
+    "timestamp", "kind", "model", "prompt_tokens", "output_tokens",
+    "total_tokens", "wall_time", "finish_reason", "error"
+] + TAG_FIELDS
+
+# Tags set by callers higher up the stack (e.g. ModeHandler sets paper_id/mode)
+_current_tags: contextvars.ContextVar = contextvars.ContextVar("usage_tags", default={})
+
+
+@contextmanager
+def usage_tags(**tags):
+    """
+    Attach tags to every API call made inside the block.
+
+    Tags nest: inner blocks inherit and may override outer tags.
+
+    Example:
+        with usage_tags(paper_id="attention", mode="live"):
+            manager.process_query(...)
+    """
+    merged = dict(_current_tags.get())
+    merged.update({k: v for k, v in tags.items() if v is not None})
+    token = _current_tags.set(merged)
+    try:
+        yield merged
+    finally:
+        _current_tags.reset(token)
+
+
+def current_tags() -> Dict:
+    """Get the tags active in the current context."""
+    return dict(_current_tags.get())
+
+
+class UsageTracker:
+    """In-process ring buffer of per-call usage records."""
+
+    def __init__(self, capacity: int = 5000):
+        """
+        Initialize usage tracker.
+
+        Args:
+            capacity: Maximum number of records kept (oldest are dropped)
+        """
+        self.capacity = capacity
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.total_recorded = 0
+
+    def record(
+        self,
+        kind: str,
+        model: str,
+        wall_time: float,
+        prompt_tokens: int = 0,
+        output_tokens: int = 0,
+        total_tokens: int = 0,
+        finish_reason: Optional[str] = None,
+        error: Optional[str] = None,
+        tags: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Record one API call.
+
+        Args:
+            kind: "generate" or "chat"
+            model: Model name
+            wall_time: Call duration in seconds
+            prompt_tokens: Input token count
+            output_tokens: Output (candidates) token count
+            total_tokens: Total token count
+            finish_reason: Finish reason reported by the API
+            error: Error message if the call failed
+            tags: Explicit tags, merged over the context tags
+
+        Returns:
+            The stored record
+        """
+        record_tags = current_tags()
+        record_tags.update({k: v for k, v in (tags or {}).items() if v is not None})
+
+        record = {
+            "timestamp": time.time(),
+            "kind": kind,
+            "model": model,
+            "prompt_tokens": prompt_tokens or 0,
+            "output_tokens": output_tokens or 0,
+            "total_tokens": total_tokens or (prompt_tokens or 0) + (output_tokens or 0),
+            "wall_time": round(wall_time, 4),
+            "finish_reason": finish_reason,
+            "error": error,
+        }
+        for field in TAG_FIELDS:
+            record[field] = record_tags.get(field)
+
+        with self._lock:
+            self._records.append(record)
+            self.total_recorded += 1
+
+        logger.info(
+            f"API usage: {record['kind']} agent={record['agent']} "
+            f"tokens={record['prompt_tokens']}+{record['output_tokens']} "
+            f"time={record['wall_time']:.2f}s"
+        )
+        return record
+
+    def records(self, **filters) -> List[Dict]:
+        """
+        Get a snapshot of records, optionally filtered by field values.
+
+        Example:
+            tracker.records(agent="math", paper_id="attention")
+        """
+        with self._lock:
+            snapshot = list(self._records)
+        if not filters:
+            return snapshot
+        return [r for r in snapshot if all(r.get(k) == v for k, v in filters.items())]
+
+    def aggregate(self, by: Iterable[str] = ("agent",)) -> Dict[tuple, Dict]:
+        """
+        Aggregate usage grouped by one or more tags.
+
+        Args:
+            by: Field names to group by (e.g. ("agent", "mode"))
+
+        Returns:
+            Dict mapping group tuple to totals: calls, errors, token sums,
+            total and mean wall time
+        """
+        by = tuple(by)
+        groups = {}
+        for record in self.records():
+            group_key = tuple(record.get(field) for field in by)
+            totals = groups.setdefault(group_key, {
+                "calls": 0,
+                "errors": 0,
+                "prompt_tokens": 0,
+                "output_tokens": 0,
+                "total_tokens": 0,
+                "wall_time": 0.0,
+            })
+            totals["calls"] += 1
+            totals["errors"] += 1 if record["error"] else 0
+            totals["prompt_tokens"] += record["prompt_tokens"]
+            totals["output_tokens"] += record["output_tokens"]
+            totals["total_tokens"] += record["total_tokens"]
+            totals["wall_time"] += record["wall_time"]
+
+        for totals in groups.values():
+            totals["mean_wall_time"] = totals["wall_time"] / totals["calls"]
+
+        return groups
+
+    def percentile(self, q: float, min_samples: int = 5, **filters) -> Optional[float]:
+        """
+        Wall-time percentile of successful calls matching filters.
+
+        Args:
+            q: Percentile as a fraction (0.95 for p95)
+            min_samples: Return None when fewer calls have been recorded
+            **filters: Field values to match (e.g. agent="chat")
+
+        Returns:
+            Wall time in seconds, or None if there is not enough data
+        """
+        times = sorted(r["wall_time"] for r in self.records(**filters) if not r["error"])
+        if len(times) < min_samples:
+            return None
+        index = min(len(times) - 1, int(q * len(times)))
+        return times[index]
+
+    def export_jsonl(self, path: str) -> int:
+        """Write all records to a JSONL file. Returns the record count."""
+        records = self.records()
+        with open(path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        logger.info(f"Exported {len(records)} usage records to {path}")
+        return len(records)
+
+    def export_csv(self, path: str) -> int:
+        """Write all records to a CSV file. Returns the record count."""
+        records = self.records()
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        logger.info(f"Exported {len(records)} usage records to {path}")
+        return len(records)
+
+    def clear(self):
+        """Drop all records."""
+        with self._lock:
+            self._records.clear()
+
+
+# Global tracker instance
+_tracker = None
+_tracker_lock = threading.Lock()
+
+def get_usage_tracker() -> UsageTracker:
+    """Get or create global usage tracker instance."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = UsageTracker()
+        return _tracker
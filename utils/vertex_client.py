@@ -3,41 +3,143 @@ Vertex AI / Gemini API client wrapper.
 """
 
 import os
-import google.generativeai as genai
-from typing import Optional, Dict
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, List
+from utils.usage_tracker import get_usage_tracker, current_tags
+from utils.single_flight import get_single_flight
+from utils.llm_cache import cache_refreshing, get_llm_cache
+from utils.config import default_model, get_config, get_request_limits
+from utils.rate_limiter import RateLimiter
+from utils.request_control import (
+    CancellationToken, DeadlineExceeded, RequestCancelled, current_token, hedged, run_with_deadline
+)
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# google-generativeai version whose GenerativeModel._client is swapped for a
+# per-key service client (pinned in requirements.txt)
+SDK_VERSION = "0.8.5"
+
+
+class FallbackText(str):
+    """Apology text returned in place of a model answer; never cached."""
+
+
+def request_key(**parts) -> str:
+    """
+    Build a stable identity for an API request.
+    
+    Two requests with the same model, system instruction, prompt/history
+    and generation config get the same key.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 
 class GeminiClient:
     """Wrapper for Google Gemini API."""
     
-    def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-2.0-flash"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        limiter: Optional[RateLimiter] = None
+    ):
         """
         Initialize Gemini client.
         
         Args:
             api_key: Google API key (or loads from environment)
-            model_name: Model to use
+            model_name: Model to use (defaults to model.name in config.yaml)
+            limiter: Rate limiter for this key (defaults to the configured quota)
         """
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
-        if not self.api_key or self.api_key == "your-api-key-here":
+        if not _is_valid_key(self.api_key):
             raise ValueError("GOOGLE_API_KEY not found in environment")
         
-        genai.configure(api_key=self.api_key)
-        self.model_name = model_name
-        self.model = genai.GenerativeModel(model_name)
+        # The SDK and its gRPC/protobuf stack are imported on first client
+        # creation rather than at module load.
+        # Each client talks to the API with its own key instead of the
+        # process-wide genai.configure() default, so several keys can be
+        # served side by side
+        from google.ai import generativelanguage as glm
+        self._service = glm.GenerativeServiceClient(client_options={"api_key": self.api_key})
         
-        logger.info(f"Initialized Gemini client with model: {model_name}")
+        self.model_name = model_name or default_model()
+        self.model = self._model()
+        
+        quota = get_config().get("model", {})
+        self.limiter = limiter or RateLimiter(
+            rpm=quota.get("requests_per_minute", 15),
+            rpd=quota.get("requests_per_day", 1500)
+        )
+        
+        logger.info(f"Initialized Gemini client with model: {self.model_name}")
+    
+    def _model(self, system_instruction: Optional[str] = None):
+        """
+        Create a GenerativeModel bound to this client's API key.
+        
+        The SDK has no public way to give a model its own key, so its
+        private _client is replaced (google-generativeai SDK_VERSION). If
+        an upgrade drops that attribute, this fails loudly rather than
+        silently sending requests with the process-wide default key.
+        """
+        import google.generativeai as genai
+        
+        if system_instruction:
+            model = genai.GenerativeModel(self.model_name, system_instruction=system_instruction)
+        else:
+            model = genai.GenerativeModel(self.model_name)
+        if not hasattr(model, "_client"):
+            raise RuntimeError(
+                f"google-generativeai {getattr(genai, '__version__', '?')} has no GenerativeModel._client; "
+                f"per-key clients need google-generativeai=={SDK_VERSION}"
+            )
+        model._client = self._service
+        return model
+    
+    def _acquire(self, timeout: Optional[float]):
+        """
+        Wait for this key's rate limiter to allow one more request.
+        
+        Raises RequestCancelled instead of taking a slot when the active
+        cancellation token (set by run_with_deadline) is cancelled.
+        """
+        token = current_token()
+        if not self.limiter.acquire(timeout, cancel_token=token):
+            raise DeadlineExceeded("Timed out waiting for API rate limit")
+    
+    @staticmethod
+    def _check_cancelled():
+        """Raise RequestCancelled if the caller gave up while the request was prepared."""
+        token = current_token()
+        if token is not None:
+            token.raise_if_cancelled()
+    
+    def _check_quota_error(self, error: Exception):
+        """Put this key into cooldown when the API reports exhausted quota."""
+        import google.api_core.exceptions
+        if isinstance(error, google.api_core.exceptions.ResourceExhausted):
+            self.limiter.penalize()
     
     def generate(
         self,
         prompt: str,
         system_instruction: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 8192
+        max_tokens: int = 8192,
+        tags: Optional[Dict] = None,
+        use_cache: bool = True,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        hedge: Optional[bool] = None
     ) -> str:
         """
         Generate response from Gemini.
@@ -47,19 +149,63 @@ class GeminiClient:
             system_instruction: System instruction for the model
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
+            tags: Usage accounting tags (agent, paper_id, section, mode)
+            use_cache: Serve/store exact-match repeats from the response cache
+                (turn off for creative requests that should vary)
+            timeout: Deadline in seconds (defaults to the agent's request_limits)
+            cancel_token: Token that aborts the call (defaults to the active
+                cancellation_scope)
+            hedge: Send a duplicate request after the agent's p95 latency
+                (defaults to the agent's request_limits)
             
         Returns:
             Generated text
+            
+        Raises:
+            DeadlineExceeded: The call did not complete in time
+            RequestCancelled: The call was cancelled
         """
+        key = request_key(
+            kind="generate",
+            model=self.model_name,
+            system_instruction=system_instruction,
+            prompt=prompt,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        
+        return self._execute(
+            key,
+            lambda call_timeout: self._generate(
+                prompt, system_instruction, temperature, max_tokens, tags, call_timeout
+            ),
+            use_cache,
+            tags,
+            timeout,
+            cancel_token,
+            hedge
+        )
+    
+    def _generate(
+        self,
+        prompt: str,
+        system_instruction: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        tags: Optional[Dict],
+        timeout: Optional[float] = None
+    ) -> str:
+        """Make one generate_content call (no coalescing)."""
+        import google.generativeai as genai
+        
+        start = time.perf_counter()
+        response = None
+        error = None
         try:
+            self._acquire(timeout)
+            
             # Create model with system instruction if provided
-            if system_instruction:
-                model = genai.GenerativeModel(
-                    self.model_name,
-                    system_instruction=system_instruction
-                )
-            else:
-                model = self.model
+            model = self._model(system_instruction) if system_instruction else self.model
             
             # Configure safety settings for academic/technical content
             from google.generativeai.types import HarmCategory, HarmBlockThreshold
@@ -72,51 +218,62 @@ class GeminiClient:
             }
             
             # Generate response
+            self._check_cancelled()
             response = model.generate_content(
                 prompt,
                 generation_config=genai.GenerationConfig(
                     temperature=temperature,
                     max_output_tokens=max_tokens,
                 ),
-                safety_settings=safety_settings
+                safety_settings=safety_settings,
+                request_options={"timeout": timeout} if timeout else None
             )
             
             # Check if response was blocked
             if not response.candidates:
                 logger.warning("Response was blocked by safety filters")
-                return "I apologize, but I cannot generate a response for this content due to safety filters. Please try rephrasing your question or selecting a different section."
+                return FallbackText("I apologize, but I cannot generate a response for this content due to safety filters. Please try rephrasing your question or selecting a different section.")
             
             # Check finish reason
             finish_reason = response.candidates[0].finish_reason
             if finish_reason == 2:  # SAFETY
                 logger.warning("Response blocked due to safety concerns")
-                return "I apologize, but this content triggered safety filters. Please try a different section or rephrase your question."
+                return FallbackText("I apologize, but this content triggered safety filters. Please try a different section or rephrase your question.")
             elif finish_reason == 3:  # RECITATION
                 logger.warning("Response blocked due to recitation concerns")
-                return "I apologize, but I cannot provide this response due to content policy. Please try a different approach."
+                return FallbackText("I apologize, but I cannot provide this response due to content policy. Please try a different approach.")
             
             # Try to get text, with fallback
             try:
                 return response.text
             except ValueError as ve:
                 logger.error(f"Could not extract text from chat response: {ve}")
-                return "I apologize, but I encountered an issue generating a response. Please try rephrasing your question."
+                return FallbackText("I apologize, but I encountered an issue generating a response. Please try rephrasing your question.")
             except AttributeError:
                 logger.error("Response has no text attribute")
-                return "I apologize, but I received an invalid response. Please try again."
+                return FallbackText("I apologize, but I received an invalid response. Please try again.")
             except ValueError as ve:
                 logger.error(f"Could not extract text from response: {ve}")
-                return "I apologize, but I encountered an issue generating a response. Please try again with a different section or question."
+                return FallbackText("I apologize, but I encountered an issue generating a response. Please try again with a different section or question.")
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
+            error = str(e)
+            self._check_quota_error(e)
             raise
+        finally:
+            self._record_usage("generate", response, start, error, tags)
     
     def chat(
         self,
         messages: list,
         system_instruction: Optional[str] = None,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        tags: Optional[Dict] = None,
+        use_cache: bool = True,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        hedge: Optional[bool] = None
     ) -> str:
         """
         Multi-turn chat with Gemini.
@@ -125,19 +282,119 @@ class GeminiClient:
             messages: List of message dicts with 'role' and 'content'
             system_instruction: System instruction
             temperature: Sampling temperature
+            tags: Usage accounting tags (agent, paper_id, section, mode)
+            use_cache: Serve/store exact-match repeats from the response cache
+            timeout: Deadline in seconds (defaults to the agent's request_limits)
+            cancel_token: Token that aborts the call
+            hedge: Send a duplicate request after the agent's p95 latency
             
         Returns:
             Generated response
         """
+        key = request_key(
+            kind="chat",
+            model=self.model_name,
+            system_instruction=system_instruction,
+            messages=[[msg['role'], msg['content']] for msg in messages],
+            temperature=temperature
+        )
+        
+        return self._execute(
+            key,
+            lambda call_timeout: self._chat(
+                messages, system_instruction, temperature, tags, call_timeout
+            ),
+            use_cache,
+            tags,
+            timeout,
+            cancel_token,
+            hedge
+        )
+    
+    def _execute(
+        self,
+        key: str,
+        upstream,
+        use_cache: bool,
+        tags: Optional[Dict],
+        timeout: Optional[float],
+        cancel_token: Optional[CancellationToken],
+        hedge: Optional[bool]
+    ) -> str:
+        """
+        Run one request through cache, coalescing, hedging and deadline layers.
+        
+        Args:
+            key: Request key
+            upstream: Callable taking the SDK timeout and making one API call
+            use_cache: Whether the response cache is consulted and populated
+            tags: Usage tags (the 'agent' tag selects request limits)
+            timeout: Explicit deadline, or None for the agent default
+            cancel_token: Explicit token, or None for the active scope
+            hedge: Explicit hedging switch, or None for the agent default
+        """
+        agent = (tags or {}).get("agent") or current_tags().get("agent")
+        limits = get_request_limits(agent)
+        timeout = timeout if timeout is not None else limits["timeout"]
+        hedge = hedge if hedge is not None else limits["hedge"]
+        cancel_token = cancel_token or current_token()
+        
+        if use_cache and not cache_refreshing():
+            cached = get_llm_cache().get(key)
+            if cached is not None:
+                return cached
+        
+        call = lambda: upstream(timeout)
+        if hedge:
+            p95 = get_usage_tracker().percentile(0.95, agent=agent)
+            if p95 is not None:
+                call = hedged(call, max(p95, limits["hedge_min_delay"]))
+        
+        # Identical concurrent requests share one upstream call
+        shared = lambda: self._store(key, call(), use_cache)
+        
+        def work():
+            try:
+                return get_single_flight().do(key, shared)
+            except RequestCancelled:
+                # The call this one coalesced onto was cancelled by its own
+                # caller; run it again unless this request was cancelled too
+                self._check_cancelled()
+                return get_single_flight().do(key, shared)
+        
+        if timeout or cancel_token is not None:
+            return run_with_deadline(work, timeout, cancel_token)
+        return work()
+    
+    def _store(self, key: str, text: str, use_cache: bool) -> str:
+        """Write a successful response to the response cache."""
+        if use_cache and text and not isinstance(text, FallbackText):
+            try:
+                get_llm_cache().set(key, text)
+            except Exception as e:
+                # A broken cache must never lose a paid-for response
+                logger.error(f"Error writing LLM cache: {e}")
+        return text
+    
+    def _chat(
+        self,
+        messages: list,
+        system_instruction: Optional[str],
+        temperature: float,
+        tags: Optional[Dict],
+        timeout: Optional[float] = None
+    ) -> str:
+        """Make one chat send_message call (no coalescing)."""
+        import google.generativeai as genai
+        
+        start = time.perf_counter()
+        response = None
+        error = None
         try:
+            self._acquire(timeout)
+            
             # Create chat session
-            if system_instruction:
-                model = genai.GenerativeModel(
-                    self.model_name,
-                    system_instruction=system_instruction
-                )
-            else:
-                model = self.model
+            model = self._model(system_instruction) if system_instruction else self.model
             
             # Build history in Gemini format (exclude last user message)
             history = []
@@ -162,51 +419,240 @@ class GeminiClient:
             }
             
             # Send last message and get response
+            self._check_cancelled()
             response = chat.send_message(
                 messages[-1]['content'],
                 generation_config=genai.GenerationConfig(
                     temperature=temperature,
                 ),
-                safety_settings=safety_settings
+                safety_settings=safety_settings,
+                request_options={"timeout": timeout} if timeout else None
             )
             
             # Check if response was blocked
             if not response.candidates:
                 logger.warning("Chat response was blocked by safety filters")
-                return "I apologize, but I cannot generate a response for this content due to safety filters. Please try rephrasing your question."
+                return FallbackText("I apologize, but I cannot generate a response for this content due to safety filters. Please try rephrasing your question.")
             
             # Check finish reason
             finish_reason = response.candidates[0].finish_reason
             if finish_reason == 2:  # SAFETY
                 logger.warning("Chat response blocked due to safety concerns")
-                return "I apologize, but this content triggered safety filters. Please rephrase your question."
+                return FallbackText("I apologize, but this content triggered safety filters. Please rephrase your question.")
             
             # Try to get text, with fallback
             try:
                 return response.text
             except ValueError as ve:
                 logger.error(f"Could not extract text from chat response: {ve}")
-                return "I apologize, but I encountered an issue generating a response. Please try rephrasing your question."
+                return FallbackText("I apologize, but I encountered an issue generating a response. Please try rephrasing your question.")
             
         except Exception as e:
             logger.error(f"Error in chat: {e}")
+            error = str(e)
+            self._check_quota_error(e)
+            if isinstance(e, DeadlineExceeded):
+                raise
             # Handle specific API errors gracefully
             import google.api_core.exceptions
             if isinstance(e, google.api_core.exceptions.InternalServerError):
-                return "I apologize, but the AI service is temporarily unavailable. This is usually a brief issue. Please try again in a moment."
+                return FallbackText("I apologize, but the AI service is temporarily unavailable. This is usually a brief issue. Please try again in a moment.")
             elif isinstance(e, google.api_core.exceptions.ResourceExhausted):
-                return "I apologize, but we've hit the API rate limit. Please wait a moment and try again."
+                return FallbackText("I apologize, but we've hit the API rate limit. Please wait a moment and try again.")
             else:
                 # For other errors, provide a generic message
-                return "I apologize, but I encountered an unexpected error. Please try rephrasing your question or try again later."
+                return FallbackText("I apologize, but I encountered an unexpected error. Please try rephrasing your question or try again later.")
+        finally:
+            self._record_usage("chat", response, start, error, tags)
+    
+    def _record_usage(
+        self,
+        kind: str,
+        response,
+        start: float,
+        error: Optional[str] = None,
+        tags: Optional[Dict] = None
+    ):
+        """Record token counts, wall time and finish reason for one call."""
+        usage = getattr(response, "usage_metadata", None)
+        finish_reason = None
+        if response is not None and getattr(response, "candidates", None):
+            reason = response.candidates[0].finish_reason
+            finish_reason = getattr(reason, "name", str(reason))
+        elif response is not None:
+            finish_reason = "BLOCKED"
+        
+        try:
+            get_usage_tracker().record(
+                kind,
+                self.model_name,
+                time.perf_counter() - start,
+                prompt_tokens=getattr(usage, "prompt_token_count", 0),
+                output_tokens=getattr(usage, "candidates_token_count", 0),
+                total_tokens=getattr(usage, "total_token_count", 0),
+                finish_reason=finish_reason,
+                error=error,
+                tags=tags
+            )
+        except Exception as e:
+            # Accounting must never break an API call
+            logger.error(f"Error recording usage: {e}")
+
+
+def _is_valid_key(api_key: Optional[str]) -> bool:
+    return bool(api_key) and api_key != "your-api-key-here"
 
 
-# Global client instance
-_client = None
+def _mask(api_key: str) -> str:
+    """Short, loggable identifier for an API key."""
+    return f"...{api_key[-4:]}"
+
+
+def service_keys() -> List[str]:
+    """
+    API keys available for service-side work.
+    
+    GOOGLE_API_KEYS may hold a comma-separated pool of keys; otherwise the
+    single GOOGLE_API_KEY is used.
+    """
+    keys = [k.strip() for k in os.getenv("GOOGLE_API_KEYS", "").split(",")]
+    keys = [k for k in keys if _is_valid_key(k)]
+    if not keys and _is_valid_key(os.getenv("GOOGLE_API_KEY")):
+        keys = [os.getenv("GOOGLE_API_KEY")]
+    return keys
+
+
+class ClientPool:
+    """
+    One GeminiClient per API key, each with its own limiter and quota state.
+    
+    Clients of users' own keys are dropped after idle_seconds without use
+    and beyond max_user_clients (least recently used first); service keys
+    are always kept.
+    """
+    
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        max_user_clients: Optional[int] = None,
+        idle_seconds: Optional[float] = None
+    ):
+        """
+        Initialize pool.
+        
+        Args:
+            model_name: Model of every client
+            max_user_clients: User-key clients kept (defaults to model.max_user_clients)
+            idle_seconds: Unused time after which a user-key client is dropped
+                (defaults to model.client_idle_seconds)
+        """
+        settings = get_config().get("model", {})
+        self.model_name = model_name or default_model()
+        self.max_user_clients = max_user_clients or settings.get("max_user_clients", 100)
+        self.idle_seconds = idle_seconds or settings.get("client_idle_seconds", 3600)
+        # api key -> (client, last used), least recently used first
+        self._clients: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _evict(self, now: float):
+        """Drop idle user-key clients, then the least recently used beyond the bound (lock held)."""
+        keep = set(service_keys())
+        user_keys = [key for key in self._clients if key not in keep]
+        excess = len(user_keys) - self.max_user_clients
+        for key in user_keys:
+            if excess > 0 or now - self._clients[key][1] > self.idle_seconds:
+                del self._clients[key]
+                excess -= 1
+                logger.info(f"Removed idle API key {_mask(key)} from client pool")
+    
+    def get(self, api_key: str) -> GeminiClient:
+        """Get or create the client for an API key."""
+        now = time.time()
+        with self._lock:
+            entry = self._clients.get(api_key)
+            if entry is None:
+                client = GeminiClient(api_key=api_key, model_name=self.model_name)
+                logger.info(f"Added API key {_mask(api_key)} to client pool")
+            else:
+                client = entry[0]
+            self._clients[api_key] = (client, now)
+            self._clients.move_to_end(api_key)
+            self._evict(now)
+            return client
+    
+    def least_loaded(self, keys: Optional[List[str]] = None) -> GeminiClient:
+        """
+        Pick the client with the most remaining quota.
+        
+        Args:
+            keys: Candidate keys (defaults to the service keys)
+        """
+        keys = keys or service_keys()
+        if not keys:
+            raise ValueError("GOOGLE_API_KEY not found in environment")
+        clients = [self.get(key) for key in keys]
+        return max(clients, key=lambda client: client.limiter.score())
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Remaining quota per key (keys masked)."""
+        with self._lock:
+            clients = {key: client for key, (client, _) in self._clients.items()}
+        return {_mask(key): client.limiter.remaining() for key, client in clients.items()}
+
+
+class PooledClient:
+    """
+    Client facade that spreads service-side calls across a pool of keys.
+    
+    Every call goes to whichever key currently has the most remaining quota.
+    """
+    
+    def __init__(self, pool: ClientPool, keys: List[str]):
+        self.pool = pool
+        self.keys = keys
+        self.model_name = pool.model_name
+    
+    def generate(self, *args, **kwargs) -> str:
+        return self.pool.least_loaded(self.keys).generate(*args, **kwargs)
+    
+    def chat(self, *args, **kwargs) -> str:
+        return self.pool.least_loaded(self.keys).chat(*args, **kwargs)
+
+
+# Global client pools, one per model
+_pools: Dict[str, ClientPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(model_name: Optional[str] = None) -> ClientPool:
+    """Get or create the global client pool for a model (default: model.name in config.yaml)."""
+    model_name = model_name or default_model()
+    with _pools_lock:
+        if model_name not in _pools:
+            _pools[model_name] = ClientPool(model_name)
+        return _pools[model_name]
+
+
+def get_client(model_name: Optional[str] = None, api_key: Optional[str] = None):
+    """
+    Get a client for an API key.
+    
+    Args:
+        model_name: Model to use (defaults to model.name in config.yaml)
+        api_key: A user's own key. Without one, service keys from the
+            environment are used, pooled when there are several.
+    """
+    pool = get_pool(model_name)
+    if api_key:
+        return pool.get(api_key)
+    
+    keys = service_keys()
+    if not keys:
+        raise ValueError("GOOGLE_API_KEY not found in environment")
+    if len(keys) == 1:
+        return pool.get(keys[0])
+    return PooledClient(pool, keys)
+
 
-def get_client(model_name: str = "gemini-2.0-flash") -> GeminiClient:
-    """Get or create global client instance."""
-    global _client
-    if _client is None:
-        _client = GeminiClient(model_name=model_name)
-    return _client
\ No newline at end of file
+def coalescing_stats() -> Dict:
+    """Get metrics for identical in-flight requests that were coalesced."""
+    return get_single_flight().stats()